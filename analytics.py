@@ -0,0 +1,179 @@
+# analytics.py
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Callable, Dict, Hashable, Iterable, List, Optional
+
+import pandas as pd
+
+from clubs import DEFAULT_CLUB
+from config import setting
+from lru import ClubLRUCache
+from metrics import span
+
+
+# Calculs de l'app, sans Streamlit : fonctions pures sur le rollup journalier,
+# le classement ou les agrégats, + cached_query pour les mémoriser par version.
+
+# Résultats partagés entre sessions, clé (requête, version des données, paramètres),
+# ANALYTICS_CACHE_SIZE entrées au plus par club
+DEFAULT_QUERY_CACHE_SIZE = 128
+_queries = ClubLRUCache(lambda: setting("ANALYTICS_CACHE_SIZE", DEFAULT_QUERY_CACHE_SIZE))
+
+
+def cached_query(
+    name: str, version: Hashable, params: Hashable, build: Callable[[], Any], club: str = DEFAULT_CLUB
+) -> Any:
+    # build() ne tourne qu'au premier appel pour cette clé ; une nouvelle version des
+    # données rend les anciennes clés inutiles, elles sortent par LRU.
+    # Le résultat est partagé : ne jamais le modifier en place.
+    def timed_build() -> Any:
+        with span("query", query=name):
+            return build()
+
+    return _queries.get_or_build(club, (name, version, params), timed_build)
+
+
+def clear_query_cache(club: Optional[str] = None) -> None:
+    _queries.clear(club)
+
+
+def pending_key(pending: Iterable[Dict[str, Any]]) -> tuple:
+    # les ajouts en file d'envoi font partie des paramètres d'une requête
+    return tuple(item["id"] for item in pending)
+
+
+def _empty_hall_of_fame() -> Dict[str, Any]:
+    return {
+        "total_l": 0.0,
+        "king": {"nom": "-", "volume_l": 0.0},
+        "best_day": {"day": "-", "nom": "-", "volume_l": 0.0},
+        "party": {"day": "-", "volume_l": 0.0},
+        "explorer": {"nom": "-", "n_boissons": 0},
+        "top_drink": {"boisson": "-", "volume_l": 0.0},
+        "regular": {"nom": "-", "streak": 0},
+        "sniper": {"nom": "-", "volume_l": 0.0},
+        "sommelier": {"nom": "-", "volume_l": 0.0},
+    }
+
+
+def hall_of_fame(aggs: Dict[str, Any], streaks: Any = None) -> Dict[str, Any]:
+    # badges lus dans les agrégats (storage.load_aggregates / aggregates_with) :
+    # listes déjà triées, meilleur jour et meilleure soirée déjà réduits à une entrée ;
+    # streaks : streaks.StreakIndex, le badge "Régulier" est alors lu dans l'index
+    hof = _empty_hall_of_fame()
+    if not aggs["by_nom"]:
+        return hof
+
+    hof["total_l"] = float(aggs["total_l"])
+    king = aggs["by_nom"][0]
+    hof["king"] = {"nom": king["nom"], "volume_l": float(king["volume_l"])}
+    best = aggs["best_day"]
+    hof["best_day"] = {"day": best["day"], "nom": best["nom"], "volume_l": float(best["volume_l"])}
+    party = aggs["party"]
+    hof["party"] = {"day": party["day"], "volume_l": float(party["volume_l"])}
+    explorer = aggs["diversity"][0]
+    hof["explorer"] = {"nom": explorer["nom"], "n_boissons": int(explorer["n_boissons"])}
+    top_drink = aggs["by_boisson"][0]
+    hof["top_drink"] = {"boisson": top_drink["boisson"], "volume_l": float(top_drink["volume_l"])}
+
+    if streaks is not None:
+        top = streaks.top(1)
+        if top and top[0][1] > 0:
+            hof["regular"] = {"nom": top[0][0], "streak": top[0][1]}
+
+    for badge, drink in (("sniper", "Shot"), ("sommelier", "Vin")):
+        # by_nom_boisson trié par volume : la première ligne de la boisson gagne
+        winner = next((row for row in aggs["by_nom_boisson"] if row["boisson"] == drink), None)
+        if winner is not None:
+            hof[badge] = {"nom": winner["nom"], "volume_l": float(winner["volume_l"])}
+    return hof
+
+
+def streaks_with(streaks: Any, extra: Iterable[Dict[str, Any]] = ()) -> Any:
+    # index des séries + lignes supplémentaires (ajouts en file d'envoi), sur une copie
+    extra = list(extra)
+    if not extra:
+        return streaks
+    streaks = streaks.copy()
+    streaks.apply_cells((item["nom"], date.fromisoformat(str(item["date"])[:10]), 1) for item in extra)
+    return streaks
+
+
+def streak_views(streaks: Any, today: date) -> Dict[str, Any]:
+    # séries en cours + classement des meilleures séries (avec série en cours et dernier jour)
+    return {
+        "active": streaks.active(today),
+        "ranking": [
+            (nom, best, streaks.current(nom, today), streaks.last_day(nom))
+            for nom, best in streaks.ranking()
+        ],
+    }
+
+
+def ranking_view(board: Any, drink: str, extra: Iterable[Dict[str, Any]] = ()) -> Dict[str, Any]:
+    # board : leaderboard.Leaderboard partagé (lu seulement) ; extra : lignes à ajouter
+    # (ajouts en file d'envoi), appliquées sur une copie
+    extra = list(extra)
+    if extra:
+        board = board.copy()
+        board.apply_cells((item["nom"], item["boisson"], float(item["volume_l"]), 1) for item in extra)
+    return {
+        "empty": not board.ranking(),
+        "ranking": board.ranking(drink),
+        "total": board.total(drink),
+        "top3": board.top(3, drink),
+    }
+
+
+def active_names(rollup: pd.DataFrame) -> List[str]:
+    # personnes ayant au moins une conso datée
+    if rollup.empty:
+        return []
+    return sorted(str(n) for n in rollup.index.get_level_values("nom").unique())
+
+
+def people_series(
+    rollup: pd.DataFrame,
+    drink: str,
+    start: pd.Timestamp,
+    end: pd.Timestamp,
+    names: List[str],
+) -> Optional[pd.DataFrame]:
+    # Rollup journalier (jour, nom, boisson) -> L/jour par personne, jours manquants = 0.
+    # Coût ~ nombre de jours x personnes x boissons, pas nombre de consos.
+    df2 = rollup.reset_index()
+
+    # Filtre boisson
+    if drink != "all":
+        df2 = df2[df2["boisson"] == drink]
+
+    # Filtre période
+    df2 = df2[df2["day"] >= start]
+
+    # Filtre personnes
+    df2 = df2[df2["nom"].isin(names)]
+
+    if df2.empty:
+        return None
+
+    date_index = pd.date_range(start=start, end=end, freq="D")
+    daily_people = df2.groupby(["day", "nom"], as_index=False)["volume_l"].sum()
+
+    pivot = daily_people.pivot(index="day", columns="nom", values="volume_l").reindex(date_index, fill_value=0.0)
+    pivot = pivot[[name for name in names if name in pivot.columns]]
+    pivot.columns = [str(c) for c in pivot.columns]
+    return pivot
+
+
+def cumulative_series(rollup: pd.DataFrame, fixed_start: pd.Timestamp) -> Optional[pd.Series]:
+    # Volume cumulé par jour, de fixed_start à la dernière conso (None si rien depuis)
+    daily_total = rollup["volume_l"].groupby(level="day").sum()
+
+    last_day = daily_total.index.max()
+    if pd.isna(last_day) or last_day < fixed_start:
+        return None
+
+    # Crée tous les jours entre fixed_start et last_day, jours sans conso à 0
+    all_days = pd.date_range(start=fixed_start, end=last_day, freq="D", name="day")
+    return daily_total.reindex(all_days, fill_value=0.0).cumsum().rename("cumul_l")
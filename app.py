@@ -1,53 +1,72 @@
 # app.py
 from __future__ import annotations
 
-from datetime import datetime
+from datetime import datetime, timedelta
+import html
+import math
+import time
 import uuid
 
 import pandas as pd
 import streamlit as st
 
-from storage import load_consos, add_conso, delete_conso
-
-import matplotlib.pyplot as plt
-import matplotlib.dates as mdates
-
-
-DRINK_TYPES = ["Bière", "Ricard", "Rhum", "Vodka", "Tequilla", "Vin", "Whisky", "Shot", "Cocktail", "Autre"]
-NAMES = ["Divers Inconnus", "Damien", "Eliott", "Elwenn", "Gaetan", "Jeanne", "Jules", "Marie", "Mattis", "Maude", "Quentin"]
-
-DOSES = {
-    "2 cl (mini shot)": 20,
-    "5 cl (shot)": 50,
-    "10 cl": 100,
-    "12.5 cl (vin)": 125,
-    "20 cl": 200,
-    "25 cl": 250,
-    "33 cl": 330,
-    "50 cl": 500,
-    "1 L": 1000,
-}
-NB_OPTIONS = list(range(1, 11))
-
-# Emojis par boisson (simple)
-DRINK_EMOJI = {
-    "Bière": "🍺",
-    "Ricard": "🟨",
-    "Rhum": "🥃",
-    "Vodka": "🧊",
-    "Tequilla": "🌵",
-    "Vin": "🍷",
-    "Whisky": "🥃",
-    "Shot": "🎯",
-    "Cocktail": "🍸",
-    "Autre": "🍶",
-}
-
-def with_emoji(drink: str) -> str:
-    return f"{DRINK_EMOJI.get(drink, '🍻')} {drink}"
+from storage import (
+    load_consos_df,
+    load_consos_page,
+    load_daily_cells,
+    load_daily_rollup,
+    load_leaderboard,
+    load_streaks,
+    aggregates_with,
+    delete_consos_bulk,
+    data_version,
+)
+from outbox import (
+    discard_rejected,
+    enqueue,
+    ensure_worker,
+    last_error,
+    pending_consos,
+    rejected_consos,
+    requeue_rejected,
+)
+from changefeed import ensure_listener, live_updates_enabled
+from clubs import club_config, club_ids, resolve_club
+from config import setting
+from metrics import gauge, observe, prometheus_text, run_records, span, start_run, write_textfile
+from analytics import (
+    active_names,
+    cached_query,
+    cumulative_series,
+    hall_of_fame,
+    pending_key,
+    people_series,
+    ranking_view,
+    streak_views,
+    streaks_with,
+)
+from charts import cached_chart, chart_backend, render_cumulative_chart, render_people_chart
+from constants import DOSES, NB_OPTIONS
+from formatting import (
+    delete_labels,
+    format_active_streaks,
+    format_history,
+    format_streak_ranking,
+    with_emoji,
+)
+
+# Supprimer : nombre max de lignes proposées et période par défaut de la recherche
+DELETE_SEARCH_LIMIT = 200
+DELETE_DEFAULT_DAYS = 30
+# Mises à jour en direct : intervalle de vérification côté navigateur (secondes)
+DEFAULT_LIVE_REFRESH_SECONDS = 5
 
 st.set_page_config(page_title="Compteur de boissons", page_icon="🍻", layout="centered")
 
+# Mesures du rerun (metrics.py) : panneau en bas de page avec ?debug=1
+start_run()
+rerun_t0 = time.perf_counter()
+
 # Un peu de CSS (léger) : centrer tables + card total
 st.markdown(
     """
@@ -77,478 +96,546 @@ st.markdown(
     }
     .hof-value{ font-size: 30px; font-weight: 900; line-height: 1.05; margin-bottom: 10px; }
     .hof-meta{ font-size: 13px; opacity: 0.85; display:flex; flex-direction:column; gap:4px; }
+    /* Classement complet */
+    .rank-row{ margin: 0 0 12px 0; }
+    .rank-bar{ height: 8px; border-radius: 4px; background: rgba(255,255,255,0.10); margin-top: 4px; }
+    .rank-fill{ height: 100%; border-radius: 4px; background: #ff4b4b; }
     @media (max-width: 900px){ .hof-grid{ grid-template-columns: 1fr; } }
     </style>
     """,
     unsafe_allow_html=True,
 )
 
-st.title("🍻 No Rizz Boisson Club")
-st.caption("C'est un jeu dangereux... Mais c'est un jeu qui me plaît")
+# --- Club affiché (clubs.py) : ?club=<id> dans l'URL, sélecteur si plusieurs clubs.
+# Tout ce qui suit (données, caches, classement, flux) ne concerne que ce club.
+clubs = club_ids()
+club = resolve_club(st.query_params.get("club"))
+if len(clubs) > 1:
+    club = st.sidebar.selectbox(
+        "Club", clubs, index=clubs.index(club), format_func=lambda c: club_config(c)["title"]
+    )
+    st.query_params["club"] = club
+club_cfg = club_config(club)
+club_names, club_drinks = club_cfg["names"], club_cfg["drinks"]
+club_start = club_cfg["start"]
+
+st.title(f"🍻 {club_cfg['title']}")
+if club_cfg["caption"]:
+    st.caption(club_cfg["caption"])
+
+# --- Synchro des données (cache partagé, voir storage.py). Les calculs sont faits par
+# analytics.py, mémorisés par version : un rerun sans nouvelle donnée ne recalcule rien.
+# La version est lue AVANT le chargement : une clé de cache n'est jamais plus récente que les données.
+version = (club, data_version(club))
+with span("load_consos"):
+    frame = load_consos_df(club=club)
 
-# --- Charger données (simple et robuste)
-consos = load_consos()
-df = pd.DataFrame(consos)
+# --- Ajouts en file d'envoi (outbox) : affichés tout de suite dans le classement.
+# Ceux déjà présents dans le cache (envoi tout juste confirmé) ne sont pas recomptés.
+ensure_worker()
+ensure_listener(club)
 
-for col in ["id", "date", "nom", "boisson", "nb", "dose_ml", "volume_l"]:
-    if col not in df.columns:
-        df[col] = None
 
-if not df.empty:
-    df["nb"] = pd.to_numeric(df["nb"], errors="coerce").fillna(0).astype(int)
-    df["dose_ml"] = pd.to_numeric(df["dose_ml"], errors="coerce").fillna(0).astype(int)
-    df["volume_l"] = pd.to_numeric(df["volume_l"], errors="coerce")
-    df["volume_l"] = df["volume_l"].fillna((df["nb"] * df["dose_ml"]) / 1000.0)
-    df = df.sort_values("date", ascending=False)
+def pending_rows(frame: pd.DataFrame) -> list:
+    items = pending_consos(club)
+    if items:
+        confirmed = set(frame["id"][frame["id"].isin([item["id"] for item in items])])
+        items = [item for item in items if item["id"] not in confirmed]
+    return items
 
-# --- Onglets
+
+pending = pending_rows(frame)
+
+# --- Ajouts des autres utilisateurs (flux de changements, voir changefeed.py) : les vues
+# "live" (classement, Hall of Fame) sont des fragments relancés seuls toutes les
+# LIVE_REFRESH_SECONDS ; le reste de la page suit au prochain rerun.
+live_every = float(setting("LIVE_REFRESH_SECONDS", DEFAULT_LIVE_REFRESH_SECONDS)) if live_updates_enabled() else None
+
+
+def live_state() -> tuple:
+    # (version, ajouts en attente) relus à chaque passage d'un fragment (version lue
+    # avant les données, comme plus haut) ; sans nouvelle donnée, cached_query
+    # renvoie le même résultat et rien n'est recalculé
+    ensure_listener(club)  # une page ouverte sans interaction garde l'écoute du club active
+    current = (club, data_version(club))
+    return current, pending_rows(load_consos_df(club=club))
+
+
+# --- Onglets : seul l'onglet affiché est calculé (changer d'onglet relance le script)
 tab_add, tab_hist, tab_rank, tab_stats, tab_del = st.tabs(
-    ["➕ Ajouter", "📜 Historique", "🏆 Classement", "📈 Statistiques", "🗑️ Supprimer"]
+    ["➕ Ajouter", "📜 Historique", "🏆 Classement", "📈 Statistiques", "🗑️ Supprimer"],
+    key="tab",
+    on_change="rerun",
 )
 
 # ==============
 # TAB : AJOUTER
 # ==============
-with tab_add:
-    st.subheader("Ajouter une consommation")
-
-    with st.form("add_conso", clear_on_submit=True):
-        col1, col2 = st.columns(2)
-        with col1:
-            nom = st.selectbox("Nom", NAMES)
-        with col2:
-            boisson = st.selectbox("Boisson", DRINK_TYPES, format_func=with_emoji)
-
-        col3, col4 = st.columns(2)
-        with col3:
-            nb = st.selectbox("Nombre", NB_OPTIONS, index=0)
-        with col4:
-            dose_label = st.selectbox("Dose", list(DOSES.keys()), index=6)  # 25cl par défaut (selon ta liste)
-            dose_ml = DOSES[dose_label]
-
-        volume_l = (int(nb) * int(dose_ml)) / 1000.0
-
-        submitted = st.form_submit_button("➕ Ajouter")
-
-        if submitted:
-            new_item = {
-                "id": str(uuid.uuid4()),
-                "date": datetime.now().date().isoformat(),
-                "nom": nom,
-                "boisson": boisson,
-                "nb": int(nb),
-                "dose_ml": int(dose_ml),
-                "volume_l": float(volume_l),
-            }
-            add_conso(new_item)
-            st.success(f"Ajouté : {nom} • {with_emoji(boisson)} • {nb} × {dose_label} = {volume_l:.2f} L")
-            st.stop()
+if tab_add.open:
+    with tab_add, span("tab", tab="ajouter"):
+        st.subheader("Ajouter une consommation")
+
+        with st.form("add_conso", clear_on_submit=True):
+            col1, col2 = st.columns(2)
+            with col1:
+                nom = st.selectbox("Nom", club_names)
+            with col2:
+                boisson = st.selectbox("Boisson", club_drinks, format_func=with_emoji)
+
+            col3, col4 = st.columns(2)
+            with col3:
+                nb = st.selectbox("Nombre", NB_OPTIONS, index=0)
+            with col4:
+                dose_label = st.selectbox("Dose", list(DOSES.keys()), index=6)  # 25cl par défaut (selon ta liste)
+                dose_ml = DOSES[dose_label]
+
+            volume_l = (int(nb) * int(dose_ml)) / 1000.0
+
+            submitted = st.form_submit_button("➕ Ajouter")
+
+            if submitted:
+                new_item = {
+                    "id": str(uuid.uuid4()),
+                    "date": datetime.now().date().isoformat(),
+                    "nom": nom,
+                    "boisson": boisson,
+                    "nb": int(nb),
+                    "dose_ml": int(dose_ml),
+                    "volume_l": float(volume_l),
+                }
+                enqueue([new_item], club=club)
+                st.success(f"Ajouté : {nom} • {with_emoji(boisson)} • {nb} × {dose_label} = {volume_l:.2f} L")
+                st.stop()
+
+        # Ajout multiple : une seule requête pour toute la soirée
+        with st.expander("➕➕ Ajout multiple (plusieurs lignes d'un coup)"):
+            with st.form("add_consos_bulk", clear_on_submit=True):
+                bulk_template = pd.DataFrame(
+                    {
+                        "Date": pd.Series([datetime.now().date()], dtype="object"),
+                        "Nom": pd.Series([club_names[0]], dtype="object"),
+                        "Boisson": pd.Series([club_drinks[0]], dtype="object"),
+                        "Nombre": pd.Series([1], dtype="int64"),
+                        "Dose": pd.Series([list(DOSES.keys())[6]], dtype="object"),
+                    }
+                )
+                bulk_rows = st.data_editor(
+                    bulk_template,
+                    num_rows="dynamic",
+                    use_container_width=True,
+                    hide_index=True,
+                    column_config={
+                        "Date": st.column_config.DateColumn("Date", required=True),
+                        "Nom": st.column_config.SelectboxColumn("Nom", options=club_names, required=True),
+                        "Boisson": st.column_config.SelectboxColumn("Boisson", options=club_drinks, required=True),
+                        "Nombre": st.column_config.SelectboxColumn("Nombre", options=NB_OPTIONS, required=True),
+                        "Dose": st.column_config.SelectboxColumn("Dose", options=list(DOSES.keys()), required=True),
+                    },
+                )
+                bulk_submitted = st.form_submit_button("➕ Tout ajouter")
+
+            if bulk_submitted:
+                bulk_rows = bulk_rows.dropna(subset=["Date", "Nom", "Boisson", "Nombre", "Dose"])
+                new_items = [
+                    {
+                        "id": str(uuid.uuid4()),
+                        "date": pd.Timestamp(row["Date"]).date().isoformat(),
+                        "nom": row["Nom"],
+                        "boisson": row["Boisson"],
+                        "nb": int(row["Nombre"]),
+                        "dose_ml": int(DOSES[row["Dose"]]),
+                        "volume_l": float(int(row["Nombre"]) * DOSES[row["Dose"]] / 1000.0),
+                    }
+                    for _, row in bulk_rows.iterrows()
+                ]
+                if not new_items:
+                    st.warning("Aucune ligne complète à ajouter.")
+                else:
+                    enqueue(new_items, club=club)
+                    total_bulk = sum(item["volume_l"] for item in new_items)
+                    st.success(f"Ajouté : {len(new_items)} ligne(s) = {total_bulk:.2f} L")
+                    st.stop()
 
 # ==================
 # TAB : HISTORIQUE
 # ==================
-with tab_hist:
-    st.subheader("Historique des consommations")
-
-    if df.empty:
-        st.info("Aucune consommation enregistrée pour le moment.")
-    else:
-        df_hist = df.copy()
-
-        # Affichage joli
-        df_hist["Boisson"] = df_hist["boisson"].map(with_emoji)
-        df_hist["Dose"] = (df_hist["dose_ml"] / 10).round(0).astype(int).astype(str) + " cl"
-        df_hist["Volume"] = df_hist["volume_l"].round(2).map(lambda x: f"{x:.2f} L")
-        df_hist["Nombre"] = df_hist["nb"].astype(int)
-
-        df_hist = df_hist.rename(columns={"date": "Date", "nom": "Nom"})
-
-        st.dataframe(
-            df_hist[["Date", "Nom", "Boisson", "Nombre", "Dose", "Volume"]],
-            use_container_width=True,
-            hide_index=True,
-        )
+if tab_hist.open:
+    with tab_hist, span("tab", tab="historique"):
+        st.subheader("Historique des consommations")
+
+        # Pagination côté serveur : seule la page affichée est chargée et formatée
+        col_page, col_size = st.columns(2)
+        with col_size:
+            page_size = st.selectbox("Lignes par page", [25, 50, 100, 200], index=1)
+        with col_page:
+            page_num = st.number_input("Page", min_value=1, value=1, step=1)
+
+        page_rows, total_rows = load_consos_page((int(page_num) - 1) * page_size, page_size, club=club)
+        n_pages = max(1, math.ceil(total_rows / page_size))
+        gauge("page_rows", len(page_rows), tab="historique")
+
+        if total_rows == 0:
+            st.info("Aucune consommation enregistrée pour le moment.")
+        elif not page_rows:
+            st.info(f"Page vide : il n'y a que {n_pages} page(s).")
+        else:
+            st.caption(f"{total_rows} consommation(s) — page {int(page_num)}/{n_pages}")
+            st.dataframe(
+                format_history(page_rows),
+                use_container_width=True,
+                hide_index=True,
+            )
 
 # ==================
 # TAB : CLASSEMENT
 # ==================
-with tab_rank:
-    st.subheader("Classement des pochtrons")
-
-    selected_drink = st.selectbox(
-        "Filtrer par type de boisson",
-        ["all"] + DRINK_TYPES,
-        index=0,
-        format_func=lambda x: "🍻 all" if x == "all" else with_emoji(x),
-    )
+if tab_rank.open:
+    with tab_rank, span("tab", tab="classement"):
+        st.subheader("Classement des pochtrons")
 
-    if df.empty:
-        st.info("Aucune consommation enregistrée pour le moment.")
-    else:
-        df_stats = df if selected_drink == "all" else df[df["boisson"] == selected_drink]
+        @st.fragment(run_every=live_every)
+        def ranking_panel():
+            version, pending = live_state()
 
-        if df_stats.empty:
-            st.info("Aucune donnée pour ce type de boisson.")
-        else:
-            total = float(df_stats["volume_l"].sum())
-            subtitle = "Toutes boissons confondues" if selected_drink == "all" else f"{with_emoji(selected_drink)}"
-
-            # Total plus visuel
-            st.markdown(
-                f"""
-                <div class="total-card">
-                  <div class="total-title">Total consommé — {subtitle}</div>
-                  <div class="total-value">{total:.2f} L</div>
-                    <div class="total-sub">(depuis le 09/01/2026)</div>
-                </div>
-                """,
-                unsafe_allow_html=True,
+            selected_drink = st.selectbox(
+                "Filtrer par type de boisson",
+                ["all"] + club_drinks,
+                index=0,
+                format_func=lambda x: "🍻 all" if x == "all" else with_emoji(x),
             )
 
-            by_name = (
-                df_stats.groupby("nom", as_index=False)["volume_l"]
-                .sum()
-                .sort_values("volume_l", ascending=False)
+            # Classement maintenu à chaque écriture (déjà trié) + ajouts en file d'envoi
+            view = cached_query(
+                "ranking",
+                version,
+                (selected_drink, pending_key(pending)),
+                lambda: ranking_view(load_leaderboard(club=club), selected_drink, pending),
+                club=club,
             )
+            if pending:
+                st.caption(f"⏳ {len(pending)} consommation(s) en attente d'envoi (déjà comptées ci-dessous).")
+                if last_error():
+                    st.caption(f"Dernier essai d'envoi échoué : {last_error()}")
+            rejected = rejected_consos(club)
+            if rejected:
+                st.warning(
+                    f"{len(rejected)} consommation(s) refusée(s) par le serveur, non comptée(s) : "
+                    f"{rejected[-1]['error']}"
+                )
+                st.dataframe(format_history([row["item"] for row in rejected]), use_container_width=True, hide_index=True)
+                # callbacks : lignes remises en file / écartées avant le rerun, sans second passage
+                retry_col, discard_col = st.columns(2)
+                retry_col.button("Renvoyer ces lignes", key="requeue_rejected", on_click=requeue_rejected, args=(club,))
+                discard_col.button("Ignorer ces lignes", key="discard_rejected", on_click=discard_rejected, args=(club,))
+
+            if view["empty"]:
+                st.info("Aucune consommation enregistrée pour le moment.")
+            else:
+                ranking = view["ranking"]
 
-            st.markdown("### 🏆 Top 3")
-            top3 = by_name.head(3)
-
-            cols = st.columns(3)
-            for i, (_, row) in enumerate(top3.iterrows()):
-                with cols[i]:
-                    st.metric(label=f"#{i+1} {row['nom']}", value=f"{float(row['volume_l']):.2f} L")
-
-            st.markdown("### 📊 Classement complet")
-            max_val = float(by_name["volume_l"].max()) if not by_name.empty else 1.0
-
-            for _, row in by_name.iterrows():
-                name = row["nom"]
-                val = float(row["volume_l"])
-                st.write(f"**{name}** — {val:.2f} L")
-                st.progress(min(val / max_val, 1.0))
+                if not ranking:
+                    st.info("Aucune donnée pour ce type de boisson.")
+                else:
+                    total = view["total"]
+                    subtitle = "Toutes boissons confondues" if selected_drink == "all" else f"{with_emoji(selected_drink)}"
+
+                    # Total plus visuel
+                    st.markdown(
+                        f"""
+                        <div class="total-card">
+                          <div class="total-title">Total consommé — {subtitle}</div>
+                          <div class="total-value">{total:.2f} L</div>
+                            <div class="total-sub">(depuis le {club_start:%d/%m/%Y})</div>
+                        </div>
+                        """,
+                        unsafe_allow_html=True,
+                    )
+
+                    st.markdown("### 🏆 Top 3")
+                    top3 = view["top3"]
+
+                    cols = st.columns(3)
+                    for i, (name, val) in enumerate(top3):
+                        with cols[i]:
+                            st.metric(label=f"#{i+1} {name}", value=f"{val:.2f} L")
+
+                    st.markdown("### 📊 Classement complet")
+                    max_val = ranking[0][1] if ranking[0][1] > 0 else 1.0
+
+                    # Un seul bloc HTML pour toutes les barres (au lieu d'un st.write + st.progress par ligne)
+                    bars = "".join(
+                        f'<div class="rank-row"><b>{html.escape(name)}</b> — {val:.2f} L'
+                        f'<div class="rank-bar"><div class="rank-fill" style="width:{min(max(val / max_val, 0.0), 1.0) * 100:.1f}%"></div></div></div>'
+                        for name, val in ranking
+                    )
+                    st.markdown(bars, unsafe_allow_html=True)
+
+        ranking_panel()
 
 # =====================
 # TAB : STATISTIQUES
 # =====================
-with tab_stats:
-    st.subheader("Statistiques")
-
-    if df.empty:
-        st.info("Pas de données pour afficher des statistiques.")
-    else:
-        # Préparation dates
-        df_plot = df.copy()
-        df_plot["date"] = pd.to_datetime(df_plot["date"], errors="coerce")
-        df_plot = df_plot.dropna(subset=["date"])
-        df_plot["day"] = df_plot["date"].dt.date
-
-
-        # =========================
-        # 🏅 Gamification / Records
-        # =========================
-        st.markdown("## 🏅 Hall of Fame")
-
-        df_badge = df.copy()
-        df_badge["date"] = pd.to_datetime(df_badge["date"], errors="coerce")
-        df_badge = df_badge.dropna(subset=["date"])
-        df_badge["day"] = df_badge["date"].dt.date
-
-        # Sécurité
-        df_badge["volume_l"] = pd.to_numeric(df_badge["volume_l"], errors="coerce").fillna(0.0)
-        df_badge["nom"] = df_badge["nom"].fillna("Inconnu")
-        df_badge["boisson"] = df_badge["boisson"].fillna("Autre")
-
-        total_all = float(df_badge["volume_l"].sum())
-
-        # 1) Roi/Reine du comptoir (total)
-        by_person_total = df_badge.groupby("nom", as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
-        king_name = by_person_total.iloc[0]["nom"] if not by_person_total.empty else "-"
-        king_val = float(by_person_total.iloc[0]["volume_l"]) if not by_person_total.empty else 0.0
-
-        # 2) Gros coup (record perso sur un jour)
-        by_person_day = df_badge.groupby(["day", "nom"], as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
-        best_day = by_person_day.iloc[0]["day"] if not by_person_day.empty else "-"
-        best_name = by_person_day.iloc[0]["nom"] if not by_person_day.empty else "-"
-        best_val = float(by_person_day.iloc[0]["volume_l"]) if not by_person_day.empty else 0.0
-
-        # 3) Soirée légendaire (record collectif sur un jour)
-        by_day_total = df_badge.groupby("day", as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
-        party_day = by_day_total.iloc[0]["day"] if not by_day_total.empty else "-"
-        party_val = float(by_day_total.iloc[0]["volume_l"]) if not by_day_total.empty else 0.0
-
-        # 4) Explorateur (nb types de boissons)
-        by_diversity = df_badge.groupby("nom", as_index=False)["boisson"].nunique().sort_values("boisson", ascending=False)
-        explorer_name = by_diversity.iloc[0]["nom"] if not by_diversity.empty else "-"
-        explorer_val = int(by_diversity.iloc[0]["boisson"]) if not by_diversity.empty else 0
-
-        # 5) Boisson reine (volume total par boisson)
-        by_drink = df_badge.groupby("boisson", as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
-        top_drink = by_drink.iloc[0]["boisson"] if not by_drink.empty else "-"
-        top_drink_val = float(by_drink.iloc[0]["volume_l"]) if not by_drink.empty else 0.0
-
-        # 6) Régulier (streak jours consécutifs avec conso)
-        def longest_streak(days_list):
-            # days_list: liste de dates python (triées)
-            if not days_list:
-                return 0
-            days_sorted = sorted(days_list)
-            streak = best = 1
-            for i in range(1, len(days_sorted)):
-                if (days_sorted[i] - days_sorted[i-1]).days == 1:
-                    streak += 1
-                else:
-                    best = max(best, streak)
-                    streak = 1
-            return max(best, streak)
-        
-        # 7) Sniper (Shot) - plus gros volume de Shot
-        df_shot = df_badge[df_badge["boisson"] == "Shot"]
-        if df_shot.empty:
-            sniper_name, sniper_val = "-", 0.0
-        else:
-            sniper = (
-                df_shot.groupby("nom", as_index=False)["volume_l"]
-                .sum()
-                .sort_values("volume_l", ascending=False)
-            )
-            sniper_name = sniper.iloc[0]["nom"]
-            sniper_val = float(sniper.iloc[0]["volume_l"])
+if tab_stats.open:
+    with tab_stats, span("tab", tab="statistiques"):
+        st.subheader("Statistiques")
 
-        # 8) Sommelier (Vin) - plus gros volume de Vin
-        df_vin = df_badge[df_badge["boisson"] == "Vin"]
-        if df_vin.empty:
-            sommelier_name, sommelier_val = "-", 0.0
+        rollup = load_daily_rollup(club=club)
+        if rollup.empty:
+            st.info("Pas de données pour afficher des statistiques.")
         else:
-            sommelier = (
-                df_vin.groupby("nom", as_index=False)["volume_l"]
-                .sum()
-                .sort_values("volume_l", ascending=False)
-            )
-            sommelier_name = sommelier.iloc[0]["nom"]
-            sommelier_val = float(sommelier.iloc[0]["volume_l"])
-
 
-        streak_rows = []
-        df_pos = df_badge[df_badge["volume_l"] > 0].copy()
-        for name, g in df_pos.groupby("nom"):
-            days = list(set(g["day"].tolist()))
-            streak_rows.append({"nom": name, "streak": longest_streak(days)})
+            # =========================
+            # 🏅 Gamification / Records
+            # =========================
+            st.markdown("## 🏅 Hall of Fame")
+
+            @st.fragment(run_every=live_every)
+            def hall_of_fame_panel():
+                version, pending = live_state()
+
+                # Badges lus dans les agrégats du backend (seulement les meilleures entrées) ;
+                # "Régulier" est lu dans l'index des séries (maintenu à chaque écriture)
+                hof = cached_query(
+                    "hall_of_fame",
+                    version,
+                    pending_key(pending),
+                    lambda: hall_of_fame(
+                        aggregates_with(pending, club=club), streaks_with(load_streaks(club=club), pending)
+                    ),
+                    club=club,
+                )
 
-        if streak_rows:
-            df_streak = pd.DataFrame(streak_rows).sort_values("streak", ascending=False)
-            regular_name = df_streak.iloc[0]["nom"]
-            regular_val = int(df_streak.iloc[0]["streak"])
-        else:
-            regular_name, regular_val = "-", 0
-
-        # Affichage en cards (simple, lisible sur mobile)
-        c1, c2, c3 = st.columns(3)
-        with c1:
-            st.metric("🍻 Total club", f"{total_all:.2f} L")
-            st.metric("🏆 Roi/Reine du comptoir", f"{king_val:.2f} L", help=f"{king_name}")
-            st.caption(f"👑 **{king_name}**")
-            st.metric("🍷 Sommelier (Vin)", f"{sommelier_val:.2f} L", help=f"{sommelier_name}")
-            st.caption(f"**{sommelier_name}**")
-        with c2:
-            st.metric("⚡ Gros coup (1 jour)", f"{best_val:.2f} L", help=f"{best_name} le {best_day}")
-            st.caption(f"**{best_name}** — {best_day}")
-            st.metric("👥 Soirée légendaire", f"{party_val:.2f} L", help=f"le {party_day}")
-            st.caption(f"📅 **{party_day}**")
-            st.metric("🎯 Sniper (Shot)", f"{sniper_val:.2f} L", help=f"{sniper_name}")
-            st.caption(f"**{sniper_name}**")
-
-        with c3:
-            st.metric("🔥 Régulier", f"{regular_val} jour(s)", help=f"{regular_name}")
-            st.caption(f"**{regular_name}**")
-            st.metric("🧪 Explorateur", f"{explorer_val} boisson(s)", help=f"{explorer_name}")
-            st.caption(f"**{explorer_name}**")
-            st.metric("🍹 Boisson reine", f"{top_drink_val:.2f} L", help=top_drink)
-            st.caption(f"**{top_drink}**")
-
-        st.divider()
-
-
-        # ===========
-        # 1) Courbes par personne (filtre boisson + période + sélection)
-        # ===========
-        st.markdown("### 👥 Consommation par personne (L/jour)")
-
-        colA, colB = st.columns(2)
-        with colA:
-            drink_choice = st.selectbox(
-                "Boisson",
-                ["all"] + DRINK_TYPES,
-                index=0,
-                format_func=lambda x: "🍻 all" if x == "all" else with_emoji(x),
+                total_all = hof["total_l"]
+                king_name, king_val = hof["king"]["nom"], hof["king"]["volume_l"]
+                best_day, best_name, best_val = hof["best_day"]["day"], hof["best_day"]["nom"], hof["best_day"]["volume_l"]
+                party_day, party_val = hof["party"]["day"], hof["party"]["volume_l"]
+                explorer_name, explorer_val = hof["explorer"]["nom"], hof["explorer"]["n_boissons"]
+                top_drink, top_drink_val = hof["top_drink"]["boisson"], hof["top_drink"]["volume_l"]
+                regular_name, regular_val = hof["regular"]["nom"], hof["regular"]["streak"]
+                sniper_name, sniper_val = hof["sniper"]["nom"], hof["sniper"]["volume_l"]
+                sommelier_name, sommelier_val = hof["sommelier"]["nom"], hof["sommelier"]["volume_l"]
+
+                # Affichage en cards (simple, lisible sur mobile)
+                c1, c2, c3 = st.columns(3)
+                with c1:
+                    st.metric("🍻 Total club", f"{total_all:.2f} L")
+                    st.metric("🏆 Roi/Reine du comptoir", f"{king_val:.2f} L", help=f"{king_name}")
+                    st.caption(f"👑 **{king_name}**")
+                    st.metric("🍷 Sommelier (Vin)", f"{sommelier_val:.2f} L", help=f"{sommelier_name}")
+                    st.caption(f"**{sommelier_name}**")
+                with c2:
+                    st.metric("⚡ Gros coup (1 jour)", f"{best_val:.2f} L", help=f"{best_name} le {best_day}")
+                    st.caption(f"**{best_name}** — {best_day}")
+                    st.metric("👥 Soirée légendaire", f"{party_val:.2f} L", help=f"le {party_day}")
+                    st.caption(f"📅 **{party_day}**")
+                    st.metric("🎯 Sniper (Shot)", f"{sniper_val:.2f} L", help=f"{sniper_name}")
+                    st.caption(f"**{sniper_name}**")
+
+                with c3:
+                    st.metric("🔥 Régulier", f"{regular_val} jour(s)", help=f"{regular_name}")
+                    st.caption(f"**{regular_name}**")
+                    st.metric("🧪 Explorateur", f"{explorer_val} boisson(s)", help=f"{explorer_name}")
+                    st.caption(f"**{explorer_name}**")
+                    st.metric("🍹 Boisson reine", f"{top_drink_val:.2f} L", help=top_drink)
+                    st.caption(f"**{top_drink}**")
+
+            hall_of_fame_panel()
+
+            st.divider()
+
+            # =========================
+            # 🔥 Séries (jours consécutifs avec au moins une conso)
+            # =========================
+            st.markdown("## 🔥 Séries")
+
+            today_streaks = datetime.now().date()
+            series = cached_query(
+                "streaks",
+                version,
+                (today_streaks, pending_key(pending)),
+                lambda: streak_views(streaks_with(load_streaks(club=club), pending), today_streaks),
+                club=club,
             )
-        with colB:
-            period_choice = st.selectbox(
-                "Période",
-                ["7 derniers jours", "1 mois", "3 mois", "6 mois", "1 an"],
-                index=1,
-            )
-
-        period_map = {
-            "7 derniers jours": 7,
-            "1 mois": 30,
-            "3 mois": 90,
-            "6 mois": 180,
-            "1 an": 365,
-        }
-        days_back = period_map[period_choice]
-
-        names_available = sorted(df_plot["nom"].dropna().unique().tolist())
-        selected_names = st.multiselect(
-            "Sélectionne les personnes à afficher",
-            names_available,
-            default=names_available[:3] if len(names_available) >= 3 else names_available,
-        )
 
-        if not selected_names:
-            st.info("Sélectionne au moins une personne.")
-        else:
-            # Filtre boisson
-            df2 = df_plot.copy()
-            if drink_choice != "all":
-                df2 = df2[df2["boisson"] == drink_choice]
+            col_active, col_best = st.columns(2)
+            with col_active:
+                st.markdown("### En cours")
+                if not series["active"]:
+                    st.caption("Aucune série en cours (conso hier ou aujourd'hui).")
+                else:
+                    st.dataframe(format_active_streaks(series["active"]), use_container_width=True, hide_index=True)
+            with col_best:
+                st.markdown("### Records")
+                st.dataframe(format_streak_ranking(series["ranking"]), use_container_width=True, hide_index=True)
+
+            st.divider()
+
+
+            # ===========
+            # 1) Courbes par personne (filtre boisson + période + sélection)
+            # ===========
+            st.markdown("### 👥 Consommation par personne (L/jour)")
+
+            colA, colB = st.columns(2)
+            with colA:
+                drink_choice = st.selectbox(
+                    "Boisson",
+                    ["all"] + club_drinks,
+                    index=0,
+                    format_func=lambda x: "🍻 all" if x == "all" else with_emoji(x),
+                )
+            with colB:
+                period_choice = st.selectbox(
+                    "Période",
+                    ["7 derniers jours", "1 mois", "3 mois", "6 mois", "1 an"],
+                    index=1,
+                )
 
-            # Filtre période
-            today = datetime.now().date()
-            start_date = today - pd.Timedelta(days=days_back - 1)
-            df2 = df2[df2["day"] >= start_date]
+            period_map = {
+                "7 derniers jours": 7,
+                "1 mois": 30,
+                "3 mois": 90,
+                "6 mois": 180,
+                "1 an": 365,
+            }
+            days_back = period_map[period_choice]
 
-            # Filtre personnes
-            df2 = df2[df2["nom"].isin(selected_names)]
+            names_available = cached_query("active_names", version, (), lambda: active_names(rollup), club=club)
+            selected_names = st.multiselect(
+                "Sélectionne les personnes à afficher",
+                names_available,
+                default=names_available[:3] if len(names_available) >= 3 else names_available,
+            )
 
-            if df2.empty:
-                st.info("Aucune donnée sur cette période / filtre.")
+            if not selected_names:
+                st.info("Sélectionne au moins une personne.")
             else:
-                # Série journalière par personne (jours manquants = 0)
-                date_index = pd.date_range(start=start_date, end=today, freq="D").date
-                daily_people = (
-                    df2.groupby(["day", "nom"], as_index=False)["volume_l"]
-                    .sum()
+                today = pd.Timestamp(datetime.now().date())
+                start_date = today - pd.Timedelta(days=days_back - 1)
+                backend = chart_backend()
+
+                def build_people_chart():
+                    # seules les cellules (jour, nom, boisson) de la période / du filtre transitent
+                    cells = load_daily_cells(
+                        {
+                            "boisson": None if drink_choice == "all" else drink_choice,
+                            "nom": selected_names,
+                            "date_from": start_date,
+                        },
+                        club=club,
+                    )
+                    pivot = people_series(cells, drink_choice, start_date, today, selected_names)
+                    if pivot is None:
+                        return None
+                    return pivot if backend == "native" else render_people_chart(pivot)
+
+                people_chart = cached_chart(
+                    ("people", version, backend, drink_choice, days_back, tuple(selected_names), today),
+                    build_people_chart,
+                    club=club,
                 )
 
-                pivot = daily_people.pivot(index="day", columns="nom", values="volume_l").reindex(date_index, fill_value=0.0)
-
-                fig2 = plt.figure()
-                ax2 = fig2.add_subplot(111)
-
-                x = pd.to_datetime(pivot.index)
-                for name in selected_names:
-                    if name in pivot.columns:
-                        ax2.plot(x, pivot[name], label=name)
+                if people_chart is None:
+                    st.info("Aucune donnée sur cette période / filtre.")
+                elif backend == "native":
+                    st.line_chart(people_chart)
+                else:
+                    st.image(people_chart)
 
-                ax2.set_ylabel("Litres par jour")
-                ax2.set_xlabel("Date")
-                ax2.legend()
 
-                locator2 = mdates.AutoDateLocator()
-                formatter2 = mdates.ConciseDateFormatter(locator2)
-                ax2.xaxis.set_major_locator(locator2)
-                ax2.xaxis.set_major_formatter(formatter2)
+            # ===========
+            # 2) Cumul total par jour (du début du club à la dernière conso)
+            # ===========
+        st.markdown("### 📈 Volume total cumulé (L) par jour")
 
-                st.pyplot(fig2, clear_figure=True)
+        fixed_start = pd.Timestamp(club_start)
+        backend = chart_backend()
 
+        def build_cumulative_chart():
+            cumul = cumulative_series(load_daily_rollup(club=club), fixed_start)
+            if cumul is None:
+                return None
+            return cumul.to_frame() if backend == "native" else render_cumulative_chart(cumul, fixed_start, cumul.index[-1])
 
-        # ===========
-        # 2) Cumul total par jour (du 09/01/2026 à la dernière conso)
-        # ===========
-    st.markdown("### 📈 Volume total cumulé (L) par jour")
+        cumulative_chart = cached_chart(("cumul", version, backend, fixed_start), build_cumulative_chart, club=club)
 
-    df_plot = df.copy()
-    df_plot["date"] = pd.to_datetime(df_plot["date"], errors="coerce")
-    df_plot = df_plot.dropna(subset=["date"])
-    df_plot["day"] = df_plot["date"].dt.date
+        if cumulative_chart is None:
+            st.info(f"Pas encore de consommations depuis le {club_start:%d/%m/%Y}.")
+        elif backend == "native":
+            st.line_chart(cumulative_chart)
+        else:
+            st.image(cumulative_chart)
 
-    fixed_start = datetime(2026, 1, 9).date()
-    # On veut aller jusqu'à la dernière date où il y a une consommation
-    last_day = df_plot["day"].max()
 
-    if pd.isna(last_day) or last_day < fixed_start:
-        st.info("Pas encore de consommations depuis le 09/01/2026.")
-    else:
-        # Total par jour
-        daily_total = (
-            df_plot.groupby("day", as_index=False)["volume_l"]
-            .sum()
-            .sort_values("day")
+# ==================
+# TAB : SUPPRIMER
+# ==================
+if tab_del.open:
+    with tab_del, span("tab", tab="supprimer"):
+        st.subheader("Retirer une consommation (supprimer une ligne)")
+
+        # Recherche côté serveur : seules les lignes filtrées sont chargées (clé = id)
+        col_n, col_b = st.columns(2)
+        with col_n:
+            del_names = st.multiselect("Nom", club_names, key=f"del_names_{club}")
+        with col_b:
+            del_drinks = st.multiselect("Boisson", club_drinks, format_func=with_emoji, key=f"del_drinks_{club}")
+
+        today_del = datetime.now().date()
+        del_period = st.date_input(
+            "Période",
+            value=(today_del - timedelta(days=DELETE_DEFAULT_DAYS), today_del),
+            key="del_period",
         )
-        # Crée tous les jours entre fixed_start et last_day
-        all_days = pd.date_range(start=fixed_start, end=last_day, freq="D").date
-
-        # Ajoute les jours sans conso à 0
-        daily_total = daily_total.set_index("day").reindex(all_days, fill_value=0.0).reset_index()
-        daily_total = daily_total.rename(columns={"index": "day"})
-
-        # Cumul
-        daily_total["cumul_l"] = daily_total["volume_l"].cumsum()
-
-        # Plot
-        fig1 = plt.figure()
-        ax1 = fig1.add_subplot(111)
-        x = pd.to_datetime(daily_total["day"])
-        y = daily_total["cumul_l"]
-
-        ymax = float(y.max()) if len(y) else 0.0
-        ax1.set_ylim(0, ymax * 1.05 if ymax > 0 else 1)
-
-
-        ax1.plot(x, y)
-        ax1.set_ylabel("Litres (cumul)")
-        ax1.set_xlabel("Date")
-        # Affichage intelligent des dates (au fil des jours -> plus on avance, plus on agrège)
-        days_range = (pd.to_datetime(last_day) - pd.to_datetime(fixed_start)).days
-
-        if days_range <= 31:
-            locator = mdates.DayLocator(interval=2)
-            formatter = mdates.DateFormatter("%d/%m")
-        elif days_range <= 120:
-            locator = mdates.WeekdayLocator(interval=1)
-            formatter = mdates.DateFormatter("%d/%m")
+        # pendant la sélection, date_input ne renvoie qu'une borne
+        del_from, del_to = (tuple(del_period) + (None, None))[:2]
+
+        del_filters = {
+            "nom": del_names or None,
+            "boisson": del_drinks or None,
+            "date_from": del_from,
+            "date_to": del_to,
+        }
+        del_rows, del_total = load_consos_page(0, DELETE_SEARCH_LIMIT, del_filters, club=club)
+        gauge("page_rows", len(del_rows), tab="supprimer")
+
+        if not del_rows:
+            st.caption("Rien à supprimer pour cette recherche.")
         else:
-            locator = mdates.MonthLocator(interval=1)
-            formatter = mdates.DateFormatter("%b %Y")
+            if del_total > len(del_rows):
+                st.caption(f"{len(del_rows)} lignes les plus récentes sur {del_total} : affine la recherche.")
 
-        ax1.xaxis.set_major_locator(locator)
-        ax1.xaxis.set_major_formatter(formatter)
-        fig1.autofmt_xdate()
+            labels_by_id = delete_labels(del_rows)
 
-        st.pyplot(fig1, clear_figure=True)
+            selected_ids = st.multiselect(
+                "Sélectionne les lignes à supprimer",
+                list(labels_by_id),
+                format_func=labels_by_id.get,
+            )
+
+            if st.button("🗑️ Supprimer", type="secondary", disabled=not selected_ids):
+                delete_consos_bulk(selected_ids, club=club)
+                st.success(f"{len(selected_ids)} ligne(s) supprimée(s).")
+                st.rerun()
 
 
 # ==================
-# TAB : SUPPRIMER
+# MESURES (debug)
 # ==================
-with tab_del:
-    st.subheader("Retirer une consommation (supprimer une ligne)")
-
-    if df.empty:
-        st.caption("Rien à supprimer.")
-    else:
-        # sécurisation pour affichage
-        df_del = df.copy()
-        df_del["nb"] = df_del["nb"].fillna(0).astype(int)
-        df_del["dose_ml"] = df_del["dose_ml"].fillna(0).astype(int)
-        df_del["volume_l"] = df_del["volume_l"].fillna(0.0).astype(float)
-
-        labels = (
-            df_del["date"].astype(str)
-            + " — " + df_del["nom"].astype(str)
-            + " — " + df_del["boisson"].map(with_emoji).astype(str)
-            + " — " + df_del["nb"].astype(str)
-            + " × " + df_del["dose_ml"].astype(str) + "ml"
-            + " (" + df_del["volume_l"].round(2).astype(str) + "L)"
-        ).tolist()
-
-        id_map = dict(zip(labels, df_del["id"].tolist()))
-
-        selected = st.selectbox("Sélectionne une ligne à supprimer", labels)
-
-        if st.button("🗑️ Supprimer", type="secondary"):
-            target_id = id_map[selected]
-            delete_conso(target_id)
-            st.success("Ligne supprimée.")
-            st.rerun()
+# Un st.stop() / st.rerun() plus haut interrompt le rerun : il n'est alors pas chronométré.
+observe("rerun", time.perf_counter() - rerun_t0)
+write_textfile()
+
+if str(setting("DEBUG_PANEL", "0")).lower() in ("1", "true", "on") or st.query_params.get("debug") == "1":
+    with st.expander("⏱️ Mesures de ce rerun"):
+        records = pd.DataFrame(run_records())
+        if records.empty:
+            st.caption("Aucune mesure.")
+        else:
+            spans = records[records["kind"] == "span"].drop(columns="kind")
+            spans["value"] = (spans["value"] * 1000).round(2)
+            st.dataframe(spans.rename(columns={"value": "ms"}).fillna(""), use_container_width=True, hide_index=True)
+            others = records[records["kind"] != "span"]
+            if not others.empty:
+                st.dataframe(others.fillna(""), use_container_width=True, hide_index=True)
+        st.code(prometheus_text(), language="text")
@@ -0,0 +1,670 @@
+# backends.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from datetime import datetime, timezone
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+import json
+import os
+import sqlite3
+import threading
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from clubs import DEFAULT_CLUB, legacy_club
+from config import required, setting
+from metrics import count, observe, span
+
+
+# Moteurs de stockage des consos. storage.py garde le cache, la synchro
+# incrémentale et le snapshot ; un backend ne fait que lire / écrire les lignes.
+# Choix par config : STORAGE_BACKEND = "supabase" (défaut) ou "sqlite".
+# Un backend est lié à un club (clubs.py) : toutes ses lectures, écritures et
+# agrégats ne portent que sur la partition de ce club (colonne club, en tête des index).
+BACKENDS = ("supabase", "sqlite")
+PAGE_COLUMNS = "id,date,nom,boisson,nb,dose_ml,volume_l"
+DAILY_COLUMNS = "day,nom,boisson,volume_l"
+CHANGES_KEEP = 10000  # entrées gardées dans le journal de changements
+
+_BACKEND_LOCK = threading.Lock()
+_backends: Dict[str, "Backend"] = {}  # club -> backend
+
+
+class Backend(ABC):
+    # fetch_page est trié date desc puis created_at desc ; les autres lectures n'ont pas
+    # d'ordre garanti (storage trie à l'affichage, voir _frame_to_rows).
+
+    name = ""
+    club = DEFAULT_CLUB
+
+    @abstractmethod
+    def fetch_all(self) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def fetch_since(self, high_water: str) -> List[Dict[str, Any]]:
+        # lignes dont created_at > high_water (ordre created_at croissant)
+        ...
+
+    @abstractmethod
+    def count(self) -> int:
+        ...
+
+    @abstractmethod
+    def fetch_ids(self) -> List[str]:
+        ...
+
+    @abstractmethod
+    def fetch_by_ids(self, ids: List[str]) -> List[Dict[str, Any]]:
+        ...
+
+    @abstractmethod
+    def fetch_page(
+        self, offset: int, limit: int, filters: Optional[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        # une page (colonnes PAGE_COLUMNS) + nombre total de lignes filtrées
+        ...
+
+    @abstractmethod
+    def fetch_batch(
+        self, after: Optional[str], limit: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        # lignes complètes triées par id, d'id > after (pagination par clé : stable
+        # même si la table change pendant le parcours, sans OFFSET coûteux)
+        ...
+
+    @abstractmethod
+    def fetch_daily(self, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # cellules {"day", "nom", "boisson", "volume_l"} filtrées, calculées par le moteur ;
+        # une même cellule peut revenir plusieurs fois, volume_l peut manquer (nb / dose_ml
+        # fournis) : storage complète et fait la somme
+        ...
+
+    @abstractmethod
+    def insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # insère en ignorant les ids déjà présents ; renvoie les lignes créées (avec created_at)
+        ...
+
+    @abstractmethod
+    def delete(self, ids: List[str]) -> None:
+        ...
+
+    def aggregates(self) -> Optional[Dict[str, Any]]:
+        # agrégats calculés par le moteur, ou None (storage calcule alors en Python)
+        return None
+
+    def latest_change(self) -> Optional[int]:
+        # dernier numéro du journal de changements, ou None si le moteur n'en a pas
+        return None
+
+    def fetch_changes(self, after: int, limit: int) -> List[Dict[str, Any]]:
+        # événements {"seq", "op" ("INSERT" / "DELETE"), "id", "record"} de numéro > after
+        return []
+
+
+def _iso_day(value: Any) -> str:
+    return value.isoformat()[:10] if hasattr(value, "isoformat") else str(value)[:10]
+
+
+# =====================
+# Supabase (PostgREST)
+# =====================
+
+# Session HTTP partagée (keep-alive + pool de connexions + retries)
+_SESSION_LOCK = threading.Lock()
+_session: Optional[requests.Session] = None
+DEFAULT_CONNECT_TIMEOUT = 3.05
+DEFAULT_READ_TIMEOUT = 20.0
+DEFAULT_POOL_MAXSIZE = 16
+DEFAULT_MAX_RETRIES = 3
+DEFAULT_PAGE_SIZE = 1000  # = max-rows par défaut de PostgREST sur Supabase
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+
+
+def _headers() -> Dict[str, str]:
+    key = required("SUPABASE_ANON_KEY")
+    return {
+        "apikey": key,
+        "Authorization": f"Bearer {key}",
+        "Content-Type": "application/json",
+    }
+
+
+def _rest_url() -> str:
+    return required("SUPABASE_URL").rstrip("/") + "/rest/v1"
+
+
+def _base_url() -> str:
+    return _rest_url() + "/consos"
+
+
+def _timeout() -> Tuple[float, float]:
+    # (connexion, lecture) : on échoue vite si le serveur est injoignable
+    return (
+        float(setting("HTTP_CONNECT_TIMEOUT", DEFAULT_CONNECT_TIMEOUT)),
+        float(setting("HTTP_READ_TIMEOUT", DEFAULT_READ_TIMEOUT)),
+    )
+
+
+def _observe_response(r: requests.Response, *args: Any, **kwargs: Any) -> None:
+    # durée (jusqu'aux en-têtes) et taille de chaque réponse, par table / fonction RPC
+    endpoint = urlparse(r.url).path.rsplit("/", 1)[-1]
+    observe(
+        "http_request",
+        r.elapsed.total_seconds(),
+        method=r.request.method,
+        endpoint=endpoint,
+        status=r.status_code,
+    )
+    count("http_response_bytes", len(r.content), endpoint=endpoint)
+
+
+def _build_session() -> requests.Session:
+    # Retries bornés avec backoff exponentiel + jitter sur 429/5xx.
+    # POST est rejouable : les ids sont générés côté client et l'insert ignore
+    # les doublons (voir SupabaseBackend.insert).
+    retry = Retry(
+        total=int(setting("HTTP_MAX_RETRIES", DEFAULT_MAX_RETRIES)),
+        backoff_factor=0.3,
+        backoff_jitter=0.3,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"GET", "HEAD", "POST", "DELETE"}),
+        respect_retry_after_header=True,
+        raise_on_status=False,
+    )
+    pool_maxsize = int(setting("HTTP_POOL_MAXSIZE", DEFAULT_POOL_MAXSIZE))
+    adapter = HTTPAdapter(pool_connections=2, pool_maxsize=pool_maxsize, max_retries=retry)
+
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    session.headers.update(_headers())
+    session.hooks["response"].append(_observe_response)
+    return session
+
+
+def _http() -> requests.Session:
+    global _session
+    with _SESSION_LOCK:
+        if _session is None:
+            _session = _build_session()
+        return _session
+
+
+def reset_http_session() -> None:
+    global _session
+    with _SESSION_LOCK:
+        if _session is not None:
+            _session.close()
+        _session = None
+
+
+def _in_list(values: Iterable[Any]) -> str:
+    # in.("a","b") : guillemets pour les noms avec espaces / virgules
+    quoted = ['"' + str(v).replace('"', '\\"') + '"' for v in values]
+    return "in.(" + ",".join(quoted) + ")"
+
+
+def _filter_params(filters: Optional[Dict[str, Any]], day_column: str = "date") -> List[Tuple[str, str]]:
+    # filtres -> paramètres PostgREST (liste : la même colonne peut apparaître 2 fois)
+    # nom / boisson : valeur (eq) ou liste (in) ; date_from / date_to : bornes incluses
+    # sur day_column ("day" pour le rollup public.consos_daily)
+    params: List[Tuple[str, str]] = []
+    if not filters:
+        return params
+    for col in ("nom", "boisson"):
+        value = filters.get(col)
+        if value is None:
+            continue
+        if isinstance(value, (list, tuple, set)):
+            params.append((col, _in_list(sorted(value))))
+        else:
+            params.append((col, f"eq.{value}"))
+    if filters.get("date_from") is not None:
+        params.append((day_column, f"gte.{_iso_day(filters['date_from'])}"))
+    if filters.get("date_to") is not None:
+        params.append((day_column, f"lte.{_iso_day(filters['date_to'])}"))
+    return params
+
+
+def _page_size() -> int:
+    return int(setting("HTTP_PAGE_SIZE", DEFAULT_PAGE_SIZE))
+
+
+def _parse_total(content_range: Optional[str]) -> int:
+    # "0-49/1234" ou "*/1234"
+    total = (content_range or "*/0").rsplit("/", 1)[-1]
+    return int(total) if total.isdigit() else 0
+
+
+class SupabaseBackend(Backend):
+    name = "supabase"
+
+    def __init__(self, club: str = DEFAULT_CLUB) -> None:
+        self.club = club
+        self._scope = ("club", f"eq.{club}")  # ajouté à chaque lecture / suppression
+        self._rpc_available = True  # passe à False si la fonction SQL n'est pas déployée
+        self._daily_available = True  # idem pour la table public.consos_daily
+
+    # PostgREST plafonne chaque réponse à max-rows (1000 par défaut sur Supabase) : les
+    # lectures non bornées passent par des pages, jusqu'à une page vide (une page courte
+    # ne prouve rien si le plafond du serveur est plus bas que HTTP_PAGE_SIZE).
+
+    def _get_by_id(self, params: List[Tuple[str, str]]) -> List[Dict[str, Any]]:
+        # lignes de consos filtrées, par pages triées par id (id=gt.<dernier>) : stable
+        # même si la table change pendant la lecture
+        rows: List[Dict[str, Any]] = []
+        after: Optional[str] = None
+        while True:
+            page_params = params + [self._scope, ("order", "id.asc"), ("limit", str(_page_size()))]
+            if after is not None:
+                page_params.append(("id", f"gt.{after}"))
+            r = _http().get(_base_url(), params=page_params, timeout=_timeout())
+            r.raise_for_status()
+            page = r.json()
+            if not page:
+                return rows
+            rows.extend(page)
+            after = str(page[-1]["id"])
+
+    def _get_pages(
+        self, url: str, params: List[Tuple[str, str]], order: str, missing_ok: bool = False
+    ) -> Optional[List[Dict[str, Any]]]:
+        # toutes les lignes par pages limit / offset (order : tri total, pages stables) ;
+        # None si la table n'existe pas et missing_ok
+        rows: List[Dict[str, Any]] = []
+        while True:
+            page_params = params + [("order", order), ("limit", str(_page_size())), ("offset", str(len(rows)))]
+            r = _http().get(url, params=page_params, timeout=_timeout())
+            if missing_ok and r.status_code == 404:
+                return None
+            r.raise_for_status()
+            page = r.json()
+            if not page:
+                return rows
+            rows.extend(page)
+
+    def fetch_all(self) -> List[Dict[str, Any]]:
+        return self._get_by_id([("select", "*")])
+
+    def fetch_since(self, high_water: str) -> List[Dict[str, Any]]:
+        return self._get_by_id([("select", "*"), ("created_at", f"gt.{high_water}")])
+
+    def count(self) -> int:
+        # HEAD + count=exact : aucune ligne transférée, juste le Content-Range "*/N"
+        headers = {"Prefer": "count=exact"}
+        r = _http().head(_base_url(), headers=headers, params={"select": "id", "club": self._scope[1]}, timeout=_timeout())
+        r.raise_for_status()
+        return _parse_total(r.headers.get("Content-Range"))
+
+    def fetch_ids(self) -> List[str]:
+        # toutes les pages : un id manquant serait pris pour une suppression par _delta_sync
+        return [str(row["id"]) for row in self._get_by_id([("select", "id")])]
+
+    def fetch_by_ids(self, ids: List[str]) -> List[Dict[str, Any]]:
+        params = {"select": "*", "id": "in.(" + ",".join(ids) + ")", "club": self._scope[1]}
+        r = _http().get(_base_url(), params=params, timeout=_timeout())
+        r.raise_for_status()
+        return r.json()
+
+    def fetch_page(
+        self, offset: int, limit: int, filters: Optional[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        params = [("select", PAGE_COLUMNS), ("order", "date.desc,created_at.desc"), self._scope]
+        params += _filter_params(filters)
+        headers = {
+            "Range-Unit": "items",
+            "Range": f"{offset}-{offset + limit - 1}",
+            "Prefer": "count=exact",
+        }
+        r = _http().get(_base_url(), params=params, headers=headers, timeout=_timeout())
+        if r.status_code == 416:  # offset au-delà de la fin
+            return [], _parse_total(r.headers.get("Content-Range"))
+        r.raise_for_status()
+        return r.json(), _parse_total(r.headers.get("Content-Range"))
+
+    def fetch_batch(
+        self, after: Optional[str], limit: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        params = [("select", "*"), ("order", "id.asc"), ("limit", str(limit)), self._scope]
+        params += _filter_params(filters)
+        if after is not None:
+            params.append(("id", f"gt.{after}"))
+        r = _http().get(_base_url(), params=params, timeout=_timeout())
+        r.raise_for_status()
+        return r.json()
+
+    def fetch_daily(self, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # filtres poussés à PostgREST (eq / in / gte / lte) sur le rollup tenu par trigger
+        # (sql/daily_rollup.sql) : seules les cellules demandées transitent
+        if self._daily_available:
+            params = [("select", DAILY_COLUMNS), self._scope] + _filter_params(filters, day_column="day")
+            cells = self._get_pages(_rest_url() + "/consos_daily", params, "day,nom,boisson", missing_ok=True)
+            if cells is not None:
+                return cells
+            self._daily_available = False  # table pas (encore) déployée
+        # sinon : lignes filtrées de consos, seulement les colonnes utiles (date renommée en day)
+        params = [("select", "day:date,nom,boisson,volume_l,nb,dose_ml"), ("date", "not.is.null"), self._scope]
+        params += _filter_params(filters)
+        return self._get_pages(_base_url(), params, "id") or []
+
+    def insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        # un POST (tableau JSON) ; ignore-duplicates : un retry après un insert
+        # déjà passé ne fait rien
+        headers = {"Prefer": "return=representation,resolution=ignore-duplicates"}
+        rows = [{**row, "club": self.club} for row in rows]
+        r = _http().post(_base_url(), headers=headers, json=rows, timeout=_timeout())
+        r.raise_for_status()
+        return r.json() if r.content else []
+
+    def delete(self, ids: List[str]) -> None:
+        params = {"id": "in.(" + ",".join(ids) + ")", "club": self._scope[1]}
+        r = _http().delete(_base_url(), params=params, timeout=_timeout())
+        r.raise_for_status()
+
+    def aggregates(self) -> Optional[Dict[str, Any]]:
+        # quelques centaines d'octets via la fonction SQL public.consos_aggregates(p_club)
+        if not self._rpc_available:
+            return None
+        url = _rest_url() + "/rpc/consos_aggregates"
+        r = _http().post(url, json={"p_club": self.club}, timeout=_timeout())
+        if r.status_code == 404:  # fonction SQL pas (encore) déployée
+            self._rpc_available = False
+            return None
+        r.raise_for_status()
+        return r.json()
+
+    def _changes(self, params: Dict[str, Any]) -> Optional[List[Dict[str, Any]]]:
+        r = _http().get(_rest_url() + "/consos_changes", params=params, timeout=_timeout())
+        if r.status_code == 404:  # table consos_changes pas déployée (sql/change_feed.sql)
+            return None
+        r.raise_for_status()
+        return r.json()
+
+    def latest_change(self) -> Optional[int]:
+        rows = self._changes({"select": "seq", "order": "seq.desc", "limit": 1, "club": self._scope[1]})
+        if rows is None:
+            return None
+        return int(rows[0]["seq"]) if rows else 0
+
+    def fetch_changes(self, after: int, limit: int) -> List[Dict[str, Any]]:
+        params = {
+            "select": "seq,op,conso_id,record",
+            "seq": f"gt.{after}",
+            "order": "seq.asc",
+            "limit": limit,
+            "club": self._scope[1],
+        }
+        rows = self._changes(params) or []
+        return [
+            {"seq": int(row["seq"]), "op": row["op"], "id": str(row["conso_id"]), "record": row.get("record")}
+            for row in rows
+        ]
+
+
+# =====================
+# SQLite (déploiement mono-machine, tests de charge)
+# =====================
+
+DEFAULT_SQLITE_PATH = os.path.join(".cache", "consos.sqlite3")
+
+_SQLITE_TABLES = """
+create table if not exists consos (
+    id text primary key,
+    date text,
+    nom text,
+    boisson text,
+    nb integer,
+    dose_ml integer,
+    volume_l real,
+    created_at text not null,
+    club text not null default 'default'
+);
+create table if not exists consos_changes (
+    seq integer primary key autoincrement,
+    op text not null,
+    conso_id text not null,
+    record text,
+    club text not null default 'default'
+);
+"""
+
+# après la migration (colonne club) : index préfixés par club, une partition = une plage
+# d'index ; triggers recréés pour tracer le club de chaque changement
+_SQLITE_INDEXES = """
+drop index if exists consos_date_created_at_idx;
+drop index if exists consos_nom_date_idx;
+drop index if exists consos_boisson_date_idx;
+drop index if exists consos_created_at_idx;
+create index if not exists consos_club_date_created_at_idx on consos (club, date desc, created_at desc);
+create index if not exists consos_club_nom_date_idx on consos (club, nom, date);
+create index if not exists consos_club_boisson_date_idx on consos (club, boisson, date);
+create index if not exists consos_club_created_at_idx on consos (club, created_at);
+create index if not exists consos_changes_club_seq_idx on consos_changes (club, seq);
+
+drop trigger if exists consos_changes_insert;
+drop trigger if exists consos_changes_delete;
+create trigger consos_changes_insert after insert on consos begin
+    insert into consos_changes (op, conso_id, record, club) values (
+        'INSERT', new.id,
+        json_object(
+            'id', new.id, 'date', new.date, 'nom', new.nom, 'boisson', new.boisson, 'nb', new.nb,
+            'dose_ml', new.dose_ml, 'volume_l', new.volume_l, 'created_at', new.created_at,
+            'club', new.club
+        ),
+        new.club
+    );
+    delete from consos_changes where seq <= (select max(seq) from consos_changes) - %d;
+end;
+create trigger consos_changes_delete after delete on consos begin
+    insert into consos_changes (op, conso_id, club) values ('DELETE', old.id, old.club);
+    delete from consos_changes where seq <= (select max(seq) from consos_changes) - %d;
+end;
+""" % (CHANGES_KEEP, CHANGES_KEEP)
+
+_SQLITE_COLUMNS = ("id", "date", "nom", "boisson", "nb", "dose_ml", "volume_l", "created_at", "club")
+
+
+def _now_iso() -> str:
+    # même format que les timestamptz renvoyés par PostgREST
+    return datetime.now(timezone.utc).isoformat(timespec="microseconds")
+
+
+# libellé des nom / boisson manquants ou vides (storage._label, sql/daily_rollup.sql)
+_SQL_LABELS = {"nom": "Inconnu", "boisson": "Autre"}
+
+
+def _sql_filters(club: str, filters: Optional[Dict[str, Any]], labeled: bool = False) -> Tuple[str, List[Any]]:
+    # mêmes filtres que _filter_params, en clause WHERE paramétrée, toujours limitée au club.
+    # labeled : nom / boisson comparés au libellé (coalesce(nullif(col, ''), défaut)) comme
+    # dans le rollup, "Inconnu" couvre alors les noms manquants ; écrit sans l'expression
+    # pour garder les index (club, col, date) utilisables
+    clauses: List[str] = ["club = ?"]
+    args: List[Any] = [club]
+    for col in ("nom", "boisson"):
+        value = (filters or {}).get(col)
+        if value is None:
+            continue
+        values = sorted(value) if isinstance(value, (list, tuple, set)) else [value]
+        clause = f"{col} in ({','.join('?' * len(values))})" if len(values) != 1 else f"{col} = ?"
+        if labeled and _SQL_LABELS[col] in values:
+            clause = f"({clause} or {col} is null or {col} = '')"
+        clauses.append(clause)
+        args.extend(values)
+    if (filters or {}).get("date_from") is not None:
+        clauses.append("date >= ?")
+        args.append(_iso_day(filters["date_from"]))
+    if (filters or {}).get("date_to") is not None:
+        clauses.append("date <= ?")
+        args.append(_iso_day(filters["date_to"]))
+    return " where " + " and ".join(clauses), args
+
+
+class SQLiteBackend(Backend):
+    name = "sqlite"
+
+    def __init__(self, path: str, club: str = DEFAULT_CLUB) -> None:
+        self.path = path
+        self.club = club
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        conn = self._connect()
+        try:
+            conn.executescript(_SQLITE_TABLES)
+            # base d'avant les clubs : les lignes existantes vont au club par défaut, puis
+            # au club LEGACY_CLUB s'il est configuré autrement (clubs.legacy_club)
+            legacy = legacy_club()
+            with conn:
+                for table in ("consos", "consos_changes"):
+                    columns = {row["name"] for row in conn.execute(f"pragma table_info({table})")}
+                    if "club" not in columns:
+                        conn.execute(f"alter table {table} add column club text not null default '{DEFAULT_CLUB}'")
+                    if legacy != DEFAULT_CLUB:
+                        conn.execute(f"update {table} set club = ? where club = ?", (legacy, DEFAULT_CLUB))
+            conn.executescript(_SQLITE_INDEXES)
+        finally:
+            conn.close()
+
+    def _connect(self) -> sqlite3.Connection:
+        # une connexion par appel : sessions Streamlit = threads différents
+        conn = sqlite3.connect(self.path, timeout=10.0)
+        conn.row_factory = sqlite3.Row
+        conn.execute("pragma journal_mode=wal")
+        return conn
+
+    def _query(self, sql: str, args: Iterable[Any] = ()) -> List[Dict[str, Any]]:
+        conn = self._connect()
+        try:
+            with span("sqlite_query"):
+                rows = [dict(row) for row in conn.execute(sql, list(args))]
+            count("sqlite_rows", len(rows))
+            return rows
+        finally:
+            conn.close()
+
+    def fetch_all(self) -> List[Dict[str, Any]]:
+        return self._query("select * from consos where club = ? order by date desc, created_at desc", (self.club,))
+
+    def fetch_since(self, high_water: str) -> List[Dict[str, Any]]:
+        return self._query(
+            "select * from consos where club = ? and created_at > ? order by created_at", (self.club, high_water)
+        )
+
+    def count(self) -> int:
+        return int(self._query("select count(*) as n from consos where club = ?", (self.club,))[0]["n"])
+
+    def fetch_ids(self) -> List[str]:
+        return [row["id"] for row in self._query("select id from consos where club = ?", (self.club,))]
+
+    def fetch_by_ids(self, ids: List[str]) -> List[Dict[str, Any]]:
+        marks = ",".join("?" * len(ids))
+        return self._query(f"select * from consos where club = ? and id in ({marks})", [self.club] + ids)
+
+    def fetch_page(
+        self, offset: int, limit: int, filters: Optional[Dict[str, Any]]
+    ) -> Tuple[List[Dict[str, Any]], int]:
+        where, args = _sql_filters(self.club, filters)
+        total = int(self._query(f"select count(*) as n from consos{where}", args)[0]["n"])
+        rows = self._query(
+            f"select {PAGE_COLUMNS} from consos{where} order by date desc, created_at desc limit ? offset ?",
+            args + [limit, offset],
+        )
+        return rows, total
+
+    def fetch_batch(
+        self, after: Optional[str], limit: int, filters: Optional[Dict[str, Any]] = None
+    ) -> List[Dict[str, Any]]:
+        where, args = _sql_filters(self.club, filters)
+        if after is not None:
+            where += " and id > ?"
+            args.append(after)
+        return self._query(f"select * from consos{where} order by id limit ?", args + [limit])
+
+    def fetch_daily(self, filters: Optional[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        where, args = _sql_filters(self.club, filters, labeled=True)
+        where += " and date is not null"
+        return self._query(
+            "select substr(date, 1, 10) as day, coalesce(nullif(nom, ''), 'Inconnu') as nom, "
+            "coalesce(nullif(boisson, ''), 'Autre') as boisson, "
+            "sum(coalesce(volume_l, coalesce(nb, 0) * coalesce(dose_ml, 0) / 1000.0)) as volume_l "
+            f"from consos{where} group by 1, 2, 3",
+            args,
+        )
+
+    def insert(self, rows: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        created: List[Dict[str, Any]] = []
+        conn = self._connect()
+        try:
+            with conn:
+                for row in rows:
+                    values = {
+                        **{col: row.get(col) for col in _SQLITE_COLUMNS},
+                        "created_at": _now_iso(),
+                        "club": self.club,
+                    }
+                    values["id"] = str(values["id"])
+                    cursor = conn.execute(
+                        f"insert or ignore into consos ({','.join(_SQLITE_COLUMNS)}) "
+                        f"values ({','.join('?' * len(_SQLITE_COLUMNS))})",
+                        [values[col] for col in _SQLITE_COLUMNS],
+                    )
+                    if cursor.rowcount:
+                        created.append(values)
+        finally:
+            conn.close()
+        return created
+
+    def delete(self, ids: List[str]) -> None:
+        conn = self._connect()
+        try:
+            with conn:
+                conn.execute(
+                    f"delete from consos where club = ? and id in ({','.join('?' * len(ids))})", [self.club] + ids
+                )
+        finally:
+            conn.close()
+
+    def latest_change(self) -> Optional[int]:
+        rows = self._query("select coalesce(max(seq), 0) as seq from consos_changes where club = ?", (self.club,))
+        return int(rows[0]["seq"])
+
+    def fetch_changes(self, after: int, limit: int) -> List[Dict[str, Any]]:
+        rows = self._query(
+            "select seq, op, conso_id, record from consos_changes where club = ? and seq > ? order by seq limit ?",
+            (self.club, after, limit),
+        )
+        return [
+            {
+                "seq": row["seq"],
+                "op": row["op"],
+                "id": row["conso_id"],
+                "record": json.loads(row["record"]) if row["record"] else None,
+            }
+            for row in rows
+        ]
+
+
+def _build_backend(club: str) -> Backend:
+    name = str(setting("STORAGE_BACKEND", "supabase")).lower()
+    if name not in BACKENDS:
+        raise ValueError(f"STORAGE_BACKEND inconnu : {name} (attendu : {', '.join(BACKENDS)})")
+    if name == "sqlite":
+        return SQLiteBackend(str(setting("SQLITE_PATH", DEFAULT_SQLITE_PATH)), club)
+    return SupabaseBackend(club)
+
+
+def get_backend(club: str = DEFAULT_CLUB) -> Backend:
+    with _BACKEND_LOCK:
+        backend = _backends.get(club)
+        if backend is None:
+            backend = _backends[club] = _build_backend(club)
+        return backend
+
+
+def reset_backend() -> None:
+    # relit STORAGE_BACKEND au prochain appel (tests, changement de config)
+    with _BACKEND_LOCK:
+        _backends.clear()
+    reset_http_session()
@@ -0,0 +1,97 @@
+# benchmarks/bench_hall_of_fame.py
+# Usage : python benchmarks/bench_hall_of_fame.py [--sizes 10000 100000] [--pending 20] [--legacy]
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.update(STORAGE_BACKEND="sqlite", CONSOS_SNAPSHOT_PATH="", OUTBOX_PATH="")
+
+from analytics import hall_of_fame, streaks_with  # noqa: E402
+from backends import get_backend, reset_backend  # noqa: E402
+from storage import aggregates_with, invalidate_cache, load_consos_df, load_streaks  # noqa: E402
+from synthetic import synthetic_consos  # noqa: E402
+
+
+def legacy_hall_of_fame(df: pd.DataFrame) -> None:
+    # version d'origine d'app.py (un groupby + sort_values par badge, streak en boucle Python)
+    df_badge = df.copy()
+    df_badge["date"] = pd.to_datetime(df_badge["date"], errors="coerce")
+    df_badge = df_badge.dropna(subset=["date"])
+    df_badge["day"] = df_badge["date"].dt.date
+    df_badge["volume_l"] = pd.to_numeric(df_badge["volume_l"], errors="coerce").fillna(0.0)
+    df_badge["nom"] = df_badge["nom"].fillna("Inconnu")
+    df_badge["boisson"] = df_badge["boisson"].fillna("Autre")
+    df_badge.groupby("nom", as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
+    df_badge.groupby(["day", "nom"], as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
+    df_badge.groupby("day", as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
+    df_badge.groupby("nom", as_index=False)["boisson"].nunique().sort_values("boisson", ascending=False)
+    df_badge.groupby("boisson", as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
+    for drink in ("Shot", "Vin"):
+        sub = df_badge[df_badge["boisson"] == drink]
+        sub.groupby("nom", as_index=False)["volume_l"].sum().sort_values("volume_l", ascending=False)
+    for _, g in df_badge[df_badge["volume_l"] > 0].groupby("nom"):
+        days = sorted(set(g["day"].tolist()))
+        streak = best = 1
+        for i in range(1, len(days)):
+            if (days[i] - days[i - 1]).days == 1:
+                streak += 1
+            else:
+                best = max(best, streak)
+                streak = 1
+
+
+def _fill_store(df: pd.DataFrame) -> None:
+    # base SQLite neuve remplie hors chrono, cache chargé
+    os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="bench-hof-"), "consos.sqlite3")
+    reset_backend()
+    invalidate_cache()
+    rows = df.drop(columns=["created_at"]).to_dict("records")
+    for i in range(0, len(rows), 5000):
+        get_backend().insert(rows[i:i + 5000])
+    load_consos_df(force=True)
+
+
+def app_hall_of_fame(pending: list) -> None:
+    # chemin de l'app (hall_of_fame_panel) : agrégats du cache + ajouts en file d'envoi
+    hall_of_fame(aggregates_with(pending), streaks_with(load_streaks(), pending))
+
+
+def _time(fn, arg, repeat: int) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - t0)
+    return best
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du Hall of Fame")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10_000, 100_000])
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--pending", type=int, default=20, help="ajouts en file d'envoi")
+    parser.add_argument("--legacy", action="store_true", help="mesure aussi l'implémentation d'origine")
+    args = parser.parse_args()
+
+    print(f"{'lignes':>10}  {'cache (ms)':>12}  {'+ file (ms)':>12}  {'legacy (ms)':>12}")
+    for n in args.sizes:
+        df = synthetic_consos(n + args.pending)
+        _fill_store(df.iloc[:n])
+        pending = df.iloc[n:].to_dict("records")
+        app_hall_of_fame([])  # agrégats calculés une fois, comme au premier rendu
+        cached_ms = _time(app_hall_of_fame, [], args.repeat) * 1000
+        pending_ms = _time(app_hall_of_fame, pending, args.repeat) * 1000
+        legacy_ms = _time(legacy_hall_of_fame, df, args.repeat) * 1000 if args.legacy else float("nan")
+        print(f"{n:>10}  {cached_ms:>12.1f}  {pending_ms:>12.1f}  {legacy_ms:>12.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,288 @@
+# benchmarks/bench_pipeline.py
+# Usage : python benchmarks/bench_pipeline.py [--sizes 1000 100000 1000000] [--check] [--save-baseline]
+# Chronomètre chaque étape du pipeline de l'app sur des consos synthétiques,
+# écrit les résultats en JSON et signale les régressions par rapport à une baseline.
+# --check ne compare qu'à une baseline mesurée dans le même environnement (machine,
+# Python, pandas, nombre de CPU) avec au plus autant de runs par étape ; une étape
+# signalée est remesurée dans le même run et n'échoue que si elle régresse encore.
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import pandas as pd
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+from analytics import cumulative_series, hall_of_fame, people_series  # noqa: E402
+from constants import DRINK_TYPES, NAMES  # noqa: E402
+from formatting import delete_labels, format_history  # noqa: E402
+from leaderboard import Leaderboard  # noqa: E402
+from storage import (  # noqa: E402
+    _board_cells,
+    _commit,
+    _frame_to_rows,
+    _merge,
+    _new_partition,
+    _rollup_of,
+    _rollup_rows,
+    _streak_cells,
+    _typed_frame,
+    aggregate_consos,
+)
+from streaks import StreakIndex  # noqa: E402
+from synthetic import synthetic_consos  # noqa: E402
+
+DEFAULT_BASELINE = os.path.join(HERE, "baseline.json")
+DEFAULT_OUTPUT = os.path.join(HERE, "results", "pipeline-latest.json")
+HISTORY_PAGE = 50  # lignes par page de l'Historique
+DELETE_LIMIT = 200  # DELETE_SEARCH_LIMIT d'app.py
+FIXED_START = pd.Timestamp(2026, 1, 9)
+WRITE_ROW = {
+    "id": "bench-write",
+    "date": "2026-03-01",
+    "nom": NAMES[0],
+    "boisson": DRINK_TYPES[0],
+    "nb": 1,
+    "dose_ml": 250,
+    "volume_l": 0.25,
+    "created_at": "2026-03-01T20:00:00+00:00",
+}
+
+
+def _stages(raw: pd.DataFrame) -> List[tuple]:
+    # (nom, fonction) dans l'ordre du pipeline ; chaque étape lit le résultat des précédentes
+    state: Dict[str, Any] = {}
+
+    def load():
+        state["frame"] = _typed_frame(raw)
+
+    def rollup():
+        state["rollup"] = _rollup_of(state["frame"]).sort_index()
+
+    def leaderboard():
+        board = Leaderboard()
+        board.apply_cells(_board_cells(state["rollup"]))
+        for key in ["all"] + DRINK_TYPES:
+            board.ranking(key)
+        state["board"] = board
+
+    def streaks():
+        index = StreakIndex()
+        index.apply_cells(_streak_cells(state["rollup"]))
+        state["streaks"] = index
+
+    def write():
+        # un ajout, comme storage._cache_add : fusion dans le cache puis mise à jour
+        # incrémentale du rollup, du classement et des séries (copiés, pas modifiés)
+        part = _new_partition("bench")
+        part.update(rollup=state["rollup"], leaderboard=state["board"], streaks=state["streaks"])
+        new = _typed_frame([WRITE_ROW])
+        _commit(part, _merge(state["frame"], new), new, state["frame"][state["frame"]["id"].isin(new["id"])])
+
+    def aggregates():
+        state["aggs"] = aggregate_consos(_rollup_rows(state["rollup"]))
+
+    def hall_of_fame_badges():
+        hall_of_fame(state["aggs"])
+
+    def daily_pivot():
+        last = state["rollup"].index.get_level_values("day").max()
+        people_series(state["rollup"], "all", last - pd.Timedelta(days=29), last, NAMES[:3])
+
+    def cumulative():
+        cumulative_series(state["rollup"], FIXED_START)
+
+    def history_format():
+        format_history(_frame_to_rows(state["frame"].head(HISTORY_PAGE)))
+
+    def delete_label():
+        delete_labels(_frame_to_rows(state["frame"].head(DELETE_LIMIT)))
+
+    return [
+        ("load", load),
+        ("rollup", rollup),
+        ("leaderboard", leaderboard),
+        ("streaks", streaks),
+        ("write", write),
+        ("aggregates", aggregates),
+        ("hall_of_fame", hall_of_fame_badges),
+        ("daily_pivot", daily_pivot),
+        ("cumulative", cumulative),
+        ("history_format", history_format),
+        ("delete_labels", delete_label),
+    ]
+
+
+def _sqlite_stage(raw: pd.DataFrame) -> tuple:
+    # lecture complète depuis le moteur SQLite (backends.SQLiteBackend), base remplie hors chrono
+    from backends import SQLiteBackend
+
+    path = os.path.join(tempfile.mkdtemp(prefix="bench-consos-"), "consos.sqlite3")
+    backend = SQLiteBackend(path)
+    rows = raw.drop(columns=["created_at"]).to_dict("records")
+    for i in range(0, len(rows), 5000):
+        backend.insert(rows[i:i + 5000])
+    return ("sqlite_fetch_all", backend.fetch_all)
+
+
+def _time(fn: Callable[[], Any], repeat: int) -> List[float]:
+    fn()  # premier passage (imports, caches froids) hors chrono
+    runs = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        fn()
+        runs.append(time.perf_counter() - t0)
+    return runs
+
+
+ENVIRONMENT_KEYS = ("machine", "python", "pandas", "cpus")
+
+
+def _result(n: int, name: str, runs: List[float]) -> Dict[str, Any]:
+    return {
+        "size": n,
+        "stage": name,
+        "best_ms": round(min(runs) * 1000, 3),
+        "median_ms": round(statistics.median(runs) * 1000, 3),
+        "spread_ms": round((max(runs) - min(runs)) * 1000, 3),
+    }
+
+
+def run(sizes: List[int], repeat: int, seed: int, sqlite: bool, only: Optional[set] = None) -> Dict[str, Any]:
+    # only : {(taille, étape)} à chronométrer ; les autres étapes tournent une fois, sans
+    # chrono, pour préparer l'état des suivantes
+    results = []
+    for n in sizes:
+        raw = synthetic_consos(n, seed=seed)
+        stages = _stages(raw)
+        if sqlite:
+            stages.insert(0, _sqlite_stage(raw))
+        for name, fn in stages:
+            if only is not None and (n, name) not in only:
+                fn()
+                continue
+            runs = _time(fn, repeat)
+            results.append(_result(n, name, runs))
+            print(f"{n:>10}  {name:<18}  {statistics.median(runs) * 1000:>10.2f} ms")
+    return {
+        "meta": {
+            "date": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "pandas": pd.__version__,
+            "machine": platform.platform(),
+            "cpus": os.cpu_count(),
+            "repeat": repeat,
+            "seed": seed,
+        },
+        "results": results,
+    }
+
+
+def comparable(current: Dict[str, Any], baseline: Dict[str, Any]) -> List[str]:
+    # raisons pour lesquelles la baseline ne peut pas servir de référence (vide : comparable)
+    now, ref = current["meta"], baseline.get("meta", {})
+    reasons = [
+        f"{key} : baseline {ref[key]!r}, ici {now[key]!r}"
+        for key in ENVIRONMENT_KEYS
+        if key in ref and ref[key] != now[key]
+    ]
+    if now["repeat"] < ref.get("repeat", 0):
+        reasons.append(f"--repeat {now['repeat']} < {ref['repeat']} runs par étape de la baseline")
+    if ref.get("seed", now["seed"]) != now["seed"]:
+        reasons.append(f"seed : baseline {ref['seed']}, ici {now['seed']}")
+    return reasons
+
+
+def regressions(
+    current: Dict[str, Any], baseline: Dict[str, Any], tolerance: float, min_delta_ms: float
+) -> Dict[tuple, str]:
+    # une étape régresse si sa médiane est plus lente de `tolerance` (relatif) ET d'un écart
+    # absolu supérieur au bruit mesuré : au moins `min_delta_ms`, et plus que l'écart
+    # entre runs (max - min) des deux mesures. Les étapes de quelques ms sur 1 000 lignes
+    # varient d'autant d'un run à l'autre : seul un ralentissement net les signale.
+    ref = {(r["size"], r["stage"]): r for r in baseline.get("results", [])}
+    flagged = {}
+    for r in current["results"]:
+        before = ref.get((r["size"], r["stage"]))
+        if before is None:
+            continue
+        old, new = before["median_ms"], r["median_ms"]
+        noise = max(min_delta_ms, before.get("spread_ms", 0.0) + r.get("spread_ms", 0.0))
+        if new > old * (1 + tolerance) and new - old > noise:
+            flagged[(r["size"], r["stage"])] = (
+                f"{r['stage']} @ {r['size']} lignes : {old:.2f} ms -> {new:.2f} ms (x{new / old:.2f})"
+            )
+    return flagged
+
+
+def _write_json(path: str, data: Dict[str, Any]) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(data, f, indent=2, ensure_ascii=False)
+        f.write("\n")
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark du pipeline de l'app (par étape)")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1_000, 100_000, 1_000_000])
+    parser.add_argument("--repeat", type=int, default=7, help="runs par étape (médiane comparée)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--sqlite", action="store_true", help="mesure aussi la lecture depuis le moteur SQLite")
+    parser.add_argument("--output", default=DEFAULT_OUTPUT, help="résultats JSON")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="remplace la baseline par ces résultats")
+    parser.add_argument("--check", action="store_true", help="code de sortie 1 en cas de régression")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="ralentissement relatif toléré")
+    parser.add_argument("--min-delta-ms", type=float, default=5.0, help="écart absolu minimal signalé")
+    args = parser.parse_args()
+
+    current = run(args.sizes, args.repeat, args.seed, args.sqlite)
+    _write_json(args.output, current)
+    print(f"résultats : {args.output}")
+
+    if args.save_baseline:
+        _write_json(args.baseline, current)
+        print(f"baseline : {args.baseline}")
+        return
+
+    if not os.path.exists(args.baseline):
+        print("pas de baseline (lancer avec --save-baseline)")
+        return
+    with open(args.baseline, encoding="utf-8") as f:
+        baseline = json.load(f)
+    reasons = comparable(current, baseline)
+    for reason in reasons:
+        print(f"BASELINE NON COMPARABLE  {reason}")
+    if reasons and args.check:
+        print("--check refusé : relancer avec les mêmes réglages, ou --save-baseline sur cette machine")
+        sys.exit(2)
+
+    flagged = regressions(current, baseline, args.tolerance, args.min_delta_ms)
+    if flagged:
+        # second passage sur les seules étapes signalées : un pic isolé (autre process,
+        # fréquence CPU) ne suffit pas à faire échouer
+        print(f"remesure de {len(flagged)} étape(s) signalée(s)")
+        sizes = sorted({n for n, _ in flagged})
+        again = run(sizes, args.repeat, args.seed, args.sqlite, only=set(flagged))
+        confirmed = regressions(again, baseline, args.tolerance, args.min_delta_ms)
+        for key, line in flagged.items():
+            print(f"{'RÉGRESSION' if key in confirmed else 'non confirmée'}  {confirmed.get(key, line)}")
+        flagged = confirmed
+    if not flagged:
+        print("aucune régression par rapport à la baseline")
+    if flagged and args.check:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+# benchmarks/synthetic.py
+# Générateur de consos synthétiques réalistes (mêmes colonnes que la table Supabase)
+from __future__ import annotations
+
+import os
+import sys
+
+import numpy as np
+import pandas as pd
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from constants import DOSES, DRINK_TYPES, NAMES, NB_OPTIONS  # noqa: E402
+
+START = np.datetime64("2026-01-09")
+
+# Quelques habitués boivent beaucoup plus que les autres (loi de Zipf tronquée)
+_NAME_WEIGHTS = 1.0 / np.arange(1, len(NAMES) + 1) ** 0.8
+
+# Bière majoritaire, puis vin / shots ; le reste en queue
+_DRINK_WEIGHTS = {
+    "Bière": 40, "Ricard": 6, "Rhum": 6, "Vodka": 5, "Tequilla": 3,
+    "Vin": 18, "Whisky": 4, "Shot": 10, "Cocktail": 6, "Autre": 2,
+}
+
+# Dose selon la boisson (ml) : une bière n'est pas servie en shot
+_DRINK_DOSES = {
+    "Bière": [250, 330, 500, 1000],
+    "Ricard": [20, 50, 200],
+    "Rhum": [20, 50],
+    "Vodka": [20, 50],
+    "Tequilla": [20, 50],
+    "Vin": [125, 200, 250],
+    "Whisky": [20, 50],
+    "Shot": [20, 50],
+    "Cocktail": [200, 250, 330],
+    "Autre": sorted(DOSES.values()),
+}
+
+# Plus de consos le week-end (lun..dim, 1970-01-01 était un jeudi)
+_WEEKDAY_WEIGHTS = np.array([0.6, 0.6, 0.8, 1.2, 2.0, 2.4, 1.0])
+
+
+def synthetic_consos(n: int, days: int = 3 * 365, seed: int = 0) -> pd.DataFrame:
+    # n lignes sur `days` jours à partir du 09/01/2026 : id, date (ISO), nom, boisson,
+    # nb, dose_ml, volume_l, created_at (ISO UTC, croissant avec la date)
+    rng = np.random.default_rng(seed)
+
+    day_offsets = np.arange(days)
+    weekday = (START + day_offsets.astype("timedelta64[D]")).astype("datetime64[D]").view("int64")
+    day_weights = _WEEKDAY_WEIGHTS[(weekday + 3) % 7]
+    day = np.sort(rng.choice(day_offsets, n, p=day_weights / day_weights.sum()))
+    dates = START + day.astype("timedelta64[D]")
+
+    name_weights = rng.permutation(_NAME_WEIGHTS)
+    names = rng.choice(NAMES, n, p=name_weights / name_weights.sum())
+    drink_weights = np.array([_DRINK_WEIGHTS.get(d, 1) for d in DRINK_TYPES], dtype=float)
+    drinks = rng.choice(DRINK_TYPES, n, p=drink_weights / drink_weights.sum())
+
+    dose = np.empty(n, dtype=np.int64)
+    for drink in DRINK_TYPES:
+        mask = drinks == drink
+        dose[mask] = rng.choice(_DRINK_DOSES.get(drink, sorted(DOSES.values())), int(mask.sum()))
+    nb = rng.choice(NB_OPTIONS[:4], n, p=[0.7, 0.2, 0.07, 0.03])
+
+    # saisie le soir même, entre 18h et 2h du matin
+    seconds = rng.integers(18 * 3600, 26 * 3600, n)
+    created = dates.astype("datetime64[s]") + seconds.astype("timedelta64[s]")
+    ids = [f"{a:016x}{b:016x}" for a, b in rng.integers(0, 2**63, (n, 2))]
+
+    return pd.DataFrame(
+        {
+            "id": ids,
+            "date": dates.astype(str),
+            "nom": names,
+            "boisson": drinks,
+            "nb": nb,
+            "dose_ml": dose,
+            "volume_l": nb * dose / 1000.0,
+            "created_at": pd.Series(created.astype(str)) + "+00:00",
+        }
+    )
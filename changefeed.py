@@ -0,0 +1,201 @@
+# changefeed.py
+from __future__ import annotations
+
+from abc import ABC, abstractmethod
+from typing import Any, Dict, List, Optional, Tuple
+import threading
+import time
+
+from backends import get_backend
+from clubs import DEFAULT_CLUB
+from config import setting
+from storage import apply_remote_changes
+
+
+# Mises à jour en direct : un thread d'écoute par club et par process lit le journal
+# des changements (insert / delete) du club et les applique à sa partition du cache de storage.
+# Chaque événement = une ligne (ou un id), quel que soit le nombre de sessions ouvertes.
+# La synchro périodique de storage reste le filet de sécurité (événement manqué, coupure).
+# Un club que plus personne ne regarde (aucun ensure_listener depuis CHANGEFEED_IDLE_TIMEOUT)
+# voit son thread s'arrêter ; le prochain rerun le relance depuis la fin du journal.
+DEFAULT_POLL_INTERVAL = 2.0  # secondes entre deux lectures quand le journal est vide
+DEFAULT_IDLE_TIMEOUT = 600.0  # secondes sans ensure_listener avant d'arrêter l'écoute d'un club
+FEED_BATCH = 500
+
+_LISTENER_LOCK = threading.Lock()
+_listeners: Dict[str, Dict[str, Any]] = {}  # club -> état de son thread d'écoute
+
+
+def _listener(club: str) -> Dict[str, Any]:
+    # sous _LISTENER_LOCK
+    listener = _listeners.get(club)
+    if listener is None:
+        listener = _listeners[club] = {
+            "thread": None,
+            "stop": None,
+            "feed": None,
+            "cursor": None,
+            "error": None,
+            "seen_at": 0.0,  # dernier ensure_listener / start_listener (time.monotonic)
+            "unavailable": False,  # le backend n'a pas de journal : inutile de réessayer à chaque rerun
+        }
+    return listener
+
+
+class ChangeFeed(ABC):
+    # Source d'événements {"seq", "op" ("INSERT" / "DELETE"), "id", "record"}, seq croissant.
+
+    @abstractmethod
+    def start_cursor(self) -> Optional[int]:
+        # position de départ (None : pas de flux disponible)
+        ...
+
+    @abstractmethod
+    def poll(self, cursor: int, timeout: float) -> List[Dict[str, Any]]:
+        # événements de seq > cursor ; attend au plus `timeout` secondes s'il n'y en a pas
+        ...
+
+
+class BackendFeed(ChangeFeed):
+    # Long-poll du journal consos_changes du backend (Supabase : sql/change_feed.sql),
+    # limité aux changements du club
+
+    def __init__(self, stop: threading.Event, club: str = DEFAULT_CLUB) -> None:
+        self._stop = stop
+        self._club = club
+
+    def start_cursor(self) -> Optional[int]:
+        return get_backend(self._club).latest_change()
+
+    def poll(self, cursor: int, timeout: float) -> List[Dict[str, Any]]:
+        events = get_backend(self._club).fetch_changes(cursor, FEED_BATCH)
+        if not events:
+            self._stop.wait(timeout)
+        return events
+
+
+class StubFeed(ChangeFeed):
+    # Flux en mémoire (tests, démo locale) : publish() simule un autre client
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._events: List[Dict[str, Any]] = []
+
+    def publish(self, op: str, record: Dict[str, Any]) -> int:
+        with self._cond:
+            seq = len(self._events) + 1
+            self._events.append({"seq": seq, "op": op, "id": str(record["id"]), "record": record})
+            self._cond.notify_all()
+            return seq
+
+    def start_cursor(self) -> Optional[int]:
+        with self._cond:
+            return len(self._events)
+
+    def poll(self, cursor: int, timeout: float) -> List[Dict[str, Any]]:
+        with self._cond:
+            if len(self._events) <= cursor:
+                self._cond.wait(timeout)
+            return self._events[cursor:cursor + FEED_BATCH]
+
+
+def _poll_interval() -> float:
+    return float(setting("CHANGEFEED_POLL_INTERVAL", DEFAULT_POLL_INTERVAL))
+
+
+def _idle_timeout() -> float:
+    return float(setting("CHANGEFEED_IDLE_TIMEOUT", DEFAULT_IDLE_TIMEOUT))
+
+
+def _stop_if_idle(listener: Dict[str, Any]) -> bool:
+    # sous le verrou : ensure_listener ne peut pas voir le thread vivant juste avant qu'il s'arrête
+    with _LISTENER_LOCK:
+        if time.monotonic() - listener["seen_at"] <= _idle_timeout():
+            return False
+        listener["thread"] = None
+        return True
+
+
+def _split(events: List[Dict[str, Any]]) -> Tuple[List[Dict[str, Any]], List[str]]:
+    # dernier événement par id : un ajout suivi d'une suppression s'annule
+    last: Dict[str, Dict[str, Any]] = {}
+    for event in events:
+        last.pop(event["id"], None)
+        last[event["id"]] = event
+    inserted = [e["record"] for e in last.values() if e["op"] == "INSERT" and e.get("record")]
+    deleted = [e["id"] for e in last.values() if e["op"] == "DELETE"]
+    return inserted, deleted
+
+
+def _run(listener: Dict[str, Any], club: str, feed: ChangeFeed, stop: threading.Event) -> None:
+    while not stop.is_set():
+        try:
+            if listener["cursor"] is None:
+                cursor = feed.start_cursor()
+                if cursor is None:  # pas de journal côté backend : on s'arrête
+                    listener["error"] = "flux de changements indisponible"
+                    listener["unavailable"] = isinstance(feed, BackendFeed)
+                    return
+                listener["cursor"] = cursor
+            events = feed.poll(listener["cursor"], _poll_interval())
+            if events:
+                inserted, deleted = _split(events)
+                apply_remote_changes(inserted, deleted, club=club)
+                listener["cursor"] = events[-1]["seq"]
+            listener["error"] = None
+        except Exception as exc:  # réseau, backend : on réessaie, la synchro périodique couvre le trou
+            listener["error"] = str(exc)
+            stop.wait(_poll_interval())
+        if _stop_if_idle(listener):
+            return
+
+
+def live_updates_enabled() -> bool:
+    return str(setting("LIVE_UPDATES", "1")).lower() not in ("0", "false", "off", "")
+
+
+def start_listener(feed: Optional[ChangeFeed] = None, club: str = DEFAULT_CLUB) -> None:
+    # un seul thread par club et par process ; feed=None : journal du backend configuré
+    with _LISTENER_LOCK:
+        listener = _listener(club)
+        thread = listener["thread"]
+        if thread is not None and thread.is_alive():
+            return
+        if feed is None and listener["unavailable"]:
+            return
+        stop = threading.Event()
+        feed = feed or BackendFeed(stop, club)
+        listener.update(stop=stop, feed=feed, cursor=None, error=None, seen_at=time.monotonic())
+        listener["thread"] = threading.Thread(
+            target=_run, args=(listener, club, feed, stop), name=f"changefeed-{club}", daemon=True
+        )
+        listener["thread"].start()
+
+
+def stop_listener(club: Optional[str] = None) -> None:
+    # un club, ou tous (None)
+    with _LISTENER_LOCK:
+        listeners = list(_listeners.values()) if club is None else [_listener(club)]
+        threads = []
+        for listener in listeners:
+            if listener["stop"] is not None:
+                listener["stop"].set()
+            threads.append(listener["thread"])
+            listener["thread"] = None
+    for thread in threads:
+        if thread is not None:
+            thread.join(timeout=5.0)
+
+
+def ensure_listener(club: str = DEFAULT_CLUB) -> None:
+    # appelé à chaque rerun (et à chaque passage des fragments live) : démarre l'écoute
+    # du club si besoin (si LIVE_UPDATES l'autorise) et repousse son arrêt pour inactivité
+    if live_updates_enabled():
+        with _LISTENER_LOCK:
+            _listener(club)["seen_at"] = time.monotonic()
+        start_listener(club=club)
+
+
+def listener_error(club: str = DEFAULT_CLUB) -> Optional[str]:
+    with _LISTENER_LOCK:
+        return _listener(club)["error"]
@@ -0,0 +1,100 @@
+# charts.py
+from __future__ import annotations
+
+from io import BytesIO
+from typing import Any, Callable, Hashable, Optional
+
+import matplotlib.dates as mdates
+from matplotlib.figure import Figure
+import pandas as pd
+
+from clubs import DEFAULT_CLUB
+from config import setting
+from lru import ClubLRUCache
+from metrics import span
+
+
+# Cache LRU des graphiques rendus, partagé entre sessions, CHART_CACHE_SIZE au plus par club.
+# Clé : (graphique, version des données, filtres...) -> PNG (ou données pour le backend natif)
+DEFAULT_CHART_CACHE_SIZE = 64
+_charts = ClubLRUCache(lambda: setting("CHART_CACHE_SIZE", DEFAULT_CHART_CACHE_SIZE))
+CHART_BACKENDS = ("matplotlib", "native")
+
+
+def chart_backend() -> str:
+    # "matplotlib" : PNG mis en cache ; "native" : st.line_chart, sans rendu serveur
+    backend = str(setting("CHART_BACKEND", "matplotlib")).lower()
+    return backend if backend in CHART_BACKENDS else "matplotlib"
+
+
+def cached_chart(key: Hashable, build: Callable[[], Any], club: str = DEFAULT_CLUB) -> Any:
+    # la durée n'est mesurée que lorsqu'on construit vraiment le graphique (cache manqué)
+    name = key[0] if isinstance(key, tuple) and key else key
+
+    def timed_build() -> Any:
+        with span("chart_build", chart=name):
+            return build()
+
+    return _charts.get_or_build(club, key, timed_build)
+
+
+def clear_chart_cache(club: Optional[str] = None) -> None:
+    _charts.clear(club)
+
+
+def _to_png(fig: Figure) -> bytes:
+    # mêmes réglages que st.pyplot
+    buf = BytesIO()
+    fig.savefig(buf, format="png", dpi=200, bbox_inches="tight")
+    return buf.getvalue()
+
+
+def render_people_chart(pivot: pd.DataFrame) -> bytes:
+    # pivot : index = jours, une colonne par personne (L/jour)
+    fig = Figure()
+    ax2 = fig.add_subplot(111)
+
+    for name in pivot.columns:
+        ax2.plot(pivot.index, pivot[name], label=name)
+
+    ax2.set_ylabel("Litres par jour")
+    ax2.set_xlabel("Date")
+    ax2.legend()
+
+    locator2 = mdates.AutoDateLocator()
+    formatter2 = mdates.ConciseDateFormatter(locator2)
+    ax2.xaxis.set_major_locator(locator2)
+    ax2.xaxis.set_major_formatter(formatter2)
+    return _to_png(fig)
+
+
+def render_cumulative_chart(cumul: pd.Series, fixed_start: pd.Timestamp, last_day: pd.Timestamp) -> bytes:
+    # cumul : index = jours, valeurs = litres cumulés
+    fig = Figure()
+    ax1 = fig.add_subplot(111)
+    x = cumul.index
+    y = cumul
+
+    ymax = float(y.max()) if len(y) else 0.0
+    ax1.set_ylim(0, ymax * 1.05 if ymax > 0 else 1)
+
+    ax1.plot(x, y)
+    ax1.set_ylabel("Litres (cumul)")
+    ax1.set_xlabel("Date")
+    # Affichage intelligent des dates (au fil des jours -> plus on avance, plus on agrège)
+    days_range = (last_day - fixed_start).days
+
+    if days_range <= 31:
+        locator = mdates.DayLocator(interval=2)
+        formatter = mdates.DateFormatter("%d/%m")
+    elif days_range <= 120:
+        locator = mdates.WeekdayLocator(interval=1)
+        formatter = mdates.DateFormatter("%d/%m")
+    else:
+        locator = mdates.MonthLocator(interval=1)
+        formatter = mdates.DateFormatter("%b %Y")
+
+    ax1.xaxis.set_major_locator(locator)
+    ax1.xaxis.set_major_formatter(formatter)
+    fig.autofmt_xdate()
+    return _to_png(fig)
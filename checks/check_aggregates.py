@@ -0,0 +1,128 @@
+# checks/check_aggregates.py
+# Usage : python checks/check_aggregates.py [--size 5000] [--seed 0]
+# Parité des agrégats (classement + Hall of Fame) entre les chemins de calcul :
+# lignes brutes, rollup local (storage._rollup_of), cellules calculées par le moteur
+# SQLite (mêmes règles que sql/daily_rollup.sql) et agrégats du cache + ajouts en file
+# d'envoi (storage.aggregates_with, chemin de l'app). Code de sortie 1 en cas d'écart.
+# La fonction Postgres elle-même n'est pas exécutée ici : elle lit le rollup, dont
+# les règles (nullif / coalesce) sont celles de la requête SQLite.
+from __future__ import annotations
+
+import argparse
+import math
+import os
+import sys
+import tempfile
+from typing import Any, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+sys.path.insert(0, os.path.join(os.path.dirname(HERE), "benchmarks"))
+
+os.environ.update(
+    STORAGE_BACKEND="sqlite",
+    SQLITE_PATH=os.path.join(tempfile.mkdtemp(prefix="check-aggregates-"), "store.sqlite3"),
+    CONSOS_SNAPSHOT_PATH="",
+)
+
+from analytics import hall_of_fame  # noqa: E402
+from backends import SQLiteBackend, get_backend  # noqa: E402
+from storage import _cells_frame, _rollup_of, _rollup_rows, _typed_frame, aggregate_consos, aggregates_with  # noqa: E402
+from synthetic import synthetic_consos  # noqa: E402
+
+# Cas limites : nom / boisson vides ou manquants, volume manquant, date absente ou invalide
+EDGE_ROWS = [
+    {"id": "edge-1", "date": "2026-02-01", "nom": "", "boisson": "Vin", "nb": 1, "dose_ml": 125, "volume_l": 0.125},
+    {"id": "edge-2", "date": "2026-02-01", "nom": None, "boisson": "", "nb": 2, "dose_ml": 250, "volume_l": None},
+    {"id": "edge-3", "date": "2026-02-02", "nom": "Jules", "boisson": None, "nb": 3, "dose_ml": 20, "volume_l": None},
+    {"id": "edge-4", "date": None, "nom": "Jules", "boisson": "Shot", "nb": 1, "dose_ml": 20, "volume_l": 0.02},
+    {"id": "edge-5", "date": "pas une date", "nom": "Marie", "boisson": "Vin", "nb": 1, "dose_ml": 125, "volume_l": 0.125},
+]
+
+
+def _diff(a: Any, b: Any, path: str = "") -> List[str]:
+    # écarts entre deux structures JSON (flottants comparés à 1e-6 près)
+    if isinstance(a, dict) and isinstance(b, dict):
+        if a.keys() != b.keys():
+            return [f"{path}: clés {sorted(a)} != {sorted(b)}"]
+        return [d for k in a for d in _diff(a[k], b[k], f"{path}.{k}")]
+    if isinstance(a, list) and isinstance(b, list):
+        if len(a) != len(b):
+            return [f"{path}: {len(a)} entrées != {len(b)}"]
+        return [d for i, (x, y) in enumerate(zip(a, b)) for d in _diff(x, y, f"{path}[{i}]")]
+    if isinstance(a, float) or isinstance(b, float):
+        ok = isinstance(a, (int, float)) and isinstance(b, (int, float)) and math.isclose(a, b, abs_tol=1e-6)
+        return [] if ok else [f"{path}: {a!r} != {b!r}"]
+    return [] if a == b else [f"{path}: {a!r} != {b!r}"]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Parité des agrégats Python / rollup / SQL")
+    parser.add_argument("--size", type=int, default=5_000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--pending", type=int, default=200, help="lignes passées par la file d'envoi")
+    args = parser.parse_args()
+
+    raw = synthetic_consos(args.size, seed=args.seed).drop(columns=["created_at"])
+    rows = raw.to_dict("records") + EDGE_ROWS
+
+    backend = SQLiteBackend(os.path.join(tempfile.mkdtemp(prefix="check-aggregates-"), "consos.sqlite3"))
+    backend.insert(rows)
+
+    # libellés posés par le moteur lui-même (la fonction Postgres lit le rollup sans repasser
+    # par storage._cells_frame) : aucun nom / boisson vide ou manquant ne doit en sortir
+    cells = backend.fetch_daily(None)
+    unlabeled = [c for c in cells if not c["nom"] or not c["boisson"]]
+    print(f"{'libellés SQL':<20}  {'ok' if not unlabeled else f'{len(unlabeled)} cellule(s) sans libellé'}")
+    failures = [f"libellés SQL : {c}" for c in unlabeled]
+
+    reference = aggregate_consos(rows)
+
+    # filtres sur les libellés : "Inconnu" / "Autre" couvrent les valeurs manquantes ou
+    # vides, comme le rollup Postgres (consos_daily) filtré par PostgREST
+    for col, label, key in (("nom", "Inconnu", "by_nom"), ("boisson", "Autre", "by_boisson")):
+        want = next((r["volume_l"] for r in reference[key] if r[col] == label), 0.0)
+        got = sum(_cells_frame(backend.fetch_daily({col: label}))["volume_l"])
+        ok = math.isclose(got, want, abs_tol=1e-6)
+        print(f"{f'filtre {col}={label}':<20}  {'ok' if ok else f'{got:.6f} L au lieu de {want:.6f} L'}")
+        failures += [] if ok else [f"filtre {col}={label} : {got!r} != {want!r}"]
+    paths = {
+        "rollup local": aggregate_consos(_rollup_rows(_rollup_of(_typed_frame(rows)))),
+        "SQLite fetch_daily": aggregate_consos(_rollup_rows(_cells_frame(cells))),
+    }
+    for name, aggs in paths.items():
+        diffs = _diff(reference, aggs)
+        print(f"{name:<20}  {'ok' if not diffs else f'{len(diffs)} écart(s)'}")
+        failures += [f"{name}{d}" for d in diffs]
+
+    # chemin de l'app : agrégats du cache + ajouts en file d'envoi (cas limites, nouveaux
+    # noms), plus un ajout qui ne prend le badge "meilleur jour" qu'additionné au volume
+    # déjà en base pour ce (jour, nom)
+    stored = rows[:-args.pending]
+    day, nom = stored[0]["date"], stored[0]["nom"]
+    cell = aggregate_consos([r for r in stored if r["date"] == day and r["nom"] == nom])["total_l"]
+    best = aggregate_consos(stored)["best_day"]["volume_l"]
+    pending = rows[-args.pending:] + [
+        {"id": "pending-best", "date": day, "nom": nom, "boisson": "Vin",
+         "nb": 1, "dose_ml": 0, "volume_l": round(best - cell + 0.1, 6)},
+    ]
+    get_backend().insert(stored)
+    merged = aggregates_with(pending)
+    everything = aggregate_consos(rows + pending[-1:])
+    diffs = _diff(everything, merged)
+    print(f"{'cache + file':<20}  {'ok' if not diffs else f'{len(diffs)} écart(s)'}")
+    failures += [f"cache + file{d}" for d in diffs]
+
+    # badges (hors "Régulier", lu dans l'index des séries côté app)
+    diffs = _diff(hall_of_fame(everything), hall_of_fame(merged))
+    print(f"{'hall of fame':<20}  {'ok' if not diffs else f'{len(diffs)} écart(s)'}")
+    failures += [f"hall of fame{d}" for d in diffs]
+
+    for line in failures:
+        print(f"ÉCART  {line}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,190 @@
+# checks/check_cache.py
+# Usage : python checks/check_cache.py [--steps 150] [--seed 0]
+# Cache partagé de storage (frame typé + rollup, classement et séries incrémentaux)
+# sur le moteur SQLite : scénarios connus puis suite aléatoire d'écritures locales,
+# écritures d'un autre client (synchro delta) et événements du flux, comparés après
+# chaque étape à une reconstruction complète. Code de sortie 1 en cas d'écart.
+from __future__ import annotations
+
+import argparse
+import os
+import random
+import sys
+import tempfile
+import traceback
+from typing import Any, Callable, Dict, List
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+os.environ.update(STORAGE_BACKEND="sqlite", CONSOS_SNAPSHOT_PATH="", OUTBOX_PATH="")
+
+import pandas as pd  # noqa: E402
+
+import storage  # noqa: E402
+from backends import get_backend, reset_backend  # noqa: E402
+from leaderboard import Leaderboard  # noqa: E402
+from streaks import StreakIndex  # noqa: E402
+
+NAMES = ["Jules", "Marie", "Zoé", "Nouveau"]
+DRINKS = ["Vin", "Bière", "Shot", "Inédite"]
+
+
+def _fresh_store() -> None:
+    # base vide et cache vidé : chaque scénario part de zéro
+    os.environ["SQLITE_PATH"] = os.path.join(tempfile.mkdtemp(prefix="check-cache-"), "consos.sqlite3")
+    reset_backend()
+    storage.invalidate_cache()
+
+
+def _row(rng: random.Random, n: int) -> Dict[str, Any]:
+    nb, dose = rng.randint(1, 3), rng.choice([20, 125, 250, 500])
+    return {"id": f"c{n:05d}", "date": f"2026-02-{rng.randint(1, 20):02d}", "nom": rng.choice(NAMES),
+            "boisson": rng.choice(DRINKS), "nb": nb, "dose_ml": dose, "volume_l": nb * dose / 1000.0}
+
+
+def _remote_sync() -> None:
+    # écriture d'un autre client vue par la synchro delta (pas par le flux)
+    storage.load_consos_df(force=True)
+
+
+def _mismatches() -> List[str]:
+    # état incrémental du cache = reconstruction complète depuis la base
+    frame = storage.load_consos_df()
+    remote = storage._typed_frame(get_backend().fetch_all())
+    found = []
+    for col in storage.CATEGORY_COLUMNS:
+        if not isinstance(frame[col].dtype, pd.CategoricalDtype):
+            found.append(f"colonne {col} : dtype {frame[col].dtype}")
+    if set(frame["id"]) != set(remote["id"]):
+        found.append(f"ids : {len(frame)} en cache, {len(remote)} en base")
+    rollup = storage.load_daily_rollup()
+    expected = storage._rollup_of(remote).sort_index()
+    if not rollup.sort_index().round(9).equals(expected.round(9)):
+        found.append("rollup différent de la reconstruction")
+    board = Leaderboard()
+    board.apply_cells(storage._board_cells(expected))
+    current = storage.load_leaderboard()
+    for key in ["all"] + DRINKS:
+        got = [(n, round(v, 9)) for n, v in current.ranking(key)]
+        want = [(n, round(v, 9)) for n, v in board.ranking(key)]
+        if got != want:
+            found.append(f"classement {key} : {got} != {want}")
+    index = StreakIndex()
+    index.apply_cells(storage._streak_cells(expected))
+    if storage.load_streaks().ranking() != index.ranking():
+        found.append("séries différentes de la reconstruction")
+    return found
+
+
+def _scenarios() -> Dict[str, Callable[[random.Random], None]]:
+    def empty_store_two_adds(rng: random.Random) -> None:
+        storage.load_consos_df()
+        storage.add_consos_bulk([_row(rng, 1)])
+        storage.add_consos_bulk([_row(rng, 2)])
+
+    def delete_only_sync_then_add(rng: random.Random) -> None:
+        storage.add_consos_bulk([_row(rng, 1), _row(rng, 2)])
+        get_backend().delete(["c00001"])
+        _remote_sync()
+        storage.add_consos_bulk([_row(rng, 3)])
+
+    def remote_delete_then_add(rng: random.Random) -> None:
+        storage.add_consos_bulk([_row(rng, 1)])
+        storage.apply_remote_changes([], ["c00001"])
+        storage.add_consos_bulk([_row(rng, 2)])
+
+    def failed_merge_then_sync(rng: random.Random) -> None:
+        # insert accepté par la base, mise à jour du cache en échec : la synchro suivante
+        # doit compter la ligne une seule fois
+        storage.add_consos_bulk([_row(rng, 1)])
+        storage.load_leaderboard()
+        storage.load_streaks()
+        merge = storage._merge
+
+        def broken(frame: pd.DataFrame, new: pd.DataFrame, club: str) -> pd.DataFrame:
+            raise RuntimeError("échec simulé")
+
+        storage._merge = broken
+        try:
+            storage.add_consos_bulk([_row(rng, 2)])
+        except RuntimeError:
+            pass
+        finally:
+            storage._merge = merge
+        _remote_sync()
+
+    return {
+        "base vide, deux ajouts": empty_store_two_adds,
+        "échec du cache puis synchro": failed_merge_then_sync,
+        "synchro (suppression seule) puis ajout": delete_only_sync_then_add,
+        "suppression distante puis ajout": remote_delete_then_add,
+    }
+
+
+def _fuzz_step(rng: random.Random, n: int) -> str:
+    ids = list(storage.load_consos_df()["id"])
+    op = rng.choice(["add", "add", "delete", "remote_add", "remote_delete", "feed_add", "feed_delete"])
+    if op in ("delete", "remote_delete", "feed_delete") and not ids:
+        op = "add"
+    if op == "add":
+        storage.add_consos_bulk([_row(rng, n) for n in range(n, n + rng.randint(1, 3))])
+    elif op == "delete":
+        storage.delete_consos_bulk(rng.sample(ids, min(len(ids), rng.randint(1, 2))))
+    elif op == "remote_add":
+        get_backend().insert([_row(rng, n)])
+        _remote_sync()
+    elif op == "remote_delete":
+        get_backend().delete([rng.choice(ids)])
+        _remote_sync()
+    elif op == "feed_add":
+        created = get_backend().insert([_row(rng, n)])
+        storage.apply_remote_changes(created, [])
+    else:
+        gone = rng.choice(ids)
+        get_backend().delete([gone])
+        storage.apply_remote_changes([], [gone])
+    return op
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Cache incrémental de storage contre une reconstruction complète")
+    parser.add_argument("--steps", type=int, default=150)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    failures = []
+
+    for name, scenario in _scenarios().items():
+        _fresh_store()
+        try:
+            scenario(random.Random(args.seed))
+            found = _mismatches()
+        except Exception:
+            found = [traceback.format_exc(limit=3).strip().splitlines()[-1]]
+        print(f"{name:<40}  {'ok' if not found else 'ÉCHEC'}")
+        failures += [f"{name} : {line}" for line in found]
+
+    _fresh_store()
+    rng = random.Random(args.seed)
+    storage.load_consos_df()
+    done = 0
+    for step in range(args.steps):
+        try:
+            op = _fuzz_step(rng, 100 + step * 4)
+            found = _mismatches()
+        except Exception:
+            op, found = "?", [traceback.format_exc(limit=3).strip().splitlines()[-1]]
+        if found:
+            failures += [f"étape {step} ({op}) : {line}" for line in found]
+            break
+        done += 1
+    print(f"{f'{args.steps} étapes aléatoires':<40}  {'ok' if done == args.steps else f'ÉCHEC à l étape {done}'}")
+
+    for line in failures:
+        print(f"ÉCART  {line}")
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
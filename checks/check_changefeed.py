@@ -0,0 +1,104 @@
+# checks/check_changefeed.py
+# Usage : python checks/check_changefeed.py [--timeout 5]
+# Écoute du flux de changements (changefeed.py) avec un StubFeed sur le moteur SQLite :
+# ajouts / suppressions d'un autre client appliqués au cache, au classement et au
+# rollup, événements rejoués sans effet, ajout + suppression d'un même id annulés,
+# arrêt de l'écoute d'un club inactif puis reprise.
+# Code de sortie 1 en cas d'échec.
+from __future__ import annotations
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+os.environ.update(
+    STORAGE_BACKEND="sqlite",
+    SQLITE_PATH=os.path.join(tempfile.mkdtemp(prefix="check-changefeed-"), "consos.sqlite3"),
+    CONSOS_SNAPSHOT_PATH="",
+    CHANGEFEED_POLL_INTERVAL="0.05",
+)
+
+from changefeed import _listeners, StubFeed, listener_error, start_listener, stop_listener  # noqa: E402
+from storage import add_consos_bulk, data_version, load_consos_df, load_daily_rollup, load_leaderboard  # noqa: E402
+
+
+def _row(conso_id: str, nom: str, volume_l: float) -> dict:
+    return {"id": conso_id, "date": "2026-02-01", "nom": nom, "boisson": "Vin", "nb": 1,
+            "dose_ml": int(volume_l * 1000), "volume_l": volume_l, "created_at": "2026-02-01T20:00:00+00:00"}
+
+
+def _wait_version(before: int, timeout: float) -> bool:
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if data_version() != before:
+            return True
+        time.sleep(0.01)
+    return False
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Flux de changements contre un StubFeed")
+    parser.add_argument("--timeout", type=float, default=5.0, help="attente maximale d'un événement (s)")
+    args = parser.parse_args()
+
+    add_consos_bulk([_row("local-1", "Jules", 0.5)])
+    load_consos_df()
+    feed = StubFeed()
+    start_listener(feed)
+    failures = []
+
+    def check(name: str, ok: bool, detail: str = "") -> None:
+        print(f"{name:<28}  {'ok' if ok else 'ÉCHEC'}  {detail}")
+        if not ok:
+            failures.append(name)
+
+    version = data_version()
+    feed.publish("INSERT", _row("remote-1", "Marie", 0.25))
+    applied = _wait_version(version, args.timeout)
+    ids = set(load_consos_df()["id"])
+    total = load_leaderboard().total()
+    check("ajout distant", applied and "remote-1" in ids and abs(total - 0.75) < 1e-9, f"total {total:.2f} L")
+
+    version = data_version()
+    feed.publish("INSERT", _row("remote-1", "Marie", 0.25))
+    check("ajout rejoué sans effet", not _wait_version(version, 0.5), f"version {data_version()}")
+
+    version = data_version()
+    feed.publish("DELETE", {"id": "local-1"})
+    applied = _wait_version(version, args.timeout)
+    rollup = load_daily_rollup()
+    noms = set(rollup.index.get_level_values("nom"))
+    check("suppression distante", applied and "local-1" not in set(load_consos_df()["id"]) and noms == {"Marie"},
+          f"rollup {sorted(noms)}")
+
+    # même lot : on garde le verrou du flux pendant les deux publications
+    version = data_version()
+    with feed._cond:
+        feed.publish("INSERT", _row("remote-2", "Zoé", 1.0))
+        feed.publish("DELETE", {"id": "remote-2"})
+    check("ajout + suppression annulés", not _wait_version(version, 0.5), f"version {data_version()}")
+
+    check("écoute sans erreur", listener_error() is None, str(listener_error() or ""))
+
+    # plus aucun ensure_listener : le thread s'arrête, un nouveau départ reprend le flux
+    os.environ["CHANGEFEED_IDLE_TIMEOUT"] = "0.2"
+    thread = _listeners["default"]["thread"]
+    thread.join(args.timeout)
+    check("arrêt si inactif", not thread.is_alive())
+    os.environ["CHANGEFEED_IDLE_TIMEOUT"] = "600"
+    start_listener(feed)
+    version = data_version()
+    feed.publish("INSERT", _row("remote-3", "Zoé", 0.5))
+    check("reprise après arrêt", _wait_version(version, args.timeout) and "remote-3" in set(load_consos_df()["id"]))
+    stop_listener()
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,155 @@
+# checks/check_http.py
+# Usage : python checks/check_http.py [--rows 2500] [--max-rows 1000]
+# Session HTTP de backends.py contre un serveur PostgREST minimal en local :
+# connexions réutilisées (keep-alive), 503 rejoués, 400 non rejoué, lectures
+# complètes au-delà du plafond max-rows du serveur. Code de sortie 1 en cas d'échec.
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, List
+from urllib.parse import parse_qsl, urlparse
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(HERE))
+
+import requests  # noqa: E402
+
+from backends import SupabaseBackend, reset_http_session  # noqa: E402
+
+
+class StubPostgREST(ThreadingHTTPServer):
+    # table consos en mémoire ; GET (eq / gt, order=id.asc, limit plafonné), POST
+    daemon_threads = True
+
+    def __init__(self, rows: List[Dict[str, Any]], max_rows: int) -> None:
+        super().__init__(("127.0.0.1", 0), _Handler)
+        self.rows = rows
+        self.max_rows = max_rows
+        self.lock = threading.Lock()
+        self.fail_next = 0  # prochaines requêtes en 503
+        self.requests = 0
+        self.clients: set = set()  # (hôte, port) côté client : une entrée par connexion
+
+    @property
+    def url(self) -> str:
+        return f"http://127.0.0.1:{self.server_address[1]}"
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def _reply(self, status: int, body: Any, headers: Dict[str, str] = None) -> None:
+        data = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _count(self) -> bool:
+        # False : la requête doit échouer (503 simulé)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.clients.add(self.client_address)
+            if self.server.fail_next > 0:
+                self.server.fail_next -= 1
+                return False
+        return True
+
+    def do_GET(self) -> None:
+        if not self._count():
+            return self._reply(503, {"message": "indisponible"}, {"Retry-After": "0"})
+        url = urlparse(self.path)
+        if url.path != "/rest/v1/consos":
+            return self._reply(404, {"message": "inconnu"})
+        rows = self.server.rows
+        limit = self.server.max_rows
+        for key, value in parse_qsl(url.query):
+            if key == "limit":
+                limit = min(limit, int(value))
+            elif key not in ("select", "order", "offset"):
+                op, _, arg = value.partition(".")
+                if op == "eq":
+                    rows = [r for r in rows if str(r.get(key)) == arg]
+                elif op == "gt":
+                    rows = [r for r in rows if str(r.get(key)) > arg]
+                elif op == "in":
+                    wanted = {v.strip('"') for v in arg.strip("()").split(",")}
+                    rows = [r for r in rows if str(r.get(key)) in wanted]
+        self._reply(200, sorted(rows, key=lambda r: r["id"])[:limit])
+
+    def do_POST(self) -> None:
+        items = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        if not self._count():
+            return self._reply(503, {"message": "indisponible"}, {"Retry-After": "0"})
+        if any(not item.get("nom") for item in items):
+            return self._reply(400, {"message": "nom obligatoire"})
+        with self.server.lock:
+            self.server.rows.extend(items)
+        self._reply(201, items)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Session HTTP contre un PostgREST local")
+    parser.add_argument("--rows", type=int, default=2_500)
+    parser.add_argument("--max-rows", type=int, default=1_000, help="plafond de lignes par réponse du serveur")
+    args = parser.parse_args()
+
+    rows = [
+        {"id": f"{i:06d}", "club": "default", "date": "2026-02-01", "nom": "Jules", "boisson": "Vin",
+         "nb": 1, "dose_ml": 125, "volume_l": 0.125}
+        for i in range(args.rows)
+    ]
+    server = StubPostgREST(rows, args.max_rows)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    os.environ.update(SUPABASE_URL=server.url, SUPABASE_ANON_KEY="check", HTTP_MAX_RETRIES="3")
+    reset_http_session()
+    backend = SupabaseBackend()
+    failures = []
+
+    def check(name: str, ok: bool, detail: str) -> None:
+        print(f"{name:<22}  {'ok' if ok else 'ÉCHEC'}  {detail}")
+        if not ok:
+            failures.append(name)
+
+    fetched = backend.fetch_all()
+    check("lecture > max-rows", len(fetched) == args.rows, f"{len(fetched)} / {args.rows} lignes")
+
+    before = len(server.clients)
+    for _ in range(20):
+        backend.fetch_by_ids(["000001"])
+    check("keep-alive", len(server.clients) - before <= 1, f"{len(server.clients) - before} connexion(s) pour 20 requêtes")
+
+    server.fail_next = 2
+    try:
+        ok = len(backend.fetch_by_ids(["000002"])) == 1
+    except requests.HTTPError:
+        ok = False
+    check("503 rejoué", ok and server.fail_next == 0, "2 échecs puis réponse")
+
+    server.fail_next = 0
+    sent = server.requests
+    try:
+        backend.insert([{"id": "bad", "date": "2026-02-01", "nom": "", "boisson": "Vin"}])
+        refused = False
+    except requests.HTTPError as exc:
+        refused = exc.response.status_code == 400
+    check("400 non rejoué", refused and server.requests - sent == 1, f"{server.requests - sent} requête(s)")
+
+    server.shutdown()
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
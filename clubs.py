@@ -0,0 +1,93 @@
+# clubs.py
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, List, Optional
+import json
+import re
+
+from config import setting
+from constants import DRINK_TYPES, NAMES
+
+
+# Plusieurs clubs sur un même déploiement : chaque conso porte un club, et tout
+# (requêtes, caches, agrégats, flux de changements) est partitionné par club.
+# CLUBS (secrets.toml, ou JSON en variable d'environnement) :
+#   [CLUBS.nrbc]
+#   title = "No Rizz Boisson Club"
+#   names = ["Damien", "Eliott", ...]
+#   drinks = ["Bière", "Vin", ...]      # optionnel (défaut : DRINK_TYPES)
+#   start = "2026-01-09"                # début des cumuls
+# Sans CLUBS : un seul club, DEFAULT_CLUB, avec NAMES / DRINK_TYPES de constants.py.
+# CLUB : club affiché par défaut (sinon le premier) ; ?club=<id> dans l'URL pour un autre.
+# Les consos d'avant les clubs sont rangées dans le club LEGACY_CLUB (défaut : "default").
+# CLUBS sans ce club les rendrait invisibles : la config est alors refusée (ValueError).
+# Pour les confier à un autre club : LEGACY_CLUB = "<id>" (SQLite : lignes déplacées à
+# l'ouverture de la base ; Supabase : voir sql/clubs.sql).
+DEFAULT_CLUB = "default"
+DEFAULT_START = date(2026, 1, 9)
+_CLUB_ID = re.compile(r"^[a-z0-9][a-z0-9_-]{0,31}$")  # sert aussi dans les noms de fichiers
+
+_DEFAULT_CONFIG: Dict[str, Any] = {
+    "title": "No Rizz Boisson Club",
+    "caption": "C'est un jeu dangereux... Mais c'est un jeu qui me plaît",
+    "names": NAMES,
+    "drinks": DRINK_TYPES,
+    "start": DEFAULT_START,
+}
+
+
+def _parse(club: str, raw: Any) -> Dict[str, Any]:
+    if not _CLUB_ID.match(club):
+        raise ValueError(f"identifiant de club invalide : {club!r} (minuscules, chiffres, - et _)")
+    raw = dict(raw or {})
+    start = raw.get("start", DEFAULT_START)
+    return {
+        "title": str(raw.get("title", club)),
+        "caption": str(raw.get("caption", "")),
+        "names": [str(n) for n in raw.get("names", NAMES)],
+        "drinks": [str(d) for d in raw.get("drinks", DRINK_TYPES)],
+        "start": start if isinstance(start, date) else date.fromisoformat(str(start)),
+    }
+
+
+def legacy_club() -> str:
+    # club qui reçoit les consos d'avant les clubs
+    return str(setting("LEGACY_CLUB", None) or DEFAULT_CLUB)
+
+
+def club_configs() -> Dict[str, Dict[str, Any]]:
+    raw = setting("CLUBS", None)
+    legacy = legacy_club()
+    if not raw:
+        if legacy != DEFAULT_CLUB:
+            raise ValueError(f"LEGACY_CLUB = {legacy!r} sans CLUBS : ce club n'existe pas")
+        return {DEFAULT_CLUB: _DEFAULT_CONFIG}
+    if isinstance(raw, str):
+        raw = json.loads(raw)
+    configs = {str(club): _parse(str(club), conf) for club, conf in dict(raw).items()}
+    if legacy not in configs:
+        raise ValueError(
+            f"CLUBS n'a pas de club {legacy!r}, qui contient les consos d'avant les clubs : "
+            f"ajoute [CLUBS.{legacy}], ou LEGACY_CLUB = \"<id>\" pour les confier à un club configuré"
+        )
+    if legacy != DEFAULT_CLUB and DEFAULT_CLUB in configs:
+        raise ValueError(f"LEGACY_CLUB = {legacy!r} alors que CLUBS a aussi un club {DEFAULT_CLUB!r} : choisir l'un des deux")
+    return configs
+
+
+def club_ids() -> List[str]:
+    return list(club_configs())
+
+
+def club_config(club: str) -> Dict[str, Any]:
+    return club_configs()[club]
+
+
+def resolve_club(requested: Optional[str] = None) -> str:
+    # club demandé s'il existe, sinon CLUB, sinon le premier configuré
+    ids = club_ids()
+    for candidate in (requested, setting("CLUB", None)):
+        if candidate and str(candidate) in ids:
+            return str(candidate)
+    return ids[0]
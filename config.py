@@ -0,0 +1,24 @@
+# config.py
+from __future__ import annotations
+
+from typing import Any
+import os
+
+import streamlit as st
+
+
+def setting(name: str, default: Any) -> Any:
+    # variable d'environnement d'abord (tests / serveur local), puis st.secrets
+    if name in os.environ:
+        return os.environ[name]
+    try:
+        return st.secrets.get(name, default)
+    except Exception:  # pas de secrets.toml
+        return default
+
+
+def required(name: str) -> str:
+    value = setting(name, None)
+    if value is None:
+        raise KeyError(name)
+    return str(value)
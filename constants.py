@@ -0,0 +1,30 @@
+# constants.py
+DRINK_TYPES = ["Bière", "Ricard", "Rhum", "Vodka", "Tequilla", "Vin", "Whisky", "Shot", "Cocktail", "Autre"]
+NAMES = ["Divers Inconnus", "Damien", "Eliott", "Elwenn", "Gaetan", "Jeanne", "Jules", "Marie", "Mattis", "Maude", "Quentin"]
+
+DOSES = {
+    "2 cl (mini shot)": 20,
+    "5 cl (shot)": 50,
+    "10 cl": 100,
+    "12.5 cl (vin)": 125,
+    "20 cl": 200,
+    "25 cl": 250,
+    "33 cl": 330,
+    "50 cl": 500,
+    "1 L": 1000,
+}
+NB_OPTIONS = list(range(1, 11))
+
+# Emojis par boisson (simple)
+DRINK_EMOJI = {
+    "Bière": "🍺",
+    "Ricard": "🟨",
+    "Rhum": "🥃",
+    "Vodka": "🧊",
+    "Tequilla": "🌵",
+    "Vin": "🍷",
+    "Whisky": "🥃",
+    "Shot": "🎯",
+    "Cocktail": "🍸",
+    "Autre": "🍶",
+}
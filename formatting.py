@@ -0,0 +1,64 @@
+# formatting.py
+from __future__ import annotations
+
+from typing import Any, Dict, List
+
+import pandas as pd
+
+from constants import DRINK_EMOJI
+
+
+def with_emoji(drink: str) -> str:
+    return f"{DRINK_EMOJI.get(drink, '🍻')} {drink}"
+
+
+def format_history(rows: List[Dict[str, Any]]) -> pd.DataFrame:
+    # Affichage joli, seulement pour les lignes visibles
+    page = pd.DataFrame(rows, columns=["date", "nom", "boisson", "nb", "dose_ml", "volume_l"])
+    nb = pd.to_numeric(page["nb"], errors="coerce").fillna(0).astype(int)
+    dose_ml = pd.to_numeric(page["dose_ml"], errors="coerce").fillna(0).astype(int)
+    volume_l = pd.to_numeric(page["volume_l"], errors="coerce").fillna(nb * dose_ml / 1000.0)
+    return pd.DataFrame(
+        {
+            "Date": page["date"].astype(str).str[:10],
+            "Nom": page["nom"],
+            "Boisson": page["boisson"].map(with_emoji),
+            "Nombre": nb,
+            "Dose": (dose_ml / 10).round(0).astype(int).astype(str) + " cl",
+            "Volume": volume_l.round(2).map(lambda x: f"{x:.2f} L"),
+        }
+    )
+
+
+def delete_labels(rows: List[Dict[str, Any]]) -> Dict[str, str]:
+    # id -> libellé de la liste de suppression (deux lignes identiques restent distinctes)
+    return {
+        row["id"]: (
+            f"{str(row['date'])[:10]} — {row['nom']} — {with_emoji(row['boisson'])}"
+            f" — {row['nb']} × {row['dose_ml']}ml ({round(float(row['volume_l'] or 0.0), 2)}L)"
+        )
+        for row in rows
+    }
+
+
+def format_active_streaks(active: List[tuple]) -> pd.DataFrame:
+    # (nom, jours, dernier jour) -> tableau des séries en cours
+    return pd.DataFrame(
+        {
+            "Nom": [nom for nom, _, _ in active],
+            "Jours": [current for _, current, _ in active],
+            "Dernière conso": [last.isoformat() for _, _, last in active],
+        }
+    )
+
+
+def format_streak_ranking(ranking: List[tuple]) -> pd.DataFrame:
+    # (nom, record, série en cours, dernier jour) -> classement des séries
+    return pd.DataFrame(
+        {
+            "Nom": [nom for nom, _, _, _ in ranking],
+            "Record (jours)": [best for _, best, _, _ in ranking],
+            "En cours": [current for _, _, current, _ in ranking],
+            "Dernière conso": [last.isoformat() if last else "-" for _, _, _, last in ranking],
+        }
+    )
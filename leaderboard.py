@@ -0,0 +1,57 @@
+# leaderboard.py
+from __future__ import annotations
+
+from bisect import bisect_left, insort
+from typing import Dict, Iterable, List, Tuple
+
+ALL = "all"
+
+
+class Leaderboard:
+    # Classement maintenu incrémentalement, une liste triée par clé ("all" + chaque boisson).
+    # Tri : volume décroissant (arrondi 1e-6) puis nom croissant, comme les agrégats.
+    # Un ajout / une suppression = une recherche dichotomique par clé touchée ;
+    # les lectures (top k, classement complet) ne font aucun calcul pandas.
+
+    def __init__(self) -> None:
+        self._totals: Dict[str, Dict[str, Tuple[float, int]]] = {}  # clé -> nom -> (volume, lignes)
+        self._ranked: Dict[str, List[Tuple[float, str]]] = {}  # clé -> [(-volume arrondi, nom)]
+
+    def _bump(self, key: str, nom: str, volume: float, n: int) -> None:
+        totals = self._totals.setdefault(key, {})
+        ranked = self._ranked.setdefault(key, [])
+        old = totals.get(nom)
+        if old is not None:
+            del ranked[bisect_left(ranked, (-round(old[0], 6), nom))]
+            volume, n = old[0] + volume, old[1] + n
+        if n <= 0:
+            totals.pop(nom, None)
+            return
+        totals[nom] = (volume, n)
+        insort(ranked, (-round(volume, 6), nom))
+
+    def apply(self, nom: str, boisson: str, volume: float, n: int = 1) -> None:
+        # n = +lignes ajoutées / -lignes supprimées (volume du même signe)
+        self._bump(ALL, nom, volume, n)
+        self._bump(boisson, nom, volume, n)
+
+    def apply_cells(self, cells: Iterable[Tuple[str, str, float, int]]) -> None:
+        for nom, boisson, volume, n in cells:
+            self.apply(nom, boisson, volume, n)
+
+    def copy(self) -> "Leaderboard":
+        board = Leaderboard()
+        board._totals = {key: dict(totals) for key, totals in self._totals.items()}
+        board._ranked = {key: list(ranked) for key, ranked in self._ranked.items()}
+        return board
+
+    def ranking(self, key: str = ALL) -> List[Tuple[str, float]]:
+        totals = self._totals.get(key, {})
+        return [(nom, totals[nom][0]) for _, nom in self._ranked.get(key, [])]
+
+    def top(self, k: int, key: str = ALL) -> List[Tuple[str, float]]:
+        totals = self._totals.get(key, {})
+        return [(nom, totals[nom][0]) for _, nom in self._ranked.get(key, [])[:k]]
+
+    def total(self, key: str = ALL) -> float:
+        return sum(volume for volume, _ in self._totals.get(key, {}).values())
@@ -0,0 +1,71 @@
+# lru.py
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Optional
+import threading
+
+
+class LRUCache:
+    # Cache borné thread-safe, partagé entre sessions (éviction du moins récemment utilisé)
+
+    def __init__(self, maxsize: Callable[[], int] | int) -> None:
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+
+    def _limit(self) -> int:
+        return int(self._maxsize() if callable(self._maxsize) else self._maxsize)
+
+    def get_or_build(self, key: Hashable, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            if key in self._data:
+                self._data.move_to_end(key)
+                return self._data[key]
+
+        # calcul hors verrou : deux sessions peuvent calculer la même clé, pas grave
+        value = build()
+
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            limit = self._limit()
+            while len(self._data) > limit:
+                self._data.popitem(last=False)
+        return value
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class ClubLRUCache:
+    # Un LRUCache par club, chacun borné à maxsize : un club très actif n'évince pas
+    # les entrées des autres (mémoire totale au plus maxsize x nombre de clubs)
+
+    def __init__(self, maxsize: Callable[[], int] | int) -> None:
+        self._maxsize = maxsize
+        self._lock = threading.Lock()
+        self._clubs: Dict[str, LRUCache] = {}
+
+    def get_or_build(self, club: str, key: Hashable, build: Callable[[], Any]) -> Any:
+        with self._lock:
+            cache = self._clubs.get(club)
+            if cache is None:
+                cache = self._clubs[club] = LRUCache(self._maxsize)
+        return cache.get_or_build(key, build)
+
+    def clear(self, club: Optional[str] = None) -> None:
+        # un club, ou tous (None)
+        with self._lock:
+            caches = list(self._clubs.values()) if club is None else [self._clubs.get(club)]
+        for cache in caches:
+            if cache is not None:
+                cache.clear()
+
+    def __len__(self) -> int:
+        with self._lock:
+            return sum(len(cache) for cache in self._clubs.values())
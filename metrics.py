@@ -0,0 +1,142 @@
+# metrics.py
+from __future__ import annotations
+
+from contextlib import contextmanager
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import json
+import logging
+import os
+import threading
+import time
+
+from config import setting
+
+
+# Instrumentation légère du chemin critique (coût : un perf_counter + un dict par mesure).
+# - span(nom, **labels) : durée d'une étape (chargement, normalisation, onglet, graphique...)
+# - gauge(...) : dernière valeur (nombre de lignes, taille de page...)
+# - count(...) : compteur cumulé (octets reçus, requêtes...)
+# Agrégats partagés par le process (export Prometheus) + détail du rerun en cours
+# (un rerun Streamlit = un thread) pour le panneau de debug.
+logger = logging.getLogger("consos.metrics")
+
+_LOCK = threading.Lock()
+_Key = Tuple[str, Tuple[Tuple[str, str], ...]]
+_spans: Dict[_Key, Dict[str, float]] = {}  # count, sum, max, last
+_gauges: Dict[_Key, float] = {}
+_counters: Dict[_Key, float] = {}
+_run = threading.local()
+
+
+def _key(name: str, labels: Dict[str, Any]) -> _Key:
+    return name, tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _log_enabled() -> bool:
+    return str(setting("METRICS_LOG", "0")).lower() in ("1", "true", "on")
+
+
+def _record(kind: str, name: str, value: float, labels: Dict[str, Any]) -> None:
+    records = getattr(_run, "records", None)
+    if records is not None:
+        records.append({"kind": kind, "name": name, "value": value, **{k: str(v) for k, v in labels.items()}})
+    if _log_enabled():
+        logger.info(json.dumps({"kind": kind, "name": name, "value": value, **labels}, default=str))
+
+
+def observe(name: str, seconds: float, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _LOCK:
+        stats = _spans.setdefault(key, {"count": 0.0, "sum": 0.0, "max": 0.0, "last": 0.0})
+        stats["count"] += 1
+        stats["sum"] += seconds
+        stats["max"] = max(stats["max"], seconds)
+        stats["last"] = seconds
+    _record("span", name, seconds, labels)
+
+
+@contextmanager
+def span(name: str, **labels: Any) -> Iterator[None]:
+    t0 = time.perf_counter()
+    try:
+        yield
+    finally:
+        observe(name, time.perf_counter() - t0, **labels)
+
+
+def gauge(name: str, value: float, **labels: Any) -> None:
+    with _LOCK:
+        _gauges[_key(name, labels)] = float(value)
+    _record("gauge", name, float(value), labels)
+
+
+def count(name: str, value: float = 1, **labels: Any) -> None:
+    key = _key(name, labels)
+    with _LOCK:
+        _counters[key] = _counters.get(key, 0.0) + value
+    _record("count", name, float(value), labels)
+
+
+def start_run() -> None:
+    # début d'un rerun : les mesures de ce thread sont gardées pour le panneau de debug
+    _run.records = []
+
+
+def run_records() -> List[Dict[str, Any]]:
+    return list(getattr(_run, "records", None) or [])
+
+
+def reset() -> None:
+    with _LOCK:
+        _spans.clear()
+        _gauges.clear()
+        _counters.clear()
+
+
+def _labels_text(name_label: Optional[Tuple[str, str]], labels: Tuple[Tuple[str, str], ...]) -> str:
+    pairs = ([name_label] if name_label else []) + list(labels)
+    if not pairs:
+        return ""
+    escaped = [(k, v.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")) for k, v in pairs]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+def prometheus_text() -> str:
+    # format texte d'exposition Prometheus (collecteur textfile, ou copier-coller depuis le panneau)
+    with _LOCK:
+        spans = {k: dict(v) for k, v in _spans.items()}
+        gauges = dict(_gauges)
+        counters = dict(_counters)
+
+    lines = [
+        "# HELP consos_span_seconds Durée des étapes instrumentées.",
+        "# TYPE consos_span_seconds summary",
+    ]
+    for (name, labels), stats in sorted(spans.items()):
+        text = _labels_text(("span", name), labels)
+        lines.append(f"consos_span_seconds_count{text} {int(stats['count'])}")
+        lines.append(f"consos_span_seconds_sum{text} {stats['sum']:.6f}")
+    lines += ["# HELP consos_span_seconds_max Durée maximale observée.", "# TYPE consos_span_seconds_max gauge"]
+    for (name, labels), stats in sorted(spans.items()):
+        lines.append(f"consos_span_seconds_max{_labels_text(('span', name), labels)} {stats['max']:.6f}")
+    for kind, store, suffix in (("gauge", gauges, ""), ("counter", counters, "_total")):
+        for metric in sorted({name for name, _ in store}):
+            lines.append(f"# TYPE consos_{metric}{suffix} {kind}")
+            for (name, labels), value in sorted(store.items()):
+                if name == metric:
+                    lines.append(f"consos_{metric}{suffix}{_labels_text(None, labels)} {value:g}")
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile() -> None:
+    # METRICS_TEXTFILE : chemin lu par le collecteur textfile de node_exporter (écriture atomique)
+    path = setting("METRICS_TEXTFILE", "")
+    if not path:
+        return
+    try:
+        tmp = str(path) + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            f.write(prometheus_text())
+        os.replace(tmp, str(path))
+    except OSError:
+        pass  # les métriques ne doivent jamais casser l'app
@@ -0,0 +1,321 @@
+# outbox.py
+from __future__ import annotations
+
+from typing import Any, Dict, List, Optional
+import json
+import os
+import sqlite3
+import threading
+import time
+
+import requests
+
+from clubs import DEFAULT_CLUB
+from config import setting
+from storage import BULK_INSERT_CHUNK, add_consos_bulk
+
+
+# File d'attente locale des ajouts (SQLite, survit à un redémarrage).
+# Le formulaire écrit ici et rend la main tout de suite ; un thread d'envoi
+# pousse les lignes vers Supabase par paquets, avec backoff si le réseau tombe.
+# Rejouer un envoi est sans risque : ids générés côté client + ignore-duplicates.
+# Une seule file pour tous les clubs : chaque ligne garde son club (clé "club" du payload).
+# Une ligne refusée par le serveur (400, 409, 422) part dans outbox_rejected, n'est plus
+# comptée en attente et est signalée ; tout autre échec est réessayé avec backoff.
+# Les lignes écartées peuvent être remises en file (requeue_rejected) ou oubliées.
+DEFAULT_OUTBOX_PATH = os.path.join(".cache", "outbox.sqlite3")
+DEFAULT_RETRY_MAX_DELAY = 300.0  # secondes entre deux tentatives, au plus
+IDLE_WAIT = 30.0  # réveil périodique du thread même sans nouvel ajout
+REFUSED_STATUS = (400, 409, 422)  # seuls statuts qui écartent une ligne (voir _refused)
+
+_OUTBOX_LOCK = threading.Lock()
+_wakeup = threading.Event()
+_worker: Optional[threading.Thread] = None
+_last_error: Dict[str, Any] = {"message": None, "at": 0.0}
+
+_SCHEMA = """
+create table if not exists outbox (
+    id text primary key,
+    payload text not null,
+    queued_at real not null,
+    attempts integer not null default 0,
+    next_try_at real not null default 0
+);
+create table if not exists outbox_rejected (
+    id text primary key,
+    payload text not null,
+    queued_at real not null,
+    rejected_at real not null,
+    error text not null
+);
+"""
+
+
+def _outbox_path() -> Optional[str]:
+    path = setting("OUTBOX_PATH", DEFAULT_OUTBOX_PATH)
+    return str(path) if path else None  # chemin vide : écritures synchrones
+
+
+def _connect(path: str) -> sqlite3.Connection:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10.0)
+    conn.execute("pragma journal_mode=wal")
+    conn.executescript(_SCHEMA)
+    return conn
+
+
+def _retry_delay(attempts: int) -> float:
+    max_delay = float(setting("OUTBOX_RETRY_MAX_DELAY", DEFAULT_RETRY_MAX_DELAY))
+    return min(max_delay, 2.0 ** attempts)
+
+
+def _club_of(item: Dict[str, Any]) -> str:
+    return str(item.get("club") or DEFAULT_CLUB)
+
+
+def enqueue(items: List[Dict[str, Any]], club: str = DEFAULT_CLUB) -> int:
+    # Ajout durable (commit SQLite) puis réveil du thread d'envoi.
+    # Sans outbox (OUTBOX_PATH vide), envoi direct comme add_consos_bulk.
+    path = _outbox_path()
+    if not path:
+        return add_consos_bulk(items, club=club)
+
+    now = time.time()
+    rows = [(str(item["id"]), json.dumps({**item, "club": club}), now) for item in items]
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.executemany(
+                    "insert or ignore into outbox (id, payload, queued_at) values (?, ?, ?)", rows
+                )
+        finally:
+            conn.close()
+    ensure_worker()
+    _wakeup.set()
+    return len(items)
+
+
+def pending_consos(club: str = DEFAULT_CLUB) -> List[Dict[str, Any]]:
+    # lignes du club pas encore confirmées par le serveur (affichage optimiste)
+    path = _outbox_path()
+    if not path or not os.path.exists(path):
+        return []
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            cursor = conn.execute("select payload from outbox order by queued_at")
+            items = [json.loads(payload) for (payload,) in cursor]
+        finally:
+            conn.close()
+    return [item for item in items if _club_of(item) == club]
+
+
+def rejected_consos(club: str = DEFAULT_CLUB) -> List[Dict[str, Any]]:
+    # lignes du club refusées par le serveur : {"item", "error", "rejected_at"}
+    path = _outbox_path()
+    if not path or not os.path.exists(path):
+        return []
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            cursor = conn.execute("select payload, error, rejected_at from outbox_rejected order by rejected_at")
+            rows = [{"item": json.loads(payload), "error": error, "rejected_at": at} for payload, error, at in cursor]
+        finally:
+            conn.close()
+    return [row for row in rows if _club_of(row["item"]) == club]
+
+
+def discard_rejected(club: str = DEFAULT_CLUB) -> int:
+    # oublie les lignes refusées du club (après les avoir signalées)
+    ids = [(str(row["item"]["id"]),) for row in rejected_consos(club)]
+    path = _outbox_path()
+    if not ids or not path:
+        return 0
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.executemany("delete from outbox_rejected where id = ?", ids)
+        finally:
+            conn.close()
+    return len(ids)
+
+
+def requeue_rejected(club: str = DEFAULT_CLUB) -> int:
+    # remet en file les lignes refusées du club (après correction côté serveur) :
+    # compteur de tentatives remis à zéro, envoi au prochain réveil du thread
+    ids = [(str(row["item"]["id"]),) for row in rejected_consos(club)]
+    path = _outbox_path()
+    if not ids or not path:
+        return 0
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.executemany(
+                    "insert or ignore into outbox (id, payload, queued_at) "
+                    "select id, payload, queued_at from outbox_rejected where id = ?",
+                    ids,
+                )
+                conn.executemany("delete from outbox_rejected where id = ?", ids)
+        finally:
+            conn.close()
+    ensure_worker()
+    _wakeup.set()
+    return len(ids)
+
+
+def last_error() -> Optional[str]:
+    # dernière erreur d'envoi (None dès qu'un envoi réussit)
+    return _last_error["message"]
+
+
+def _due_batch(path: str) -> List[Dict[str, Any]]:
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            cursor = conn.execute(
+                "select payload from outbox where next_try_at <= ? order by queued_at limit ?",
+                (time.time(), BULK_INSERT_CHUNK),
+            )
+            return [json.loads(payload) for (payload,) in cursor]
+        finally:
+            conn.close()
+
+
+def _ack(path: str, ids: List[str]) -> None:
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.executemany("delete from outbox where id = ?", [(i,) for i in ids])
+        finally:
+            conn.close()
+
+
+def _postpone(path: str, ids: List[str]) -> None:
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            with conn:
+                for conso_id in ids:
+                    row = conn.execute("select attempts from outbox where id = ?", (conso_id,)).fetchone()
+                    if row is None:
+                        continue
+                    attempts = row[0] + 1
+                    conn.execute(
+                        "update outbox set attempts = ?, next_try_at = ? where id = ?",
+                        (attempts, time.time() + _retry_delay(attempts), conso_id),
+                    )
+        finally:
+            conn.close()
+
+
+def _reject(path: str, conso_id: str, error: str) -> None:
+    # file -> outbox_rejected, dans la même transaction
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            with conn:
+                conn.execute(
+                    "insert or replace into outbox_rejected (id, payload, queued_at, rejected_at, error) "
+                    "select id, payload, queued_at, ?, ? from outbox where id = ?",
+                    (time.time(), error, conso_id),
+                )
+                conn.execute("delete from outbox where id = ?", (conso_id,))
+        finally:
+            conn.close()
+
+
+def _refused(exc: Exception) -> bool:
+    # refus propre à la ligne (requête invalide, conflit, contrainte) : la renvoyer
+    # échouerait toujours. 401/403/404/408 (clé expirée, RLS, table absente, délai)
+    # touchent tout le paquet et se règlent côté serveur : réessayés avec backoff.
+    response = getattr(exc, "response", None)
+    return response is not None and response.status_code in REFUSED_STATUS
+
+
+def _send(path: str, club: str, items: List[Dict[str, Any]]) -> int:
+    # Envoie items et les retire de la file ; renvoie le nombre de lignes acceptées.
+    # Les lignes sont retirées dès que la base les a acceptées : un échec de la mise à
+    # jour du cache local ensuite ne les renvoie pas (la synchro suivante les relira).
+    # Sur refus définitif, le paquet est coupé en deux jusqu'à isoler les lignes
+    # refusées : les lignes valides du même paquet passent quand même.
+    try:
+        add_consos_bulk(items, club=club, on_sent=lambda chunk: _ack(path, [str(item["id"]) for item in chunk]))
+    except requests.RequestException as exc:
+        if not _refused(exc):
+            raise
+        if len(items) == 1:
+            _reject(path, str(items[0]["id"]), str(exc))
+            return 0
+        half = len(items) // 2
+        return _send(path, club, items[:half]) + _send(path, club, items[half:])
+    return len(items)
+
+
+def _next_wait(path: str) -> float:
+    with _OUTBOX_LOCK:
+        conn = _connect(path)
+        try:
+            (next_try_at,) = conn.execute("select min(next_try_at) from outbox").fetchone()
+        finally:
+            conn.close()
+    if next_try_at is None:
+        return IDLE_WAIT
+    return max(0.0, min(IDLE_WAIT, next_try_at - time.time()))
+
+
+def flush_outbox() -> int:
+    # Envoie tout ce qui est dû, paquet par paquet (un insert par club du paquet) ;
+    # renvoie le nombre de lignes envoyées.
+    # Un envoi en échec passager est replanifié avec backoff, le reste reste en file ;
+    # les lignes refusées par le serveur sont écartées (voir _send).
+    path = _outbox_path()
+    if not path or not os.path.exists(path):
+        return 0
+    sent = 0
+    while True:
+        batch = _due_batch(path)
+        if not batch:
+            return sent
+        by_club: Dict[str, List[Dict[str, Any]]] = {}
+        for item in batch:
+            by_club.setdefault(_club_of(item), []).append(item)
+        for club, items in by_club.items():
+            try:
+                sent += _send(path, club, items)
+            except (requests.RequestException, KeyError, ValueError) as exc:
+                _last_error["message"] = str(exc)
+                _last_error["at"] = time.time()
+                _postpone(path, [str(item["id"]) for item in items])  # lignes déjà envoyées : ignorées
+                return sent
+            _last_error["message"] = None
+
+
+def _run() -> None:
+    while True:
+        _wakeup.clear()
+        try:
+            flush_outbox()
+            path = _outbox_path()
+            wait = _next_wait(path) if path and os.path.exists(path) else IDLE_WAIT
+        except Exception as exc:  # disque plein, fichier verrouillé, cache local... : on réessaie plus tard
+            _last_error["message"] = str(exc)
+            _last_error["at"] = time.time()
+            wait = IDLE_WAIT
+        _wakeup.wait(wait)
+
+
+def ensure_worker() -> None:
+    # un seul thread d'envoi par process (démarré au premier ajout ou au lancement
+    # de l'app, pour vider ce qui restait en file d'une exécution précédente)
+    global _worker
+    with _OUTBOX_LOCK:
+        if _worker is not None and _worker.is_alive():
+            return
+        if not _outbox_path():
+            return
+        _worker = threading.Thread(target=_run, name="outbox-flush", daemon=True)
+        _worker.start()
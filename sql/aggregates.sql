@@ -0,0 +1,57 @@
+-- Agrégats pour le classement et le Hall of Fame (appelé via POST /rest/v1/rpc/consos_aggregates).
+-- Doit rester aligné avec storage.aggregate_consos() (fallback Python).
+-- Lit le rollup journalier public.consos_daily (sql/daily_rollup.sql, à appliquer avant) :
+-- le coût dépend du nombre de jours x personnes x boissons du club, pas du nombre de consos ;
+-- la réponse, elle, ne dépend que du nombre de personnes x boissons.
+-- Appel : {"p_club": "<id>"} ; seule la partition du club est lue (clé primaire du rollup).
+drop function if exists public.consos_aggregates();
+
+create or replace function public.consos_aggregates(p_club text default 'default')
+returns json
+language sql
+stable
+as $$
+  with base as (
+    select
+      to_char(day, 'YYYY-MM-DD') as day,
+      nom,
+      boisson,
+      volume_l
+    from public.consos_daily
+    where club = p_club
+  )
+  select json_build_object(
+    'total_l', (select round(coalesce(sum(volume_l), 0)::numeric, 6)::float8 from base),
+    'by_nom', (
+      select coalesce(json_agg(t order by t.volume_l desc, t.nom collate "C"), '[]'::json)
+      from (select nom, round(sum(volume_l)::numeric, 6)::float8 as volume_l from base group by nom) t
+    ),
+    'by_nom_boisson', (
+      select coalesce(json_agg(t order by t.volume_l desc, t.nom collate "C", t.boisson collate "C"), '[]'::json)
+      from (select nom, boisson, round(sum(volume_l)::numeric, 6)::float8 as volume_l from base group by nom, boisson) t
+    ),
+    'by_boisson', (
+      select coalesce(json_agg(t order by t.volume_l desc, t.boisson collate "C"), '[]'::json)
+      from (select boisson, round(sum(volume_l)::numeric, 6)::float8 as volume_l from base group by boisson) t
+    ),
+    'diversity', (
+      select coalesce(json_agg(t order by t.n_boissons desc, t.nom collate "C"), '[]'::json)
+      from (select nom, count(distinct boisson)::int as n_boissons from base group by nom) t
+    ),
+    -- regroupements par jour : ils grossissent avec l'historique, seule la meilleure entrée sort
+    'best_day', (
+      select row_to_json(t)
+      from (select day, nom, round(sum(volume_l)::numeric, 6)::float8 as volume_l from base group by day, nom) t
+      order by t.volume_l desc, t.day, t.nom collate "C"
+      limit 1
+    ),
+    'party', (
+      select row_to_json(t)
+      from (select day, round(sum(volume_l)::numeric, 6)::float8 as volume_l from base group by day) t
+      order by t.volume_l desc, t.day
+      limit 1
+    )
+  );
+$$;
+
+grant execute on function public.consos_aggregates(text) to anon, authenticated;
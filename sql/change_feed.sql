@@ -0,0 +1,47 @@
+-- Journal des changements de public.consos, lu en long-poll par changefeed.py
+-- (GET /rest/v1/consos_changes?club=eq.<id>&seq=gt.<dernier vu>). Un événement = une ligne ou un id :
+-- le volume transféré ne dépend pas du nombre de clients connectés.
+-- Seules les CHANGES_KEEP (backends.py) dernières entrées sont gardées.
+create table if not exists public.consos_changes (
+  seq bigserial primary key,
+  op text not null check (op in ('INSERT', 'DELETE')),
+  conso_id text not null,
+  record jsonb,
+  club text not null default 'default',
+  at timestamptz not null default now()
+);
+
+-- journal créé avant les clubs (sql/clubs.sql) ; un écouteur par club lit sa plage de l'index
+alter table public.consos_changes add column if not exists club text not null default 'default';
+create index if not exists consos_changes_club_seq_idx on public.consos_changes (club, seq);
+
+create or replace function public.consos_changes_log()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+declare
+  last_seq bigint;
+begin
+  if tg_op = 'INSERT' then
+    insert into public.consos_changes (op, conso_id, record, club)
+    values ('INSERT', new.id::text, to_jsonb(new), new.club)
+    returning seq into last_seq;
+  else
+    insert into public.consos_changes (op, conso_id, club)
+    values ('DELETE', old.id::text, old.club)
+    returning seq into last_seq;
+  end if;
+
+  delete from public.consos_changes where seq <= last_seq - 10000;
+  return null;
+end;
+$$;
+
+drop trigger if exists consos_changes_sync on public.consos;
+create trigger consos_changes_sync
+  after insert or delete on public.consos
+  for each row execute function public.consos_changes_log();
+
+grant select on public.consos_changes to anon, authenticated;
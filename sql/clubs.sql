@@ -0,0 +1,10 @@
+-- Clubs (clubs.py) : chaque conso appartient à un club, toutes les requêtes de l'app
+-- filtrent club=eq.<id>. Les lignes existantes vont au club par défaut ("default").
+-- CLUBS sans club "default" : l'app refuse de démarrer tant que ces lignes n'ont pas de
+-- club configuré. Pour les confier au club <id>, exécuter (le trigger de
+-- daily_rollup.sql déplace aussi le rollup) puis régler LEGACY_CLUB = "<id>" :
+--   update public.consos set club = '<id>' where club = 'default';
+--   update public.consos_changes set club = '<id>' where club = 'default';
+-- À appliquer en premier, puis (ré)appliquer daily_rollup.sql, aggregates.sql,
+-- change_feed.sql et indexes.sql, qui partitionnent rollup, agrégats, journal et index par club.
+alter table public.consos add column if not exists club text not null default 'default';
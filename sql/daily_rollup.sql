@@ -0,0 +1,84 @@
+-- Rollup journalier des consos : volume et nombre de lignes par (club, jour, nom, boisson).
+-- Tenu à jour par trigger à chaque insert / update / delete sur public.consos,
+-- lu par public.consos_aggregates() (sql/aggregates.sql, à appliquer après ce fichier).
+-- Mêmes règles que storage._rollup_of() : nom manquant ou vide = "Inconnu", boisson
+-- manquante ou vide = "Autre", volume manquant = nb * dose_ml / 1000, lignes sans date ignorées.
+-- Déjà déployé avec l'ancienne règle (vide gardé tel quel) : réappliquer ce fichier,
+-- le remplissage initial en bas remet le rollup à plat.
+create table if not exists public.consos_daily (
+  club text not null default 'default',
+  day date not null,
+  nom text not null,
+  boisson text not null,
+  volume_l float8 not null default 0,
+  n integer not null default 0,
+  primary key (club, day, nom, boisson)
+);
+
+-- rollup créé avant les clubs (sql/clubs.sql) : colonne club en tête de la clé
+alter table public.consos_daily add column if not exists club text not null default 'default';
+alter table public.consos_daily drop constraint if exists consos_daily_pkey;
+alter table public.consos_daily add primary key (club, day, nom, boisson);
+
+create or replace function public.consos_daily_apply()
+returns trigger
+language plpgsql
+security definer
+set search_path = public
+as $$
+begin
+  if tg_op in ('UPDATE', 'DELETE') and old.date is not null then
+    update public.consos_daily
+       set volume_l = volume_l - coalesce(old.volume_l, coalesce(old.nb, 0) * coalesce(old.dose_ml, 0) / 1000.0),
+           n = n - 1
+     where club = old.club
+       and day = old.date::date
+       and nom = coalesce(nullif(old.nom, ''), 'Inconnu')
+       and boisson = coalesce(nullif(old.boisson, ''), 'Autre');
+    delete from public.consos_daily
+     where club = old.club
+       and day = old.date::date
+       and nom = coalesce(nullif(old.nom, ''), 'Inconnu')
+       and boisson = coalesce(nullif(old.boisson, ''), 'Autre')
+       and n <= 0;
+  end if;
+
+  if tg_op in ('INSERT', 'UPDATE') and new.date is not null then
+    insert into public.consos_daily as d (club, day, nom, boisson, volume_l, n)
+    values (
+      new.club,
+      new.date::date,
+      coalesce(nullif(new.nom, ''), 'Inconnu'),
+      coalesce(nullif(new.boisson, ''), 'Autre'),
+      coalesce(new.volume_l, coalesce(new.nb, 0) * coalesce(new.dose_ml, 0) / 1000.0),
+      1
+    )
+    on conflict (club, day, nom, boisson) do update
+      set volume_l = d.volume_l + excluded.volume_l,
+          n = d.n + 1;
+  end if;
+
+  return null;
+end;
+$$;
+
+drop trigger if exists consos_daily_sync on public.consos;
+create trigger consos_daily_sync
+  after insert or update or delete on public.consos
+  for each row execute function public.consos_daily_apply();
+
+-- Remplissage initial (et remise à plat si besoin)
+truncate public.consos_daily;
+insert into public.consos_daily (club, day, nom, boisson, volume_l, n)
+select
+  club,
+  date::date,
+  coalesce(nullif(nom, ''), 'Inconnu'),
+  coalesce(nullif(boisson, ''), 'Autre'),
+  sum(coalesce(volume_l, coalesce(nb, 0) * coalesce(dose_ml, 0) / 1000.0)),
+  count(*)
+from public.consos
+where date is not null
+group by 1, 2, 3, 4;
+
+grant select on public.consos_daily to anon, authenticated;
@@ -0,0 +1,25 @@
+-- Index des requêtes filtrées (storage.load_consos_page / load_daily_cells) :
+-- PostgREST traduit club=eq, nom=eq / nom=in, boisson=eq, date=gte / lte en WHERE, servis
+-- par ces index au lieu d'un parcours complet de la table.
+-- Toutes les requêtes portent sur un club (sql/clubs.sql) : il est en tête de chaque index,
+-- une requête ne parcourt que la plage de son club.
+
+-- index d'avant les clubs, remplacés par les versions préfixées ci-dessous
+drop index if exists public.consos_date_created_at_idx;
+drop index if exists public.consos_nom_date_idx;
+drop index if exists public.consos_boisson_date_idx;
+drop index if exists public.consos_created_at_idx;
+drop index if exists public.consos_daily_nom_day_idx;
+drop index if exists public.consos_daily_boisson_day_idx;
+
+-- consos : Historique / Supprimer (tri date desc, created_at desc, filtres nom / boisson / période),
+-- synchro incrémentale (created_at > high-water mark)
+create index if not exists consos_club_date_created_at_idx on public.consos (club, date desc, created_at desc);
+create index if not exists consos_club_nom_date_idx on public.consos (club, nom, date);
+create index if not exists consos_club_boisson_date_idx on public.consos (club, boisson, date);
+create index if not exists consos_club_created_at_idx on public.consos (club, created_at);
+
+-- consos_daily (sql/daily_rollup.sql) : la clé primaire (club, day, nom, boisson) sert les
+-- filtres de période seuls ; ces index servent personne(s) / boisson + période.
+create index if not exists consos_daily_club_nom_day_idx on public.consos_daily (club, nom, day);
+create index if not exists consos_daily_club_boisson_day_idx on public.consos_daily (club, boisson, day);
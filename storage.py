@@ -1,44 +1,787 @@
-# storage.py
 from __future__ import annotations
 
-from typing import Any, Dict, List
-import requests
-import streamlit as st
+from collections import defaultdict
+from datetime import date
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+import os
+import threading
+import time
 
+import pandas as pd
 
-def _headers() -> Dict[str, str]:
-    key = st.secrets["SUPABASE_ANON_KEY"]
+from backends import get_backend, reset_http_session  # noqa: F401  (API publique)
+from clubs import DEFAULT_CLUB, club_configs
+from constants import DRINK_TYPES, NAMES
+from config import setting
+from leaderboard import Leaderboard
+from lru import ClubLRUCache
+from metrics import gauge, span
+from streaks import StreakIndex
+
+try:  # snapshot Parquet local (optionnel)
+    import pyarrow  # noqa: F401
+except ImportError:
+    pyarrow = None
+
+
+# Cache partagé par tout le process (donc entre reruns ET entre sessions), une partition
+# par club : lignes, rollup, classement, séries et agrégats d'un club, sous son propre
+# verrou. Synchro et écritures d'un club ne bloquent ni n'invalident les autres.
+_CLUBS_LOCK = threading.Lock()
+_partitions: Dict[str, Dict[str, Any]] = {}
+
+
+def _new_partition(club: str) -> Dict[str, Any]:
     return {
-        "apikey": key,
-        "Authorization": f"Bearer {key}",
-        "Content-Type": "application/json",
+        "club": club,
+        "lock": threading.Lock(),
+        "snapshot_lock": threading.Lock(),  # voir _save_snapshot
+        "snapshot_at": float("-inf"),
+        "frame": None,  # DataFrame typé partagé : ne pas le modifier en place
+        "version": 0,  # incrémenté à chaque changement de "frame"
+        "fetched_at": 0.0,
+        "full_at": 0.0,
+        "high_water": None,
+        "aggregates": None,
+        "aggregates_at": 0.0,
+        "rollup": None,  # volume par (jour, nom, boisson), suit "frame" (voir load_daily_rollup)
+        "leaderboard": None,  # classement par boisson, suit "rollup" (voir load_leaderboard)
+        "streaks": None,  # séries de jours par personne, suit "rollup" (voir load_streaks)
     }
 
 
-def _base_url() -> str:
-    return st.secrets["SUPABASE_URL"].rstrip("/") + "/rest/v1/consos"
+def _partition(club: str) -> Dict[str, Any]:
+    with _CLUBS_LOCK:
+        part = _partitions.get(club)
+        if part is None:
+            part = _partitions[club] = _new_partition(club)
+        return part
+
+
+DEFAULT_CACHE_TTL = 30.0  # secondes
+DEFAULT_FULL_SYNC_EVERY = 3600.0  # resynchro complète de sécurité (secondes)
+
+BULK_INSERT_CHUNK = 500
+BULK_IDS_CHUNK = 100  # ids par URL id=in.(...)
+
+# Pages d'historique déjà chargées, PAGE_CACHE_SIZE au plus par club
+# (clé : offset, limit, filtres, version des données)
+DEFAULT_PAGE_CACHE_SIZE = 32
+_pages = ClubLRUCache(lambda: setting("PAGE_CACHE_SIZE", DEFAULT_PAGE_CACHE_SIZE))
+
+# Schéma typé (en mémoire et dans le snapshot)
+CONSO_COLUMNS = ["id", "date", "nom", "boisson", "nb", "dose_ml", "volume_l", "created_at"]
+CATEGORY_COLUMNS = ["nom", "boisson"]
+DEFAULT_SNAPSHOT_PATH = os.path.join(".cache", "consos.parquet")
+DEFAULT_SNAPSHOT_EVERY = 60.0  # secondes entre deux réécritures du snapshot, au moins
+ROLLUP_KEYS = ["day", "nom", "boisson"]
+
+
+def _cache_ttl() -> float:
+    return float(setting("CONSOS_CACHE_TTL", DEFAULT_CACHE_TTL))
+
+
+def _sync_mode() -> str:
+    # "delta" : seules les nouvelles lignes transitent ; "full" : rechargement complet
+    return str(setting("CONSOS_SYNC_MODE", "delta")).lower()
+
+
+def _category_order(club: str) -> Dict[str, List[str]]:
+    # noms / boissons du club dans l'ordre de sa config (NAMES / DRINK_TYPES par défaut)
+    conf = club_configs().get(club) or {"names": NAMES, "drinks": DRINK_TYPES}
+    return {"nom": list(conf["names"]), "boisson": list(conf["drinks"])}
+
+
+def _categories(values: Iterable[Any], known: List[str]) -> List[str]:
+    # catégories connues d'abord, puis les valeurs inattendues, triées (jamais perdues)
+    known_set = set(known)
+    return known + sorted({str(v) for v in values} - known_set)
+
+
+def _ordered(values: pd.Series, known: List[str]) -> pd.Series:
+    # recodage sur les seules catégories (pas de passe sur les lignes)
+    return values.cat.set_categories(_categories(values.cat.categories, known))
+
+
+def _typed_frame(rows: Any, club: str = DEFAULT_CLUB) -> pd.DataFrame:
+    # liste de dicts JSON -> colonnes typées (date datetime64, catégories du club, int32)
+    raw = rows if isinstance(rows, pd.DataFrame) else pd.DataFrame(rows)
+    raw = raw.reindex(columns=CONSO_COLUMNS)
+    order = _category_order(club)
+    nb = pd.to_numeric(raw["nb"], errors="coerce").fillna(0).astype("int32")
+    dose_ml = pd.to_numeric(raw["dose_ml"], errors="coerce").fillna(0).astype("int32")
+    volume_l = pd.to_numeric(raw["volume_l"], errors="coerce").astype("float64")
+    return pd.DataFrame(
+        {
+            "id": raw["id"].astype(str),
+            "date": pd.to_datetime(raw["date"], errors="coerce", format="ISO8601"),
+            "nom": _ordered(raw["nom"].astype("category"), order["nom"]),
+            "boisson": _ordered(raw["boisson"].astype("category"), order["boisson"]),
+            "nb": nb,
+            "dose_ml": dose_ml,
+            "volume_l": volume_l.fillna(nb * dose_ml / 1000.0),
+            "created_at": raw["created_at"].astype(object),
+        }
+    )
+
+
+def _sort_frame(frame: pd.DataFrame) -> pd.DataFrame:
+    # même tri que côté serveur : date desc puis created_at desc
+    return frame.sort_values(["date", "created_at"], ascending=False, kind="stable").reset_index(drop=True)
+
+
+def _merge(frame: pd.DataFrame, new: pd.DataFrame, club: str = DEFAULT_CLUB) -> pd.DataFrame:
+    # Les lignes de `new` remplacent celles de même id ; catégories unifiées (ordre du club).
+    # Ajout en fin, sans tri : le cache n'a pas d'ordre (pages servies par le backend,
+    # rollup / classement / séries indépendants de l'ordre), seul _frame_to_rows trie.
+    # Les colonnes catégorielles ne sont recodées que si leur dtype diffère de l'union :
+    # comparer le dtype et pas seulement les valeurs (catégories object d'un frame vide
+    # contre str), sinon concat retombe sur une colonne object.
+    if new.empty:
+        return frame
+    replaced = frame["id"].isin(new["id"])
+    frames = [frame[~replaced] if replaced.any() else frame, new]
+    order = _category_order(club)
+    for col in CATEGORY_COLUMNS:
+        present = frames[0][col].cat.categories.union(frames[1][col].cat.categories)
+        dtype = pd.CategoricalDtype(_categories(present, order[col]))
+        frames = [
+            f if f[col].dtype == dtype else f.assign(**{col: f[col].cat.set_categories(dtype.categories)})
+            for f in frames
+        ]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _frame_to_rows(frame: pd.DataFrame) -> List[Dict[str, Any]]:
+    # lignes triées comme côté serveur (date desc puis created_at desc)
+    frame = _sort_frame(frame)
+    out = frame.astype({col: object for col in CATEGORY_COLUMNS})
+    out["date"] = frame["date"].dt.strftime("%Y-%m-%d")
+    return out.astype(object).where(out.notna(), None).to_dict("records")
+
+
+def _snapshot_path(club: str) -> Optional[str]:
+    # un fichier par club : consos.parquet pour le club par défaut, consos.<club>.parquet sinon
+    if pyarrow is None:
+        return None
+    path = setting("CONSOS_SNAPSHOT_PATH", DEFAULT_SNAPSHOT_PATH)
+    if not path:
+        return None  # chemin vide : snapshot désactivé
+    if club == DEFAULT_CLUB:
+        return str(path)
+    root, ext = os.path.splitext(str(path))
+    return f"{root}.{club}{ext}"
+
+
+def _load_snapshot(club: str) -> Optional[pd.DataFrame]:
+    path = _snapshot_path(club)
+    if not path or not os.path.exists(path):
+        return None
+    try:
+        frame = pd.read_parquet(path, memory_map=True)
+    except (OSError, ValueError):  # snapshot illisible : on repart du serveur
+        return None
+    if list(frame.columns) != CONSO_COLUMNS:  # ancien schéma
+        return None
+    order = _category_order(club)  # config du club modifiée depuis l'écriture du snapshot
+    for col in CATEGORY_COLUMNS:
+        frame[col] = _ordered(frame[col], order[col])
+    return frame
+
+
+def _save_snapshot(part: Dict[str, Any], frame: pd.DataFrame) -> None:
+    # Appelé hors du verrou du cache : réécrire le fichier (~0,6 s à 1M lignes) ne bloque
+    # ni lectures ni écritures. Une écriture à la fois par club, au plus une toutes les
+    # CONSOS_SNAPSHOT_EVERY secondes : le snapshot peut avoir un peu de retard, le
+    # démarrage à froid le réconcilie (delta + comparaison des ids).
+    path = _snapshot_path(part["club"])
+    every = float(setting("CONSOS_SNAPSHOT_EVERY", DEFAULT_SNAPSHOT_EVERY))
+    if not path or time.monotonic() - part["snapshot_at"] < every:
+        return
+    if not part["snapshot_lock"].acquire(blocking=False):
+        return  # écriture déjà en cours
+    try:
+        part["snapshot_at"] = time.monotonic()
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp = path + ".tmp"
+        frame.to_parquet(tmp, index=False)
+        os.replace(tmp, path)  # écriture atomique
+    except OSError:
+        pass  # le snapshot n'est qu'une accélération
+    finally:
+        part["snapshot_lock"].release()
+
+
+def _label(values: pd.Series, default: str) -> pd.Series:
+    # mêmes valeurs par défaut que aggregate_consos (manquant ou vide)
+    values = values.astype(object)
+    return values.where(values.notna() & (values != ""), default).astype(str)
+
+
+def _rollup_of(frame: pd.DataFrame) -> pd.DataFrame:
+    # volume et nombre de lignes par (jour, nom, boisson) ; lignes sans date ignorées
+    valid = frame[frame["date"].notna()]
+    cells = pd.DataFrame(
+        {
+            "day": valid["date"].dt.normalize(),
+            "nom": _label(valid["nom"], "Inconnu"),
+            "boisson": _label(valid["boisson"], "Autre"),
+            "volume_l": valid["volume_l"].fillna(0.0),
+            "n": 1,
+        }
+    )
+    return cells.groupby(ROLLUP_KEYS, sort=False)[["volume_l", "n"]].sum()
+
+
+def _rollup_update(
+    rollup: Optional[pd.DataFrame], plus: Optional[pd.DataFrame], minus: Optional[pd.DataFrame]
+) -> Optional[pd.DataFrame]:
+    # Mise à jour incrémentale : coût proportionnel à la taille du rollup
+    # (jours x personnes x boissons) et des lignes modifiées, pas de la table.
+    if rollup is None:
+        return None  # reconstruit à la prochaine lecture
+    if plus is not None:
+        rollup = rollup.add(plus, fill_value=0)
+    if minus is not None:
+        rollup = rollup.sub(minus, fill_value=0)
+    rollup = rollup[rollup["n"] > 0]
+    return rollup.astype({"n": "int64"}).sort_index()
+
+
+def _board_cells(cells: pd.DataFrame, sign: int = 1) -> List[Tuple[str, str, float, int]]:
+    per_drink = cells.groupby(level=["nom", "boisson"], sort=False).sum()
+    return [
+        (nom, boisson, sign * float(volume), sign * int(n))
+        for (nom, boisson), volume, n in zip(per_drink.index, per_drink["volume_l"], per_drink["n"])
+    ]
+
+
+def _streak_cells(cells: pd.DataFrame, sign: int = 1) -> List[Tuple[str, date, int]]:
+    per_day = cells["n"].groupby(level=["nom", "day"], sort=False).sum()
+    return [(nom, day.date(), sign * int(n)) for (nom, day), n in zip(per_day.index, per_day)]
+
+
+INDEX_KEYS = ("rollup", "leaderboard", "streaks")
+
+
+def _indexes_after(
+    state: Dict[str, Any], added: Optional[pd.DataFrame], removed: Optional[pd.DataFrame]
+) -> Dict[str, Any]:
+    # lignes entrées / sorties du cache -> nouveaux rollup, classement et séries, sans
+    # toucher à `state` (partition ou résultat précédent) : copiés avant modification.
+    plus = _rollup_of(added) if added is not None and not added.empty else None
+    minus = _rollup_of(removed) if removed is not None and not removed.empty else None
+    after = {key: state[key] for key in INDEX_KEYS}
+    if plus is None and minus is None:
+        return after
+    after["rollup"] = _rollup_update(state["rollup"], plus, minus)
+    if after["leaderboard"] is not None:
+        board = after["leaderboard"].copy()
+        for cells, sign in ((plus, 1), (minus, -1)):
+            if cells is not None:
+                board.apply_cells(_board_cells(cells, sign))
+        after["leaderboard"] = board
+    if after["streaks"] is not None:
+        index = after["streaks"].copy()
+        for cells, sign in ((plus, 1), (minus, -1)):
+            if cells is not None:
+                index.apply_cells(_streak_cells(cells, sign))
+        after["streaks"] = index
+    return after
+
+
+def _commit(
+    part: Dict[str, Any], frame: pd.DataFrame, added: Optional[pd.DataFrame], removed: Optional[pd.DataFrame]
+) -> None:
+    # sous part["lock"], après construction du nouveau frame : index calculés d'abord,
+    # puis frame, index et version remplacés ensemble. Une erreur en route laisse la
+    # partition intacte (un nouvel essai ne compte pas deux fois les mêmes lignes).
+    indexes = _indexes_after(part, added, removed)
+    part.update(indexes, frame=frame, version=part["version"] + 1, aggregates=None)
+
+
+def _high_water(frame: pd.DataFrame, current: Optional[str] = None) -> Optional[str]:
+    stamps = frame["created_at"].dropna().astype(str)
+    best = stamps.max() if not stamps.empty else None
+    if current and (best is None or current > best):
+        return current
+    return best
+
+
+def _delta_sync(
+    part: Dict[str, Any], frame: pd.DataFrame, high_water: Optional[str], check_ids: bool = False
+) -> Tuple[pd.DataFrame, List[Tuple[pd.DataFrame, pd.DataFrame]]]:
+    # renvoie le frame réconcilié et les changements (ajoutées, retirées) dans l'ordre :
+    # rien n'est appliqué à la partition ici, load_consos_df remplace tout d'un coup
+    backend = get_backend(part["club"])
+    changes: List[Tuple[pd.DataFrame, pd.DataFrame]] = []
+
+    # 1) nouvelles lignes depuis le dernier high-water mark
+    if high_water:
+        new = _typed_frame(backend.fetch_since(high_water), part["club"])
+        if not new.empty:
+            replaced = frame[frame["id"].isin(new["id"])]
+            frame = _merge(frame, new, part["club"])
+            changes.append((new, replaced))
+
+    # 2) suppressions (ou insertions ratées) : si le nombre de lignes diffère,
+    #    on compare les ensembles d'ids (seulement la colonne id transite).
+    #    check_ids force la comparaison (snapshot relu depuis le disque).
+    if check_ids or backend.count() != len(frame):
+        remote_ids = set(backend.fetch_ids())
+        local_ids = set(frame["id"])
+        if remote_ids != local_ids:
+            missing = list(remote_ids - local_ids)
+            kept = frame["id"].isin(remote_ids)
+            removed = frame[~kept]
+            frame = frame[kept].reset_index(drop=True)
+            fetched: List[Dict[str, Any]] = []
+            for chunk in _chunks(missing, BULK_IDS_CHUNK):
+                fetched.extend(backend.fetch_by_ids(chunk))
+            new = _typed_frame(fetched, part["club"])
+            frame = _merge(frame, new, part["club"])
+            changes.append((new, removed))
+
+    return frame, changes
+
+
+def invalidate_cache(club: Optional[str] = None) -> None:
+    # un club, ou tous (None)
+    with _CLUBS_LOCK:
+        parts = list(_partitions.values()) if club is None else [_partitions.get(club)]
+    for part in parts:
+        if part is None:
+            continue
+        with part["lock"]:
+            part["frame"] = None
+            part["version"] += 1
+            part["fetched_at"] = 0.0
+            part["full_at"] = 0.0
+            part["high_water"] = None
+            part["aggregates"] = None
+            part["rollup"] = None
+            part["leaderboard"] = None
+            part["streaks"] = None
+
+
+def load_consos_df(force: bool = False, club: str = DEFAULT_CLUB) -> pd.DataFrame:
+    # DataFrame typé partagé entre sessions (lecture seule : copier avant de modifier).
+    # Un seul fetch à la fois par club : les sessions concurrentes attendent le résultat
+    # au lieu de relancer chacune une requête complète.
+    part = _partition(club)
+    to_save: Optional[pd.DataFrame] = None
+    with part["lock"]:
+        frame: Optional[pd.DataFrame] = part["frame"]
+        expired = time.monotonic() - part["fetched_at"] > _cache_ttl()
+        if force or frame is None or expired:
+            now = time.monotonic()
+            from_snapshot = False
+            if frame is None and _sync_mode() == "delta":
+                # démarrage à froid : snapshot local, puis réconciliation par delta
+                with span("snapshot_load"):
+                    frame = _load_snapshot(club)
+                if frame is not None:
+                    from_snapshot = True
+                    part["full_at"] = now
+                    part["high_water"] = _high_water(frame)
 
+            full_due = now - part["full_at"] > float(setting("CONSOS_FULL_SYNC_EVERY", DEFAULT_FULL_SYNC_EVERY))
+            if frame is None or _sync_mode() != "delta" or full_due or not part["high_water"]:
+                with span("sync", mode="full"):
+                    frame = _typed_frame(get_backend(club).fetch_all(), club)
+                part["full_at"] = now
+                part["high_water"] = _high_water(frame)
+                part["rollup"] = None
+                part["leaderboard"] = None
+                part["streaks"] = None
+                changed = True
+            else:
+                with span("sync", mode="delta"):
+                    frame, changes = _delta_sync(part, frame, part["high_water"], check_ids=from_snapshot)
+                    indexes = {key: part[key] for key in INDEX_KEYS}
+                    for added, removed in changes:
+                        indexes = _indexes_after(indexes, added, removed)
+                part.update(indexes)  # avec le frame ci-dessous, sans lock relâché entre les deux
+                part["high_water"] = _high_water(frame, part["high_water"])
+                changed = bool(changes)
+            if changed:
+                to_save = frame
+            if frame is not part["frame"]:
+                part["version"] += 1
+                part["aggregates"] = None  # sinon load_aggregates servirait l'ancien état sous la nouvelle version
+            part["frame"] = frame
+            part["fetched_at"] = now
+            gauge("consos_rows", len(frame), club=club)
+    if to_save is not None:
+        _save_snapshot(part, to_save)
+    return frame
 
-def load_consos() -> List[Dict[str, Any]]:
-    # tri : date desc puis created_at desc
-    url = _base_url()
-    params = {
-        "select": "*",
-        "order": "date.desc,created_at.desc",
+
+def data_version(club: str = DEFAULT_CLUB) -> int:
+    # change dès que les données en cache du club changent (clé des caches de l'app)
+    return _partition(club)["version"]
+
+
+def load_daily_rollup(force: bool = False, club: str = DEFAULT_CLUB) -> pd.DataFrame:
+    # Rollup journalier partagé (lecture seule) : index (day, nom, boisson),
+    # colonnes volume_l et n (nombre de lignes). Construit une fois depuis le cache,
+    # puis tenu à jour à chaque ajout / suppression / synchro delta.
+    load_consos_df(force=force, club=club)
+    part = _partition(club)
+    with part["lock"]:
+        return _current_rollup(part)
+
+
+def _current_rollup(part: Dict[str, Any]) -> pd.DataFrame:
+    # sous part["lock"], après load_consos_df
+    if part["frame"] is None:  # invalidate_cache() entre-temps
+        return _rollup_of(_typed_frame([]))
+    if part["rollup"] is None:
+        with span("rollup_build"):
+            part["rollup"] = _rollup_of(part["frame"]).sort_index()
+        gauge("rollup_cells", len(part["rollup"]), club=part["club"])
+    return part["rollup"]
+
+
+def load_leaderboard(force: bool = False, club: str = DEFAULT_CLUB) -> Leaderboard:
+    # Classement partagé (lecture seule) par boisson et "all", construit depuis le
+    # rollup puis mis à jour à chaque écriture / synchro : aucune lecture ne refait
+    # de groupby. Pour y ajouter des lignes, travailler sur board.copy().
+    load_consos_df(force=force, club=club)
+    part = _partition(club)
+    with part["lock"]:
+        if part["leaderboard"] is None:
+            board = Leaderboard()
+            rollup = _current_rollup(part)
+            with span("leaderboard_build"):
+                board.apply_cells(_board_cells(rollup))
+            part["leaderboard"] = board
+        return part["leaderboard"]
+
+
+def load_streaks(force: bool = False, club: str = DEFAULT_CLUB) -> StreakIndex:
+    # Séries de jours consécutifs par personne (lecture seule), construites depuis le
+    # rollup puis tenues à jour comme le classement. Pour y ajouter des lignes : copy().
+    load_consos_df(force=force, club=club)
+    part = _partition(club)
+    with part["lock"]:
+        if part["streaks"] is None:
+            index = StreakIndex()
+            rollup = _current_rollup(part)
+            with span("streaks_build"):
+                index.apply_cells(_streak_cells(rollup))
+            part["streaks"] = index
+        return part["streaks"]
+
+
+def load_consos(force: bool = False, club: str = DEFAULT_CLUB) -> List[Dict[str, Any]]:
+    return _frame_to_rows(load_consos_df(force=force, club=club))
+
+
+def load_consos_page(
+    offset: int, limit: int, filters: Optional[Dict[str, Any]] = None, club: str = DEFAULT_CLUB
+) -> Tuple[List[Dict[str, Any]], int]:
+    # Une page de lignes (même tri que load_consos) + nombre total de lignes filtrées.
+    # Seule la page transite ; résultat mis en cache jusqu'au prochain changement de données.
+    key = (offset, limit, _frozen(filters), data_version(club))
+    return _pages.get_or_build(club, key, lambda: get_backend(club).fetch_page(offset, limit, filters))
+
+
+def load_daily_cells(filters: Optional[Dict[str, Any]] = None, club: str = DEFAULT_CLUB) -> pd.DataFrame:
+    # Rollup journalier restreint aux filtres (nom / boisson : valeur ou liste,
+    # date_from / date_to), mêmes index et colonne volume_l que load_daily_rollup.
+    # Les prédicats sont évalués par le moteur : 7 jours demandés = 7 jours transférés.
+    # Mis en cache avec les pages, jusqu'au prochain changement de données.
+    key = ("daily", _frozen(filters), data_version(club))
+    return _pages.get_or_build(club, key, lambda: _cells_frame(get_backend(club).fetch_daily(filters)))
+
+
+def _frozen(filters: Optional[Dict[str, Any]]) -> tuple:
+    return tuple(
+        sorted((k, tuple(sorted(v)) if isinstance(v, (list, tuple, set)) else v) for k, v in (filters or {}).items())
+    )
+
+
+def _cells_frame(cells: List[Dict[str, Any]]) -> pd.DataFrame:
+    raw = pd.DataFrame(cells).reindex(columns=["day", "nom", "boisson", "volume_l", "nb", "dose_ml"])
+    fallback = pd.to_numeric(raw["nb"], errors="coerce").fillna(0) * pd.to_numeric(raw["dose_ml"], errors="coerce").fillna(0)
+    frame = pd.DataFrame(
+        {
+            "day": pd.to_datetime(raw["day"].astype(str).str[:10], errors="coerce", format="%Y-%m-%d"),
+            "nom": _label(raw["nom"], "Inconnu"),
+            "boisson": _label(raw["boisson"], "Autre"),
+            "volume_l": pd.to_numeric(raw["volume_l"], errors="coerce").fillna(fallback / 1000.0),
+        }
+    ).dropna(subset=["day"])
+    return frame.groupby(ROLLUP_KEYS, sort=True)[["volume_l"]].sum()
+
+
+def _chunks(values: List[Any], size: int) -> List[List[Any]]:
+    return [values[i:i + size] for i in range(0, len(values), size)]
+
+
+def _cache_add(part: Dict[str, Any], new_rows: List[Dict[str, Any]]) -> None:
+    # write-through : les lignes renvoyées (avec created_at) sont ajoutées au cache du club
+    with part["lock"]:
+        if part["frame"] is not None:
+            new = _typed_frame(new_rows, part["club"])
+            replaced = part["frame"][part["frame"]["id"].isin(new["id"])]
+            _commit(part, _merge(part["frame"], new, part["club"]), new, replaced)
+        else:
+            part["version"] += 1  # pas de frame : un load_aggregates en cours ne gardera pas son résultat
+        part["aggregates"] = None
+
+
+def _cache_remove(part: Dict[str, Any], ids: List[str]) -> None:
+    with part["lock"]:
+        frame = part["frame"]
+        if frame is not None:
+            gone = frame["id"].isin([str(i) for i in ids])
+            _commit(part, frame[~gone].reset_index(drop=True), None, frame[gone])
+        else:
+            part["version"] += 1
+        part["aggregates"] = None
+
+
+def apply_remote_changes(
+    inserted: List[Dict[str, Any]], deleted_ids: List[str], club: str = DEFAULT_CLUB
+) -> bool:
+    # Changements vus par le flux (changefeed.py) : appliqués au cache comme les
+    # écritures locales. Les ids déjà connus (nos propres ajouts, déjà en cache)
+    # et les suppressions déjà faites ne changent rien : pas de nouvelle version.
+    part = _partition(club)
+    with part["lock"]:
+        frame = part["frame"]
+        if frame is None:
+            return False  # rien en mémoire : le prochain chargement lira tout
+        new = _typed_frame(inserted, club)
+        new = new[~new["id"].isin(frame["id"])]
+        gone = frame["id"].isin([str(i) for i in deleted_ids])
+        if new.empty and not gone.any():
+            return False
+        kept = frame[~gone].reset_index(drop=True)
+        _commit(part, _merge(kept, new, club), new, frame[gone])
+        return True
+
+
+def add_consos_bulk(
+    items: List[Dict[str, Any]],
+    club: str = DEFAULT_CLUB,
+    on_sent: Optional[Callable[[List[Dict[str, Any]]], None]] = None,
+) -> int:
+    # un insert (POST tableau JSON côté Supabase) par paquet de BULK_INSERT_CHUNK lignes ;
+    # on_sent(paquet) est appelé dès que la base a accepté le paquet, avant la mise à
+    # jour du cache (qui peut encore échouer)
+    backend, part = get_backend(club), _partition(club)
+    for chunk in _chunks(list(items), BULK_INSERT_CHUNK):
+        created = backend.insert(chunk)
+        if on_sent is not None:
+            on_sent(chunk)
+        returned = {str(row.get("id")) for row in created}
+        # lignes déjà présentes (retry) : pas renvoyées, on garde la version locale
+        _cache_add(part, created + [item for item in chunk if str(item.get("id")) not in returned])
+    return len(items)
+
+
+def delete_consos_bulk(conso_ids: List[str], club: str = DEFAULT_CLUB) -> int:
+    # id=in.(...) par paquet de BULK_IDS_CHUNK ids (longueur d'URL bornée) ;
+    # un id d'un autre club n'est ni supprimé ni retiré du cache
+    ids = [str(i) for i in conso_ids]
+    backend, part = get_backend(club), _partition(club)
+    for chunk in _chunks(ids, BULK_IDS_CHUNK):
+        backend.delete(chunk)
+        _cache_remove(part, chunk)
+    return len(ids)
+
+
+def add_conso(item: Dict[str, Any], club: str = DEFAULT_CLUB) -> None:
+    add_consos_bulk([item], club=club)
+
+
+def delete_conso(conso_id: str, club: str = DEFAULT_CLUB) -> None:
+    delete_consos_bulk([conso_id], club=club)
+
+
+# =====================
+# Agrégats (classement + Hall of Fame)
+# =====================
+# Même calcul que la fonction SQL public.consos_aggregates() (sql/aggregates.sql) :
+# volume manquant = nb * dose_ml / 1000, nom manquant ou vide = "Inconnu", boisson
+# manquante ou vide = "Autre", lignes sans date valide ignorées, sommes arrondies à 1e-6,
+# listes triées par volume décroissant puis par clé croissante.
+
+def _volume_of(row: Dict[str, Any]) -> float:
+    try:
+        if row.get("volume_l") is not None:
+            return float(row["volume_l"])
+    except (TypeError, ValueError):
+        pass
+    try:
+        return int(row.get("nb") or 0) * int(row.get("dose_ml") or 0) / 1000.0
+    except (TypeError, ValueError):
+        return 0.0
+
+
+def _day_of(row: Dict[str, Any]) -> Optional[str]:
+    try:
+        return date.fromisoformat(str(row.get("date"))[:10]).isoformat()
+    except ValueError:
+        return None
+
+
+def _ranked(totals: Dict[Tuple[str, ...], float], keys: Tuple[str, ...]) -> List[Dict[str, Any]]:
+    items = sorted(totals.items(), key=lambda kv: kv[0])
+    items.sort(key=lambda kv: round(kv[1], 6), reverse=True)
+    return [{**dict(zip(keys, k)), "volume_l": round(v, 6)} for k, v in items]
+
+
+def _top(totals: Dict[Tuple[str, ...], float], keys: Tuple[str, ...]) -> Optional[Dict[str, Any]]:
+    # meilleure entrée seulement (même ordre que _ranked) : ces regroupements
+    # grossissent avec l'historique, le Hall of Fame n'en lit que le premier
+    ranked = _ranked(totals, keys)
+    return ranked[0] if ranked else None
+
+
+def aggregate_consos(rows: Iterable[Dict[str, Any]]) -> Dict[str, Any]:
+    # fallback 100% Python (hors ligne / fonction SQL absente)
+    by_nom: Dict[Tuple[str, ...], float] = defaultdict(float)
+    by_nom_boisson: Dict[Tuple[str, ...], float] = defaultdict(float)
+    by_day: Dict[Tuple[str, ...], float] = defaultdict(float)
+    by_day_nom: Dict[Tuple[str, ...], float] = defaultdict(float)
+    by_boisson: Dict[Tuple[str, ...], float] = defaultdict(float)
+    drinks_per_nom: Dict[str, set] = defaultdict(set)
+    total = 0.0
+
+    for row in rows:
+        day = _day_of(row)
+        if day is None:
+            continue
+        nom = row.get("nom") or "Inconnu"
+        boisson = row.get("boisson") or "Autre"
+        vol = _volume_of(row)
+        total += vol
+        by_nom[(nom,)] += vol
+        by_nom_boisson[(nom, boisson)] += vol
+        by_day[(day,)] += vol
+        by_day_nom[(day, nom)] += vol
+        by_boisson[(boisson,)] += vol
+        drinks_per_nom[nom].add(boisson)
+
+    return {
+        "total_l": round(total, 6),
+        "by_nom": _ranked(by_nom, ("nom",)),
+        "by_nom_boisson": _ranked(by_nom_boisson, ("nom", "boisson")),
+        "by_boisson": _ranked(by_boisson, ("boisson",)),
+        "diversity": _diversity({nom: len(drinks) for nom, drinks in drinks_per_nom.items()}),
+        "best_day": _top(by_day_nom, ("day", "nom")),
+        "party": _top(by_day, ("day",)),
     }
-    r = requests.get(url, headers=_headers(), params=params, timeout=20)
-    r.raise_for_status()
-    return r.json()  # liste de dicts
 
 
-def add_conso(item: Dict[str, Any]) -> None:
-    url = _base_url()
-    r = requests.post(url, headers=_headers(), json=item, timeout=20)
-    r.raise_for_status()
+def _diversity(n_drinks: Dict[str, int]) -> List[Dict[str, Any]]:
+    diversity = sorted(n_drinks.items(), key=lambda x: x[0])
+    diversity.sort(key=lambda x: x[1], reverse=True)
+    return [{"nom": n, "n_boissons": k} for n, k in diversity]
+
+
+def _rollup_rows(rollup: pd.DataFrame) -> List[Dict[str, Any]]:
+    # une ligne par cellule (jour, nom, boisson) : mêmes agrégats que sur les lignes brutes
+    cells = rollup.reset_index()
+    cells["date"] = cells["day"].dt.strftime("%Y-%m-%d")
+    return cells[["date", "nom", "boisson", "volume_l"]].to_dict("records")
+
+
+def load_aggregates(force: bool = False, club: str = DEFAULT_CLUB) -> Dict[str, Any]:
+    # calculés par le backend (RPC Supabase), sinon calcul local sur le rollup journalier
+    part = _partition(club)
+    with part["lock"]:
+        aggs = part["aggregates"]
+        if not force and aggs is not None and time.monotonic() - part["aggregates_at"] <= _cache_ttl():
+            return aggs
+        version = part["version"]
+
+    with span("aggregates", source="backend"):
+        aggs = get_backend(club).aggregates()
+    if aggs is None:
+        rollup = load_daily_rollup(force=force, club=club)
+        with span("aggregates", source="local"):
+            aggs = aggregate_consos(_rollup_rows(rollup))
+
+    with part["lock"]:
+        # une écriture pendant le calcul : résultat rendu mais pas gardé (il peut
+        # précéder l'écriture, qui a déjà vidé le cache)
+        if part["version"] == version:
+            part["aggregates"] = aggs
+            part["aggregates_at"] = time.monotonic()
+    return aggs
+
+
+def _merged_ranked(
+    ranked: List[Dict[str, Any]], keys: Tuple[str, ...], extra: Dict[Tuple[str, ...], float]
+) -> List[Dict[str, Any]]:
+    totals = {tuple(row[k] for k in keys): float(row["volume_l"]) for row in ranked}
+    for key, vol in extra.items():
+        totals[key] = totals.get(key, 0.0) + vol
+    return _ranked(totals, keys)
+
+
+def aggregates_with(extra: Iterable[Dict[str, Any]], club: str = DEFAULT_CLUB) -> Dict[str, Any]:
+    # Agrégats + lignes supplémentaires (ajouts en file d'envoi), sans tout recalculer :
+    # les listes par nom / boisson (petites) absorbent les lignes directement ; les badges
+    # par jour ne gardent que la meilleure entrée, on les recalcule donc pour les seuls
+    # jours touchés (totaux du rollup local + lignes) face à la meilleure entrée actuelle.
+    extra = list(extra)
+    base = load_aggregates(club=club)
+    if not extra:
+        return base
+
+    with span("aggregates", source="pending"):
+        by_nom: Dict[Tuple[str, ...], float] = defaultdict(float)
+        by_nom_boisson: Dict[Tuple[str, ...], float] = defaultdict(float)
+        by_boisson: Dict[Tuple[str, ...], float] = defaultdict(float)
+        by_day: Dict[Tuple[str, ...], float] = defaultdict(float)
+        by_day_nom: Dict[Tuple[str, ...], float] = defaultdict(float)
+        total = 0.0
+        for row in extra:
+            day = _day_of(row)
+            if day is None:
+                continue
+            nom = row.get("nom") or "Inconnu"
+            boisson = row.get("boisson") or "Autre"
+            vol = _volume_of(row)
+            total += vol
+            by_nom[(nom,)] += vol
+            by_nom_boisson[(nom, boisson)] += vol
+            by_boisson[(boisson,)] += vol
+            by_day[(day,)] += vol
+            by_day_nom[(day, nom)] += vol
+
+        # by_nom_boisson liste toutes les paires : une paire absente = une boisson de plus
+        known = {(row["nom"], row["boisson"]) for row in base["by_nom_boisson"]}
+        diversity = {row["nom"]: row["n_boissons"] for row in base["diversity"]}
+        for nom, boisson in by_nom_boisson.keys() - known:
+            diversity[nom] = diversity.get(nom, 0) + 1
 
+        rollup = load_daily_rollup(club=club)
+        touched = rollup[rollup.index.get_level_values("day").isin(pd.to_datetime([d for (d,) in by_day]))]
+        per_day_nom = touched.groupby(level=["day", "nom"], observed=True)["volume_l"].sum()
+        for (day, nom), vol in per_day_nom.items():
+            by_day_nom[(day.date().isoformat(), str(nom))] += vol
+        for day, vol in per_day_nom.groupby(level="day").sum().items():
+            by_day[(day.date().isoformat(),)] += vol
+        # la meilleure entrée actuelle reste candidate si son jour n'est pas touché
+        best, party = base["best_day"], base["party"]
+        if best is not None:
+            by_day_nom.setdefault((best["day"], best["nom"]), float(best["volume_l"]))
+        if party is not None:
+            by_day.setdefault((party["day"],), float(party["volume_l"]))
 
-def delete_conso(conso_id: str) -> None:
-    url = _base_url()
-    params = {"id": f"eq.{conso_id}"}
-    r = requests.delete(url, headers=_headers(), params=params, timeout=20)
-    r.raise_for_status()
+        return {
+            "total_l": round(float(base["total_l"]) + total, 6),
+            "by_nom": _merged_ranked(base["by_nom"], ("nom",), by_nom),
+            "by_nom_boisson": _merged_ranked(base["by_nom_boisson"], ("nom", "boisson"), by_nom_boisson),
+            "by_boisson": _merged_ranked(base["by_boisson"], ("boisson",), by_boisson),
+            "diversity": _diversity(diversity),
+            "best_day": _top(by_day_nom, ("day", "nom")),
+            "party": _top(by_day, ("day",)),
+        }
@@ -0,0 +1,158 @@
+# streaks.py
+from __future__ import annotations
+
+from bisect import bisect_left, bisect_right, insort
+from datetime import date
+from typing import Dict, Iterable, List, Optional, Set, Tuple
+
+
+class _Runs:
+    # Jours actifs d'une personne (jour ordinal -> nombre de lignes) et séries de
+    # jours consécutifs : débuts triés + fin de chaque série + longueurs triées.
+
+    def __init__(self) -> None:
+        self.counts: Dict[int, int] = {}
+        self.starts: List[int] = []
+        self.ends: Dict[int, int] = {}
+        self.lengths: List[int] = []
+
+    def clone(self) -> "_Runs":
+        runs = _Runs()
+        runs.counts = dict(self.counts)
+        runs.starts = list(self.starts)
+        runs.ends = dict(self.ends)
+        runs.lengths = list(self.lengths)
+        return runs
+
+    def _add_run(self, start: int, end: int) -> None:
+        insort(self.starts, start)
+        self.ends[start] = end
+        insort(self.lengths, end - start + 1)
+
+    def _drop_run(self, start: int) -> int:
+        end = self.ends.pop(start)
+        del self.starts[bisect_left(self.starts, start)]
+        del self.lengths[bisect_left(self.lengths, end - start + 1)]
+        return end
+
+    def activate(self, day: int) -> None:
+        # jour sans conso -> actif : fusion avec les séries voisines (veille / lendemain)
+        i = bisect_right(self.starts, day)
+        start, end = day, day
+        if i > 0 and self.ends[self.starts[i - 1]] == day - 1:
+            start = self.starts[i - 1]
+            self._drop_run(start)
+        if day + 1 in self.ends:
+            end = self._drop_run(day + 1)
+        self._add_run(start, end)
+
+    def deactivate(self, day: int) -> None:
+        # jour actif -> sans conso : la série qui le contient est coupée en deux
+        start = self.starts[bisect_right(self.starts, day) - 1]
+        end = self._drop_run(start)
+        if start < day:
+            self._add_run(start, day - 1)
+        if day < end:
+            self._add_run(day + 1, end)
+
+    def best(self) -> int:
+        return self.lengths[-1] if self.lengths else 0
+
+    def last(self) -> Optional[int]:
+        return self.ends[self.starts[-1]] if self.starts else None
+
+    def current(self, today: int) -> int:
+        # série en cours : la dernière, si elle touche aujourd'hui ou hier
+        last = self.last()
+        if last is None or last < today - 1:
+            return 0
+        return last - self.starts[-1] + 1
+
+
+class StreakIndex:
+    # Séries de jours consécutifs par personne, maintenues incrémentalement comme le
+    # classement (leaderboard.py). Un ajout / une suppression ne touche que les séries
+    # voisines du jour concerné ; meilleure série, série en cours et dernier jour actif
+    # se lisent sans recalcul.
+    # Tri du classement : meilleure série décroissante puis nom croissant.
+    # copy() est paresseuse : une personne n'est dupliquée qu'à sa première modification.
+
+    def __init__(self) -> None:
+        self._runs: Dict[str, _Runs] = {}
+        self._owned: Set[str] = set()  # personnes dont les séries appartiennent à cette copie
+        self._ranked: List[Tuple[int, str]] = []  # [(-meilleure série, nom)]
+
+    def _person(self, nom: str) -> _Runs:
+        runs = self._runs.get(nom)
+        if runs is None:
+            runs = self._runs[nom] = _Runs()
+        elif nom not in self._owned:
+            runs = self._runs[nom] = runs.clone()
+        self._owned.add(nom)
+        return runs
+
+    def apply(self, nom: str, day: date, n: int = 1) -> None:
+        # n = +lignes ajoutées / -lignes supprimées ce jour-là
+        runs = self._person(nom)
+        key = day.toordinal()
+        before = runs.counts.get(key, 0)
+        after = before + n
+        old_best = runs.best()
+        if after > 0:
+            runs.counts[key] = after
+        else:
+            runs.counts.pop(key, None)
+        if before <= 0 < after:
+            runs.activate(key)
+        elif after <= 0 < before:
+            runs.deactivate(key)
+
+        new_best = runs.best()
+        if new_best != old_best:
+            if old_best:
+                del self._ranked[bisect_left(self._ranked, (-old_best, nom))]
+            if new_best:
+                insort(self._ranked, (-new_best, nom))
+        if not runs.counts:
+            del self._runs[nom]
+            self._owned.discard(nom)
+
+    def apply_cells(self, cells: Iterable[Tuple[str, date, int]]) -> None:
+        for nom, day, n in cells:
+            self.apply(nom, day, n)
+
+    def copy(self) -> "StreakIndex":
+        index = StreakIndex()
+        index._runs = dict(self._runs)
+        index._ranked = list(self._ranked)
+        self._owned = set()  # les séries sont désormais partagées : copie avant écriture des deux côtés
+        return index
+
+    def best(self, nom: str) -> int:
+        runs = self._runs.get(nom)
+        return runs.best() if runs else 0
+
+    def current(self, nom: str, today: date) -> int:
+        runs = self._runs.get(nom)
+        return runs.current(today.toordinal()) if runs else 0
+
+    def last_day(self, nom: str) -> Optional[date]:
+        runs = self._runs.get(nom)
+        last = runs.last() if runs else None
+        return date.fromordinal(last) if last is not None else None
+
+    def ranking(self) -> List[Tuple[str, int]]:
+        return [(nom, -best) for best, nom in self._ranked]
+
+    def top(self, k: int) -> List[Tuple[str, int]]:
+        return [(nom, -best) for best, nom in self._ranked[:k]]
+
+    def active(self, today: date) -> List[Tuple[str, int, date]]:
+        # séries en cours (dernière conso aujourd'hui ou hier), plus longues d'abord
+        ordinal = today.toordinal()
+        rows = []
+        for nom, runs in self._runs.items():
+            current = runs.current(ordinal)
+            if current:
+                rows.append((nom, current, date.fromordinal(runs.last())))
+        return sorted(rows, key=lambda row: (-row[1], row[0]))
@@ -0,0 +1,321 @@
+# transfer.py
+# Usage :
+#   python transfer.py export consos.csv [--club nrbc] [--format parquet] [--date-from 2026-01-09] [--date-to ...]
+#   python transfer.py import consos.parquet [--club nrbc] [--restart] [--dry-run]
+# Sauvegarde / migration de la table consos par paquets, mémoire bornée par la taille
+# d'un paquet (jamais la table entière). Moteur : celui de l'app (STORAGE_BACKEND).
+# Un club à la fois (défaut : CLUB ou le premier configuré, voir clubs.py).
+from __future__ import annotations
+
+from datetime import date
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+import argparse
+import csv
+import itertools
+import json
+import os
+import sys
+import uuid
+
+from backends import get_backend
+from clubs import DEFAULT_CLUB, club_config, club_ids, resolve_club
+from constants import DOSES, DRINK_TYPES
+from storage import BULK_INSERT_CHUNK
+
+try:  # Parquet (optionnel, comme le snapshot de storage.py)
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+except ImportError:
+    pa = pq = None
+
+EXPORT_COLUMNS = ["id", "date", "nom", "boisson", "nb", "dose_ml", "volume_l", "created_at"]
+DEFAULT_EXPORT_BATCH = 5000
+FORMATS = ("csv", "parquet")
+# ids générés pour les lignes importées sans id : les mêmes à chaque relance (reprise idempotente)
+IMPORT_NAMESPACE = uuid.UUID("6f1c2a7e-3c55-4d0e-9a4e-2f3b8c1d9e10")
+
+
+def _format_of(path: str, explicit: Optional[str]) -> str:
+    fmt = explicit or ("parquet" if path.lower().endswith((".parquet", ".pq")) else "csv")
+    if fmt == "parquet" and pq is None:
+        raise SystemExit("format parquet : pyarrow n'est pas installé")
+    return fmt
+
+
+# =====================
+# Export
+# =====================
+
+def iter_batches(
+    batch: int, filters: Optional[Dict[str, Any]] = None, club: str = DEFAULT_CLUB
+) -> Iterator[List[Dict[str, Any]]]:
+    # parcours par clé (id croissant) : un paquet en mémoire à la fois.
+    # Fin = paquet vide, pas paquet incomplet : PostgREST plafonne les réponses à
+    # max-rows (1000 par défaut sur Supabase), un paquet court ne veut pas dire la fin.
+    after: Optional[str] = None
+    while True:
+        rows = get_backend(club).fetch_batch(after, batch, filters)
+        if not rows:
+            return
+        yield rows
+        after = str(rows[-1]["id"])
+
+
+def _parquet_schema() -> Any:
+    return pa.schema(
+        [
+            ("id", pa.string()),
+            ("date", pa.string()),
+            ("nom", pa.string()),
+            ("boisson", pa.string()),
+            ("nb", pa.int32()),
+            ("dose_ml", pa.int32()),
+            ("volume_l", pa.float64()),
+            ("created_at", pa.string()),
+        ]
+    )
+
+
+def _export_row(row: Dict[str, Any]) -> Dict[str, Any]:
+    out = {col: row.get(col) for col in EXPORT_COLUMNS}
+    for col in ("id", "date", "created_at"):
+        if out[col] is not None:
+            out[col] = str(out[col])
+    return out
+
+
+def export_consos(path: str, fmt: Optional[str] = None, batch: int = DEFAULT_EXPORT_BATCH,
+                  filters: Optional[Dict[str, Any]] = None, club: str = DEFAULT_CLUB) -> int:
+    # écrit dans un fichier temporaire puis renomme : pas de sauvegarde à moitié écrite
+    fmt = _format_of(path, fmt)
+    tmp = path + ".tmp"
+    total = 0
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    if fmt == "csv":
+        with open(tmp, "w", encoding="utf-8", newline="") as f:
+            writer = csv.DictWriter(f, fieldnames=EXPORT_COLUMNS)
+            writer.writeheader()
+            for rows in iter_batches(batch, filters, club):
+                writer.writerows(_export_row(row) for row in rows)
+                total += len(rows)
+                print(f"{total} lignes exportées", file=sys.stderr)
+    else:
+        schema = _parquet_schema()
+        with pq.ParquetWriter(tmp, schema) as writer:  # un row group par paquet
+            for rows in iter_batches(batch, filters, club):
+                writer.write_table(pa.Table.from_pylist([_export_row(row) for row in rows], schema=schema))
+                total += len(rows)
+                print(f"{total} lignes exportées", file=sys.stderr)
+    os.replace(tmp, path)
+    return total
+
+
+# =====================
+# Import
+# =====================
+
+def _read_rows(path: str, fmt: str, batch: int) -> Iterator[Dict[str, Any]]:
+    if fmt == "csv":
+        with open(path, encoding="utf-8", newline="") as f:
+            yield from csv.DictReader(f)
+    else:
+        for record_batch in pq.ParquetFile(path).iter_batches(batch_size=batch):
+            yield from record_batch.to_pylist()
+
+
+def _blank(value: Any) -> bool:
+    return value is None or (isinstance(value, float) and value != value) or str(value).strip() == ""
+
+
+def validate_row(
+    row: Dict[str, Any], line: int, drinks: Optional[List[str]] = None
+) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+    # (ligne prête à insérer, None) ou (None, raison du rejet)
+    # mêmes contraintes que les formulaires de l'app : boisson dans les boissons du club
+    # (drinks, défaut DRINK_TYPES), dose dans DOSES, nombre entier >= 1 ; volume recalculé s'il manque
+    try:
+        day = str(row.get("date") or "")[:10]
+        try:
+            day = date.fromisoformat(day).isoformat()  # refuse aussi 2026-13-45
+        except ValueError:
+            return None, f"date invalide : {row.get('date')!r}"
+        nom = str(row.get("nom") or "").strip()
+        if not nom:
+            return None, "nom manquant"
+        boisson = str(row.get("boisson") or "").strip()
+        if boisson not in (DRINK_TYPES if drinks is None else drinks):
+            return None, f"boisson inconnue : {boisson!r}"
+        nb_value = float(row.get("nb"))
+        nb = int(nb_value)
+        if nb < 1 or nb != nb_value:
+            return None, f"nombre invalide : {row.get('nb')!r}"
+        dose_ml = int(float(row.get("dose_ml")))
+        if dose_ml not in DOSES.values():
+            return None, f"dose inconnue : {row.get('dose_ml')!r}"
+        volume_l = nb * dose_ml / 1000.0
+        if not _blank(row.get("volume_l")) and abs(float(row["volume_l"]) - volume_l) > 1e-6:
+            return None, f"volume incohérent : {row['volume_l']!r} au lieu de {volume_l}"
+    except (TypeError, ValueError) as exc:
+        return None, f"valeur invalide ({exc})"
+
+    conso_id = str(row.get("id") or "").strip() or str(uuid.uuid5(IMPORT_NAMESPACE, f"{line}:{day}:{nom}:{boisson}"))
+    # created_at n'est pas repris : le serveur date l'import (la synchro incrémentale
+    # de l'app suit created_at, une date ancienne la ferait passer à côté)
+    return {
+        "id": conso_id,
+        "date": day,
+        "nom": nom,
+        "boisson": boisson,
+        "nb": nb,
+        "dose_ml": dose_ml,
+        "volume_l": volume_l,
+    }, None
+
+
+def _state_path(path: str) -> str:
+    return path + ".import-state.json"
+
+
+def _fingerprint(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {"source": os.path.abspath(path), "size": stat.st_size, "mtime": stat.st_mtime}
+
+
+def _load_state(path: str) -> int:
+    # lignes source déjà traitées lors d'un import interrompu (0 si fichier modifié depuis)
+    try:
+        with open(_state_path(path), encoding="utf-8") as f:
+            state = json.load(f)
+    except (OSError, ValueError):
+        return 0
+    if {k: state.get(k) for k in ("source", "size", "mtime")} != _fingerprint(path):
+        return 0
+    return int(state.get("rows_done", 0))
+
+
+def _save_state(path: str, rows_done: int) -> None:
+    tmp = _state_path(path) + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        json.dump({**_fingerprint(path), "rows_done": rows_done}, f)
+    os.replace(tmp, _state_path(path))
+
+
+def _rejected_lines(rejects_path: str) -> set:
+    # lignes source déjà écrites dans le fichier des rejets (reprise d'un import)
+    try:
+        with open(rejects_path, encoding="utf-8", newline="") as f:
+            return {int(row["ligne"]) for row in csv.DictReader(f) if str(row.get("ligne") or "").isdigit()}
+    except OSError:
+        return set()
+
+
+def import_consos(path: str, fmt: Optional[str] = None, batch: int = BULK_INSERT_CHUNK,
+                  restart: bool = False, dry_run: bool = False, club: str = DEFAULT_CLUB) -> Dict[str, int]:
+    # Insère par paquets ; après chaque paquet envoyé, la position est notée dans
+    # <fichier>.import-state.json. Une relance reprend après le dernier paquet confirmé
+    # (l'insert ignore les ids déjà présents : renvoyer un paquet ne duplique rien).
+    # "inserted" compte les lignes que la base a réellement créées (en simulation : les
+    # lignes valides), "existing" celles qu'elle avait déjà.
+    # Lignes invalides : écrites avec leur raison dans <fichier>.rejects.csv, une fois
+    # par ligne source même si le paquet est relu à la reprise.
+    fmt = _format_of(path, fmt)
+    drinks = club_config(club)["drinks"]
+    start = 0 if restart or dry_run else _load_state(path)
+    stats = {"skipped": start, "inserted": 0, "existing": 0, "rejected": 0}
+    rows = enumerate(_read_rows(path, fmt, batch), start=1)
+    if start:
+        print(f"reprise après la ligne {start}", file=sys.stderr)
+        rows = itertools.islice(rows, start, None)
+
+    rejects_path = path + ".rejects.csv"
+    if not start and not dry_run and os.path.exists(rejects_path):
+        os.remove(rejects_path)  # rejets d'un import précédent
+    written = _rejected_lines(rejects_path) if start else set()
+    rejects_file = None
+    rejects = None
+    done = start
+    try:
+        while True:
+            chunk = list(itertools.islice(rows, batch))
+            if not chunk:
+                break
+            valid = []
+            for line, row in chunk:
+                item, error = validate_row(row, line, drinks)
+                if item is not None:
+                    valid.append(item)
+                    continue
+                stats["rejected"] += 1
+                if line in written:
+                    continue  # paquet relu à la reprise : rejet déjà noté
+                if rejects is None:
+                    resumed = os.path.exists(rejects_path)  # reprise : on complète le fichier
+                    rejects_file = open(rejects_path, "a", encoding="utf-8", newline="")
+                    rejects = csv.writer(rejects_file)
+                    if not resumed:
+                        rejects.writerow(["ligne", "erreur"] + EXPORT_COLUMNS)
+                rejects.writerow([line, error] + [row.get(col) for col in EXPORT_COLUMNS])
+            if dry_run:
+                stats["inserted"] += len(valid)
+            elif valid:
+                created = len(get_backend(club).insert(valid))  # ids déjà présents : pas renvoyés
+                stats["inserted"] += created
+                stats["existing"] += len(valid) - created
+            done = chunk[-1][0]
+            if not dry_run:
+                if rejects_file is not None:
+                    rejects_file.flush()  # rejets sur disque avant d'avancer la position
+                _save_state(path, done)
+            print(
+                f"{done} lignes lues, {stats['inserted']} insérées, {stats['existing']} déjà présentes, "
+                f"{stats['rejected']} rejetées",
+                file=sys.stderr,
+            )
+    finally:
+        if rejects_file is not None:
+            rejects_file.close()
+
+    if not dry_run and os.path.exists(_state_path(path)):
+        os.remove(_state_path(path))  # import terminé
+    return stats
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Export / import de la table consos (CSV ou Parquet)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    exp = sub.add_parser("export", help="écrit la table (ou une période) dans un fichier")
+    exp.add_argument("path")
+    exp.add_argument("--club", choices=club_ids(), help="club exporté (défaut : CLUB ou le premier)")
+    exp.add_argument("--format", choices=FORMATS, help="déduit de l'extension par défaut")
+    exp.add_argument("--batch", type=int, default=DEFAULT_EXPORT_BATCH, help="lignes par requête")
+    exp.add_argument("--date-from", help="première date incluse (AAAA-MM-JJ)")
+    exp.add_argument("--date-to", help="dernière date incluse (AAAA-MM-JJ)")
+
+    imp = sub.add_parser("import", help="valide puis insère les lignes d'un fichier")
+    imp.add_argument("path")
+    imp.add_argument("--club", choices=club_ids(), help="club destinataire (défaut : CLUB ou le premier)")
+    imp.add_argument("--format", choices=FORMATS, help="déduit de l'extension par défaut")
+    imp.add_argument("--batch", type=int, default=BULK_INSERT_CHUNK, help="lignes par insert")
+    imp.add_argument("--restart", action="store_true", help="ignore un import interrompu et repart du début")
+    imp.add_argument("--dry-run", action="store_true", help="valide seulement, n'insère rien")
+    args = parser.parse_args()
+    club = resolve_club(args.club)
+
+    if args.command == "export":
+        filters = {"date_from": args.date_from, "date_to": args.date_to}
+        total = export_consos(args.path, args.format, args.batch, filters, club)
+        print(f"{total} lignes -> {args.path}")
+    else:
+        stats = import_consos(args.path, args.format, args.batch, args.restart, args.dry_run, club)
+        print(
+            f"{stats['inserted']} lignes {'valides' if args.dry_run else 'importées'}, "
+            f"{stats['existing']} déjà présentes, "
+            f"{stats['rejected']} rejetées, {stats['skipped']} déjà traitées (reprise)"
+        )
+        if stats["rejected"]:
+            print(f"détail des rejets : {args.path}.rejects.csv")
+
+
+if __name__ == "__main__":
+    main()